@@ -2,26 +2,39 @@ import eventlet
 eventlet.monkey_patch()
 
 import os
+import contextlib
+import contextvars
+import cProfile
 import datetime
+import hashlib
+import http.client
+import itertools
 import json
+import math
 import random
 import signal
 import secrets
+import sqlite3
 import sys
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
+from collections import OrderedDict, deque
 from contextvars import ContextVar
 from zoneinfo import ZoneInfo
 
+import httplib2
 from flask import Flask, render_template, jsonify, request, session, url_for, redirect, has_request_context
 from flask_socketio import SocketIO, join_room
 from google.auth.transport.requests import Request as GoogleAuthRequest
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import Resource, build_from_document
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 from google.oauth2.credentials import Credentials
+from socketio import PubSubManager
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 SCOPES = [
@@ -34,6 +47,8 @@ ERLAUBTE_OAUTH_BEREICHE = set(SCOPES)
 # messages are shown.
 VERBOSE_CONSOLE = False
 PROJEKT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Mitgelieferte Discovery-Dokumente für People v1 und Calendar v3.
+DISCOVERY_DIR = os.path.join(PROJEKT_DIR, 'discovery')
 ANZEIGE_ZEITZONE = ZoneInfo('Europe/Berlin')
 
 
@@ -89,9 +104,239 @@ def lade_flask_secret_key():
     return secret_key
 
 
+# Zuletzt formatierte Sekunde, damit Meldungsschübe nur einmal strftime aufrufen.
+letzter_zeitstempel = {'sekunde': None, 'text': ''}
+
+
 def aktueller_zeitstempel():
     """Liefert den aktuellen Status-Zeitstempel in deutscher Ortszeit."""
-    return datetime.datetime.now(ANZEIGE_ZEITZONE).strftime('%Y-%m-%d %H:%M:%S Uhr')
+    sekunde = int(time.time())
+    if letzter_zeitstempel['sekunde'] != sekunde:
+        letzter_zeitstempel['text'] = datetime.datetime.fromtimestamp(
+            sekunde, ANZEIGE_ZEITZONE
+        ).strftime('%Y-%m-%d %H:%M:%S Uhr')
+        letzter_zeitstempel['sekunde'] = sekunde
+    return letzter_zeitstempel['text']
+
+
+class KooperativeSqliteVerbindung(sqlite3.Connection):
+    """SQLite-Verbindung, die bei gesperrter Datei kooperativ wartet.
+
+    Das Busy-Timeout von SQLite wartet in C und hält dabei den ganzen
+    Eventlet-Hub an. Hier wartet SQLite nur kurz; danach schläft das Greenlet
+    mit ``eventlet.sleep`` und versucht es erneut, bis ``MAX_WARTEZEIT_SEKUNDEN``
+    verstrichen sind.
+    """
+
+    BUSY_TIMEOUT_SEKUNDEN = 0.01
+    MAX_WARTEZEIT_SEKUNDEN = 10
+
+    @classmethod
+    def öffne(cls, pfad):
+        return sqlite3.connect(
+            pfad,
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=cls.BUSY_TIMEOUT_SEKUNDEN,
+            factory=cls
+        )
+
+    def mit_wiederholung(self, ausführen, *argumente):
+        frist = time.monotonic() + self.MAX_WARTEZEIT_SEKUNDEN
+        pause = 0.01
+        while True:
+            try:
+                return ausführen(*argumente)
+            except sqlite3.OperationalError as fehler:
+                if 'locked' not in str(fehler) or time.monotonic() >= frist:
+                    raise
+            eventlet.sleep(pause)
+            pause = min(0.2, pause * 2)
+
+    def execute(self, *argumente):
+        return self.mit_wiederholung(super().execute, *argumente)
+
+    def executescript(self, skript):
+        return self.mit_wiederholung(super().executescript, skript)
+
+
+class GeteilterZustand:
+    """Zustand, den mehrere Worker-Prozesse über eine SQLite-Datei teilen.
+
+    Enthält ausstehende OAuth-Flows, die Sperren laufender Synchronisationen
+    und die Socket.IO-Nachrichten, die jeder Worker an seine eigenen
+    Verbindungen weiterreicht. Alle Worker müssen dieselbe Datei auf einem
+    lokalen Dateisystem verwenden.
+    """
+
+    # Nachrichten bleiben so lange liegen, bis jeder Worker sie abgeholt hat.
+    NACHRICHTEN_AUFBEWAHRUNG_SEKUNDEN = 60
+
+    def __init__(self, pfad):
+        self.pfad = pfad
+        self.verbindung = None
+
+    def verbinde(self):
+        if self.verbindung is not None:
+            return self.verbindung
+
+        verzeichnis = os.path.dirname(os.path.abspath(self.pfad))
+        os.makedirs(verzeichnis, mode=0o700, exist_ok=True)
+        neu = not os.path.exists(self.pfad)
+        verbindung = KooperativeSqliteVerbindung.öffne(self.pfad)
+        if neu:
+            os.chmod(self.pfad, 0o600)
+        verbindung.execute('PRAGMA journal_mode=WAL')
+        verbindung.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS oauth_flows (
+                state TEXT PRIMARY KEY,
+                daten TEXT NOT NULL,
+                angelegt REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS oauth_flows_angelegt ON oauth_flows (angelegt);
+            CREATE TABLE IF NOT EXISTS sync_sperren (
+                sitzung TEXT PRIMARY KEY,
+                seit REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS nachrichten (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kanal TEXT NOT NULL,
+                daten TEXT NOT NULL,
+                zeit REAL NOT NULL
+            );
+            """
+        )
+        self.verbindung = verbindung
+        return verbindung
+
+    def merke_flow(self, state, daten):
+        self.verbinde().execute(
+            "INSERT OR REPLACE INTO oauth_flows (state, daten, angelegt) VALUES (?, ?, ?)",
+            (state, json.dumps(daten), time.time())
+        )
+
+    def hole_flow(self, state, max_alter):
+        zeile = self.verbinde().execute(
+            "SELECT daten FROM oauth_flows WHERE state = ? AND angelegt >= ?",
+            (state, time.time() - max_alter)
+        ).fetchone()
+        return json.loads(zeile[0]) if zeile else None
+
+    def vergiss_flow(self, state):
+        self.verbinde().execute("DELETE FROM oauth_flows WHERE state = ?", (state,))
+
+    def anzahl_flows(self):
+        return self.verbinde().execute("SELECT COUNT(*) FROM oauth_flows").fetchone()[0]
+
+    def bereinige_flows(self, max_alter, max_anzahl):
+        """Löscht abgelaufene und überzählige OAuth-Flows, die ältesten zuerst.
+
+        Liefert die Zahl der abgelaufenen und der verdrängten Einträge.
+        """
+        verbindung = self.verbinde()
+        abgelaufen = verbindung.execute(
+            "DELETE FROM oauth_flows WHERE angelegt < ?", (time.time() - max_alter,)
+        ).rowcount
+        verdrängt = verbindung.execute(
+            "DELETE FROM oauth_flows WHERE state IN ("
+            "SELECT state FROM oauth_flows ORDER BY angelegt DESC LIMIT -1 OFFSET ?)",
+            (max_anzahl,)
+        ).rowcount
+        return abgelaufen, verdrängt
+
+    def sperre(self, sitzung, max_alter):
+        """Belegt die Synchronisation einer Sitzung; ``False``, wenn ein Worker sie hält.
+
+        Der haltende Worker erneuert die Sperre regelmäßig (siehe
+        :meth:`erneuere_sperre`); Sperren, die länger als ``max_alter`` nicht
+        erneuert wurden, stammen von abgebrochenen Workern und werden übernommen.
+        """
+        verbindung = self.verbinde()
+        jetzt = time.time()
+        verbindung.execute(
+            "DELETE FROM sync_sperren WHERE sitzung = ? AND seit < ?", (sitzung, jetzt - max_alter)
+        )
+        return verbindung.execute(
+            "INSERT OR IGNORE INTO sync_sperren (sitzung, seit) VALUES (?, ?)", (sitzung, jetzt)
+        ).rowcount > 0
+
+    def erneuere_sperre(self, sitzung):
+        """Verlängert eine gehaltene Sperre, damit sie nicht als verwaist gilt."""
+        self.verbinde().execute(
+            "UPDATE sync_sperren SET seit = ? WHERE sitzung = ?", (time.time(), sitzung)
+        )
+
+    def ist_gesperrt(self, sitzung, max_alter):
+        return self.verbinde().execute(
+            "SELECT 1 FROM sync_sperren WHERE sitzung = ? AND seit >= ?",
+            (sitzung, time.time() - max_alter)
+        ).fetchone() is not None
+
+    def gib_frei(self, sitzung):
+        self.verbinde().execute("DELETE FROM sync_sperren WHERE sitzung = ?", (sitzung,))
+
+    def veröffentliche(self, kanal, daten):
+        self.verbinde().execute(
+            "INSERT INTO nachrichten (kanal, daten, zeit) VALUES (?, ?, ?)",
+            (kanal, daten, time.time())
+        )
+
+    def letzte_nachricht_id(self):
+        return self.verbinde().execute("SELECT COALESCE(MAX(id), 0) FROM nachrichten").fetchone()[0]
+
+    def nachrichten_nach(self, kanal, letzte_id):
+        return self.verbinde().execute(
+            "SELECT id, daten FROM nachrichten WHERE id > ? AND kanal = ? ORDER BY id",
+            (letzte_id, kanal)
+        ).fetchall()
+
+    def bereinige_nachrichten(self):
+        """Löscht Nachrichten, die alle Worker längst abgeholt haben."""
+        self.verbinde().execute(
+            "DELETE FROM nachrichten WHERE zeit < ?", (time.time() - self.NACHRICHTEN_AUFBEWAHRUNG_SEKUNDEN,)
+        )
+
+
+class SqliteNachrichtenverteiler(PubSubManager):
+    """Socket.IO-Client-Manager, der Frames über ``GeteilterZustand`` verteilt.
+
+    Jeder Worker schreibt seine Emits in die gemeinsame Tabelle und fragt die
+    Frames der anderen Worker in kurzen Abständen ab, ähnlich wie der
+    Redis-Manager von python-socketio, aber ohne zusätzlichen Dienst.
+    """
+
+    name = 'sqlite'
+    ABFRAGEINTERVALL_SEKUNDEN = 0.05
+    BEREINIGUNGSINTERVALL_SEKUNDEN = 10
+
+    def __init__(self, zustand, channel='geburtstage', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.zustand = zustand
+        # Schon hier festgelegt, damit auch Frames vor der ersten Abfrage ankommen.
+        self.letzte_id = zustand.letzte_nachricht_id()
+
+    def _publish(self, data):
+        self.zustand.veröffentliche(self.channel, json.dumps(data))
+
+    def hole_nachrichten(self):
+        """Liefert die seit dem letzten Aufruf veröffentlichten Frames."""
+        zeilen = self.zustand.nachrichten_nach(self.channel, self.letzte_id)
+        if zeilen:
+            self.letzte_id = zeilen[-1][0]
+        return [daten for _, daten in zeilen]
+
+    def _listen(self):
+        letzte_bereinigung = time.monotonic()
+        while True:
+            try:
+                yield from self.hole_nachrichten()
+                if time.monotonic() - letzte_bereinigung > self.BEREINIGUNGSINTERVALL_SEKUNDEN:
+                    self.zustand.bereinige_nachrichten()
+                    letzte_bereinigung = time.monotonic()
+            except sqlite3.Error:
+                self._get_logger().exception('Gemeinsamer Zustand nicht lesbar')
+            eventlet.sleep(self.ABFRAGEINTERVALL_SEKUNDEN)
 
 
 lade_env_datei()
@@ -105,7 +350,26 @@ app.config.update(
     SESSION_COOKIE_SECURE=umgebung_ist_wahr('FLASK_SESSION_COOKIE_SECURE', True),
 )
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1, x_prefix=1)
-socketio = SocketIO(app, async_mode='eventlet', manage_session=False)
+# SQLite-Datei für OAuth-Flows, Sync-Sperren und Statusverteilung mehrerer Worker (leer = ein Prozess).
+GETEILTER_ZUSTAND_DATEI = os.environ.get('GETEILTER_ZUSTAND_DATEI', '')
+# Alternativ verteilt eine Message-Queue wie redis://… die Socket.IO-Frames.
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+# Begonnene OAuth-Anmeldungen verfallen nach dieser Zeit; höchstens so viele bleiben offen.
+OAUTH_FLOW_MAX_ALTER_SEKUNDEN = umgebung_als_int('OAUTH_FLOW_MAX_ALTER_SEKUNDEN', 30 * 60)
+OAUTH_FLOW_MAX_ANZAHL = max(1, umgebung_als_int('OAUTH_FLOW_MAX_ANZAHL', 10000))
+OAUTH_FLOW_BEREINIGUNGSINTERVALL_SEKUNDEN = 60
+# Sync-Sperren, die so lange nicht erneuert wurden, gelten als Rest eines abgebrochenen Workers.
+SYNC_SPERRE_MAX_ALTER_SEKUNDEN = max(4, umgebung_als_int('SYNC_SPERRE_MAX_ALTER_SEKUNDEN', 10 * 60))
+# Ein laufender Abgleich erneuert seine Sperre mehrmals innerhalb dieser Frist.
+SYNC_SPERRE_ERNEUERUNG_SEKUNDEN = SYNC_SPERRE_MAX_ALTER_SEKUNDEN / 4
+geteilter_zustand = GeteilterZustand(GETEILTER_ZUSTAND_DATEI) if GETEILTER_ZUSTAND_DATEI else None
+if SOCKETIO_MESSAGE_QUEUE:
+    socketio_verteilung = {'message_queue': SOCKETIO_MESSAGE_QUEUE}
+elif geteilter_zustand is not None:
+    socketio_verteilung = {'client_manager': SqliteNachrichtenverteiler(geteilter_zustand)}
+else:
+    socketio_verteilung = {}
+socketio = SocketIO(app, async_mode='eventlet', manage_session=False, **socketio_verteilung)
 TOKEN_SPEICHER_DIR = os.environ.get(
     'TOKEN_SPEICHER_DIR',
     os.path.join(app.instance_path, 'oauth_tokens')
@@ -115,37 +379,403 @@ CREDENTIALS_DATEI = os.environ.get(
     os.path.join(PROJEKT_DIR, 'credentials.json')
 )
 EINFÜGE_PAUSE_SEKUNDEN = umgebung_als_float('EINFUEGE_PAUSE_SEKUNDEN', 0.1)
+# Google nimmt höchstens 50 Kalender-Anforderungen pro Batch an.
+EINFÜGE_BATCH_GRÖSSE = max(1, min(50, umgebung_als_int('EINFUEGE_BATCH_GROESSE', 50)))
+LÖSCH_BATCH_GRÖSSE = max(1, min(50, umgebung_als_int('LOESCH_BATCH_GROESSE', 50)))
+# 'abgleich' schreibt nur Änderungen, 'neuaufbau' leert den Kalender vor dem Import.
+SYNC_MODUS = os.environ.get('SYNC_MODUS', 'abgleich')
+# Private Termineigenschaft mit Kontakt-Ressource und Feld als Herkunft.
+QUELLEN_EIGENSCHAFT = 'geburtstage_quelle'
 RATE_LIMIT_START_WARTEZEIT = umgebung_als_float('RATE_LIMIT_START_WARTEZEIT', 1.0)
 RATE_LIMIT_MAX_WARTEZEIT = umgebung_als_float('RATE_LIMIT_MAX_WARTEZEIT', 32.0)
 RATE_LIMIT_MAX_VERSUCHE = umgebung_als_int('RATE_LIMIT_MAX_VERSUCHE', 6)
+# Gemeinsame Drosselung aller Google-Aufrufe in Anforderungen pro Sekunde.
+GOOGLE_NUTZER_START_RATE = 1 / EINFÜGE_PAUSE_SEKUNDEN if EINFÜGE_PAUSE_SEKUNDEN > 0 else 10.0
+GOOGLE_NUTZER_MAX_RATE = umgebung_als_float('GOOGLE_NUTZER_MAX_RATE', max(20.0, GOOGLE_NUTZER_START_RATE))
+GOOGLE_PROJEKT_MAX_RATE = umgebung_als_float('GOOGLE_PROJEKT_MAX_RATE', 100.0)
+GOOGLE_MIN_RATE = umgebung_als_float('GOOGLE_MIN_RATE', 0.5)
+GOOGLE_RATE_ERHÖHUNG = umgebung_als_float('GOOGLE_RATE_ERHOEHUNG', 0.5)
+GOOGLE_RATE_SENKUNG = 0.5
 OAUTH_TOKEN_AUFBEWAHRUNG_TAGE = max(
     1,
     umgebung_als_int('OAUTH_TOKEN_AUFBEWAHRUNG_TAGE', 30)
 )
 TOKEN_BEREINIGUNGSINTERVALL_SEKUNDEN = 6 * 60 * 60
+ZUGANGSDATEN_CACHE_GRÖSSE = umgebung_als_int('ZUGANGSDATEN_CACHE_GROESSE', 1000)
+ZUGANGSDATEN_CACHE_TTL_SEKUNDEN = umgebung_als_int('ZUGANGSDATEN_CACHE_TTL_SEKUNDEN', 15 * 60)
+TOKEN_VORAB_ERNEUERN_SEKUNDEN = 5 * 60
+TOKEN_ERNEUERUNGSINTERVALL_SEKUNDEN = 60
+KALENDER_SCHNAPPSCHUSS_MAX_ALTER_SEKUNDEN = umgebung_als_int('KALENDER_SCHNAPPSCHUSS_MAX_ALTER_SEKUNDEN', 24 * 60 * 60)
+SYNC_MAX_PARALLEL = umgebung_als_int('SYNC_MAX_PARALLEL', 4)
+# Geplanter Abgleich ohne Browser für alle gespeicherten Zugänge (0 = aus).
+AUTOSYNC_INTERVALL_SEKUNDEN = umgebung_als_int('AUTOSYNC_INTERVALL_SEKUNDEN', 0)
+# Der nächste Termin streut je Sitzung zufällig um diesen Anteil des Intervalls.
+AUTOSYNC_STREUUNG = min(0.9, max(0.0, umgebung_als_float('AUTOSYNC_STREUUNG', 0.25)))
+# Geplante Läufe belegen höchstens so viele Plätze und nur freie in SYNC_MAX_PARALLEL.
+AUTOSYNC_MAX_PARALLEL = max(1, umgebung_als_int('AUTOSYNC_MAX_PARALLEL', 1))
+AUTOSYNC_TAKT_SEKUNDEN = 60
+# Höchstzahl gleichzeitig genutzter HTTP-Transporte zu Google; pro Lauf liest ein
+# Greenlet Kontakte voraus, während ein zweiter schreibt.
+GOOGLE_HTTP_POOL_GRÖSSE = max(1, umgebung_als_int(
+    'GOOGLE_HTTP_POOL_GROESSE', 2 * (SYNC_MAX_PARALLEL + AUTOSYNC_MAX_PARALLEL) + 2
+))
+# Statusmeldungen einer Sitzung werden so lange gesammelt und als ein Frame gesendet.
+STATUS_SAMMELFENSTER_SEKUNDEN = umgebung_als_float('STATUS_SAMMELFENSTER_SEKUNDEN', 0.2)
+# Zeitprofil je Lauf zusätzlich als JSON-Zeile in diese Datei schreiben (leer = aus).
+SYNC_LAUFPROFIL_DATEI = os.environ.get('SYNC_LAUFPROFIL_DATEI', '')
+# 'cprofile' oder 'pyinstrument' zeichnet ein Profil je Synchronisation auf.
+SYNC_PROFILER = os.environ.get('SYNC_PROFILER', '').lower()
+SYNC_PROFILER_DIR = os.environ.get('SYNC_PROFILER_DIR', os.path.join(PROJEKT_DIR, 'profile'))
+# Optionales Bearer-Token für /metrics; leer lässt den Endpunkt offen.
+METRIKEN_TOKEN = os.environ.get('METRIKEN_TOKEN', '')
+# Vorausgelesene Kontaktseiten, während der Kalender geschrieben wird.
+SYNC_PUFFER_SEITEN = max(1, umgebung_als_int('SYNC_PUFFER_SEITEN', 2))
+# Schätzwert für Wartezeiten, bis echte Laufzeiten vorliegen.
+SYNC_STANDARD_LAUFZEIT_SEKUNDEN = 60.0
 AKTIVE_STATUS_SITZUNG = ContextVar('aktive_status_sitzung', default=None)
+AKTIVES_LAUFPROFIL = ContextVar('aktives_laufprofil', default=None)
+# Aktion des gerade ausgeführten Google-Aufrufs, für die Antwortgröße je Aktion.
+AKTIVE_GOOGLE_AKTION = ContextVar('aktive_google_aktion', default=None)
+# Google-Methode -> Antwortfelder, die der Code tatsächlich liest (Partial Response).
+ANTWORT_FELDMASKEN = {
+    'people.people.connections.list': (
+        'connections(resourceName,metadata/deleted,names/displayName,birthdays/date,'
+        'events(date,type,formattedType,customType)),nextPageToken,nextSyncToken'
+    ),
+    'calendar.events.list': (
+        'items(id,status,summary,start/date,end/date,description,extendedProperties/private),'
+        'nextPageToken,nextSyncToken'
+    ),
+    'calendar.events.insert': 'id',
+    'calendar.events.update': 'id',
+    'calendar.calendars.insert': 'id',
+    'calendar.calendars.get': 'id,summary',
+    'calendar.calendarList.list': 'items(id,summary),nextPageToken',
+}
 laufende_synchronisationen = set()
+# Sitzungs-ID -> Greenlet, das die geteilte Sperre eines laufenden Abgleichs erneuert.
+sperren_erneuerung = {}
+# Sitzungen, deren laufender Abgleich vom Zeitplan gestartet wurde.
+automatische_läufe = set()
+# Sitzungs-ID (oder None für alle) -> noch nicht gesendete Statuszeilen.
+statuspuffer = {}
+# (API, Version) -> geteilte Dienstvorlage aus dem Discovery-Dokument.
+dienstvorlagen = {}
+# Token-Schlüssel -> (Credentials, Ablaufzeitpunkt), in LRU-Reihenfolge.
+zugangsdaten_cache = OrderedDict()
+# Sitzungs-ID -> Termine des Zielkalenders samt Calendar-Sync-Token, nur im Arbeitsspeicher.
+kalender_schnappschüsse = {}
 synchronisations_sperre = eventlet.semaphore.Semaphore()
+# Ein Profiler sieht alle Greenlets, daher wird höchstens ein Lauf gleichzeitig profiliert.
+profiler_sperre = eventlet.semaphore.Semaphore()
+
+
+def sende_statuspuffer(ziel_sitzung):
+    """Sendet die gesammelten Statusmeldungen einer Sitzung als ein Frame."""
+    zeilen = statuspuffer.pop(ziel_sitzung, None)
+    if not zeilen:
+        return
+    if ziel_sitzung:
+        socketio.emit('statusmeldungen', zeilen, to=ziel_sitzung)
+    else:
+        socketio.emit('statusmeldungen', zeilen)
+
+
+def sende_alle_statuspuffer():
+    """Leert die Statuspuffer aller Sitzungen, etwa vor dem Beenden."""
+    for ziel_sitzung in list(statuspuffer):
+        sende_statuspuffer(ziel_sitzung)
 
 
 def emit_status(msg, sitzungs_id=None):
-    """Sendet eine Statusmeldung an die passende Web-Sitzung."""
-    timestamp = aktueller_zeitstempel()
-    line = f"{timestamp} - {msg}"
+    """Sendet eine Statusmeldung an die passende Web-Sitzung.
+
+    Meldungen werden je Sitzung für ``STATUS_SAMMELFENSTER_SEKUNDEN`` gesammelt
+    und gemeinsam gesendet; Abschluss-, Warn- und Fehlermeldungen leeren den
+    Puffer sofort.
+    """
+    line = f"{aktueller_zeitstempel()} - {msg}"
     ziel_sitzung = sitzungs_id or AKTIVE_STATUS_SITZUNG.get()
     if ziel_sitzung is None and has_request_context():
         ziel_sitzung = session.get('sitzungs_id')
 
-    if ziel_sitzung:
-        socketio.emit('status', line, to=ziel_sitzung)
-    else:
-        socketio.emit('status', line)
+    sofort = any(x in msg for x in ('❌', '⚠️', '🎉', '📋', 'Server'))
+    zeilen = statuspuffer.setdefault(ziel_sitzung, [])
+    zeilen.append(line)
+    if sofort or STATUS_SAMMELFENSTER_SEKUNDEN <= 0:
+        sende_statuspuffer(ziel_sitzung)
+    elif len(zeilen) == 1:
+        eventlet.spawn_after(STATUS_SAMMELFENSTER_SEKUNDEN, sende_statuspuffer, ziel_sitzung)
 
-    important = any(x in msg for x in ('⚠️', '❌', '🎉', 'Server'))
-    if VERBOSE_CONSOLE or important:
+    if VERBOSE_CONSOLE or sofort:
         print(line, flush=True)
 
 
+class Metriken:
+    """Sammelt Zähler, Messwerte und Histogramme für ``/metrics``.
+
+    Die Ausgabe folgt dem Prometheus-Textformat, damit Kontingentdruck und
+    langsame Google-Aufrufe ohne zusätzliche Abhängigkeit überwacht werden können.
+    """
+
+    def __init__(self):
+        self.beschreibungen = {}
+        self.werte = {}
+
+    def registriere(self, name, typ, hilfe, grenzen=None):
+        self.beschreibungen[name] = (typ, hilfe, grenzen)
+        self.werte.setdefault(name, {})
+
+    def zähle(self, name, wert=1, **labels):
+        """Erhöht einen Zähler oder verschiebt einen Messwert um ``wert``."""
+        schlüssel = tuple(sorted(labels.items()))
+        reihe = self.werte[name]
+        reihe[schlüssel] = reihe.get(schlüssel, 0) + wert
+
+    def setze(self, name, wert, **labels):
+        self.werte[name][tuple(sorted(labels.items()))] = wert
+
+    def beobachte(self, name, wert, **labels):
+        """Trägt einen Wert in ein Histogramm ein."""
+        grenzen = self.beschreibungen[name][2]
+        schlüssel = tuple(sorted(labels.items()))
+        reihe = self.werte[name].setdefault(schlüssel, [0] * len(grenzen) + [0, 0.0])
+        for position, grenze in enumerate(grenzen):
+            if wert <= grenze:
+                reihe[position] += 1
+        reihe[-2] += 1
+        reihe[-1] += wert
+
+    @staticmethod
+    def labeltext(labels):
+        if not labels:
+            return ''
+        teile = []
+        for name, wert in labels:
+            wert = str(wert).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            teile.append(f'{name}="{wert}"')
+        return '{' + ','.join(teile) + '}'
+
+    def als_text(self):
+        zeilen = []
+        for name, (typ, hilfe, grenzen) in self.beschreibungen.items():
+            zeilen.append(f'# HELP {name} {hilfe}')
+            zeilen.append(f'# TYPE {name} {typ}')
+            for labels, wert in self.werte[name].items():
+                if typ != 'histogram':
+                    zeilen.append(f'{name}{self.labeltext(labels)} {wert}')
+                    continue
+                for position, grenze in enumerate(grenzen):
+                    zeilen.append(
+                        f'{name}_bucket{self.labeltext(labels + (("le", grenze),))} {wert[position]}'
+                    )
+                zeilen.append(f'{name}_bucket{self.labeltext(labels + (("le", "+Inf"),))} {wert[-2]}')
+                zeilen.append(f'{name}_sum{self.labeltext(labels)} {wert[-1]}')
+                zeilen.append(f'{name}_count{self.labeltext(labels)} {wert[-2]}')
+        return '\n'.join(zeilen) + '\n'
+
+
+metriken = Metriken()
+metriken.registriere(
+    'geburtstage_google_api_aufrufe_total', 'counter',
+    'Google-API-Aufrufe nach Aktion und Ergebnis.'
+)
+metriken.registriere(
+    'geburtstage_google_api_antwort_bytes_total', 'counter',
+    'Übertragene (bei gzip komprimierte) Bytes der Google-API-Antworten nach Aktion und Kodierung.'
+)
+metriken.registriere(
+    'geburtstage_google_http_verbindungen_total', 'counter',
+    'HTTP-Anforderungen an Google nach Verbindung (neu, wiederverwendet).'
+)
+metriken.registriere(
+    'geburtstage_google_http_pool_belegt', 'gauge',
+    'Gerade genutzte HTTP-Transporte des gemeinsamen Verbindungspools.'
+)
+metriken.registriere(
+    'geburtstage_google_api_dauer_sekunden', 'histogram',
+    'Dauer einzelner Google-API-Aufrufe nach Aktion.',
+    grenzen=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+metriken.registriere(
+    'geburtstage_google_api_wiederholungen_total', 'counter',
+    'Wiederholte Google-API-Aufrufe nach Aktion und Grund.'
+)
+metriken.registriere(
+    'geburtstage_google_api_drosselungen_total', 'counter',
+    'Rate-Limit-Antworten von Google nach Aktion.'
+)
+metriken.registriere(
+    'geburtstage_google_api_backoff_sekunden_total', 'counter',
+    'Summe der Backoff-Wartezeiten nach Google-Fehlern.'
+)
+metriken.registriere(
+    'geburtstage_ratenbegrenzer_wartezeit_sekunden_total', 'counter',
+    'Summe der Wartezeiten im gemeinsamen Ratenbegrenzer.'
+)
+metriken.registriere(
+    'geburtstage_synchronisationen_aktiv', 'gauge',
+    'Laufende Synchronisationen.'
+)
+metriken.registriere(
+    'geburtstage_synchronisationen_wartend', 'gauge',
+    'Synchronisationen in der Warteschlange.'
+)
+metriken.registriere(
+    'geburtstage_token_speicher_eintraege', 'gauge',
+    'Gespeicherte OAuth-Zugangsdaten.'
+)
+metriken.registriere(
+    'geburtstage_token_bereinigung_dauer_sekunden', 'gauge',
+    'Dauer der letzten Bereinigung des Token-Speichers.'
+)
+metriken.registriere(
+    'geburtstage_token_bereinigt_total', 'counter',
+    'Durch die Bereinigung entfernte OAuth-Zugangsdaten.'
+)
+metriken.registriere(
+    'geburtstage_socketio_verbindungen', 'gauge',
+    'Verbundene Socket.IO-Clients.'
+)
+metriken.registriere(
+    'geburtstage_automatische_synchronisationen_total', 'counter',
+    'Geplante Synchronisationen ohne Browser nach Ergebnis.'
+)
+metriken.registriere(
+    'geburtstage_oauth_flows_ausstehend', 'gauge',
+    'Begonnene OAuth-Anmeldungen ohne Callback.'
+)
+metriken.registriere(
+    'geburtstage_oauth_flows_entfernt_total', 'counter',
+    'Verworfene OAuth-Anmeldungen nach Grund (abgelaufen, verdraengt).'
+)
+
+
+class Laufprofil:
+    """Misst Phasen, Google-Aufrufe und Wartezeiten eines Synchronisationslaufs.
+
+    Das Profil hängt am Kontext des Laufs und wird so auch von vorauslesenden
+    Greenlets befüllt; deren API-Zeit überlappt mit der Schreibzeit.
+    """
+
+    def __init__(self):
+        self.beginn = time.monotonic()
+        self.phasen = {}
+        self.api = {}
+        self.antwort_bytes = {}
+        self.schlafzeit = 0.0
+        self.anzahlen = {}
+
+    def api_aufruf(self, aktion, dauer):
+        eintrag = self.api.setdefault(aktion, [0, 0.0])
+        eintrag[0] += 1
+        eintrag[1] += dauer
+
+    def antwort_empfangen(self, aktion, bytes_anzahl):
+        self.antwort_bytes[aktion] = self.antwort_bytes.get(aktion, 0) + bytes_anzahl
+
+    def zusammenfassung(self):
+        return {
+            'gesamt_sekunden': round(time.monotonic() - self.beginn, 3),
+            'api_sekunden': round(sum(sekunden for _, sekunden in self.api.values()), 3),
+            'api_aufrufe': sum(anzahl for anzahl, _ in self.api.values()),
+            'api_bytes': sum(self.antwort_bytes.values()),
+            'warte_sekunden': round(self.schlafzeit, 3),
+            'phasen': {name: round(sekunden, 3) for name, sekunden in self.phasen.items()},
+            'aktionen': {
+                aktion: {
+                    'aufrufe': anzahl,
+                    'sekunden': round(sekunden, 3),
+                    'bytes': self.antwort_bytes.get(aktion, 0),
+                }
+                for aktion, (anzahl, sekunden) in self.api.items()
+            },
+            'anzahlen': dict(self.anzahlen),
+        }
+
+    def als_meldung(self):
+        daten = self.zusammenfassung()
+        phasen = ', '.join(f"{name} {sekunden:.1f} s" for name, sekunden in daten['phasen'].items())
+        return (
+            f"⏱️ Laufzeit {daten['gesamt_sekunden']:.1f} s: Google API {daten['api_sekunden']:.1f} s "
+            f"in {daten['api_aufrufe']} Aufrufen ({daten['api_bytes'] / 1024:.0f} KiB), Wartezeit {daten['warte_sekunden']:.1f} s."
+            + (f" Phasen: {phasen}." if phasen else '')
+        )
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Misst die Dauer eines Abschnitts im aktiven Laufprofil."""
+    beginn = time.monotonic()
+    try:
+        yield
+    finally:
+        profil = AKTIVES_LAUFPROFIL.get()
+        if profil is not None:
+            profil.phasen[name] = profil.phasen.get(name, 0.0) + time.monotonic() - beginn
+
+
+def schlafe(sekunden):
+    """Wartet und rechnet die Wartezeit dem aktiven Laufprofil zu."""
+    profil = AKTIVES_LAUFPROFIL.get()
+    if profil is not None:
+        profil.schlafzeit += sekunden
+    time.sleep(sekunden)
+
+
+def schreibe_laufprofil(profil, ergebnis):
+    """Hängt das Zeitprofil eines Laufs als JSON-Zeile an ``SYNC_LAUFPROFIL_DATEI`` an."""
+    if not SYNC_LAUFPROFIL_DATEI:
+        return
+    zeile = dict(
+        profil.zusammenfassung(),
+        zeitpunkt=datetime.datetime.now(ANZEIGE_ZEITZONE).isoformat(timespec='seconds'),
+        modus=SYNC_MODUS,
+        ergebnis=ergebnis
+    )
+    try:
+        with open(SYNC_LAUFPROFIL_DATEI, 'a', encoding='utf-8') as datei:
+            datei.write(json.dumps(zeile, ensure_ascii=False) + '\n')
+    except OSError:
+        print("Laufprofil konnte nicht geschrieben werden.", flush=True)
+
+
+@contextlib.contextmanager
+def profiliere_lauf():
+    """Zeichnet bei gesetztem ``SYNC_PROFILER`` ein Profil dieses Laufs auf."""
+    if SYNC_PROFILER not in ('cprofile', 'pyinstrument') or not profiler_sperre.acquire(blocking=False):
+        yield
+        return
+    try:
+        os.makedirs(SYNC_PROFILER_DIR, exist_ok=True)
+        basis = os.path.join(SYNC_PROFILER_DIR, f"sync-{time.strftime('%Y%m%d-%H%M%S')}")
+        if SYNC_PROFILER == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("pyinstrument ist nicht installiert; Lauf wird nicht profiliert.", flush=True)
+                yield
+                return
+            profiler = Profiler(async_mode='disabled')
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{basis}.html", 'w', encoding='utf-8') as datei:
+                    datei.write(profiler.output_html())
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(f"{basis}.prof")
+    finally:
+        profiler_sperre.release()
+
+
 def ist_rate_limit_fehler(fehler):
     """Erkennt Google-Quota- und Rate-Limit-Fehler."""
     status = getattr(getattr(fehler, 'resp', None), 'status', None)
@@ -187,33 +817,434 @@ def warte_wegen_google_api_fehler(versuch, aktion, fehler):
     wartezeit = basis_wartezeit + jitter
     status = google_fehler_status(fehler)
     grund = 'Rate Limit' if ist_rate_limit_fehler(fehler) else f'HTTP {status}'
+    metriken.zähle('geburtstage_google_api_wiederholungen_total', aktion=aktion, grund=grund)
+    metriken.zähle('geburtstage_google_api_backoff_sekunden_total', wartezeit)
     emit_status(f"⏳ Google API Fehler beim {aktion} ({grund}). Neuer Versuch in {wartezeit:.1f} Sekunden...")
-    time.sleep(wartezeit)
+    schlafe(wartezeit)
     return True
 
 
-def führe_google_api_aus(anforderung, aktion):
-    """Führt eine Google-API-Anforderung mit Wiederholungen bei kurzzeitigen Fehlern aus."""
+class TokenEimer:
+    """Token-Bucket, dessen Rate nach Erfolgen wächst und bei Drosselung sinkt (AIMD)."""
+
+    def __init__(self, rate, max_rate):
+        self.max_rate = max_rate
+        self.rate = min(rate, max_rate)
+        self.vorrat = max(1.0, self.rate)
+        self.zeitpunkt = time.monotonic()
+
+    def reserviere(self, kosten=1):
+        """Reserviert Tokens und liefert die Wartezeit, bis sie gedeckt sind."""
+        jetzt = time.monotonic()
+        self.vorrat = min(
+            max(1.0, self.rate),
+            self.vorrat + (jetzt - self.zeitpunkt) * self.rate
+        )
+        self.zeitpunkt = jetzt
+        self.vorrat -= kosten
+        if self.vorrat >= 0:
+            return 0.0
+        return -self.vorrat / self.rate
+
+    def erhöhe(self):
+        self.rate = min(self.max_rate, self.rate + GOOGLE_RATE_ERHÖHUNG)
+
+    def senke(self):
+        self.rate = max(GOOGLE_MIN_RATE, self.rate * GOOGLE_RATE_SENKUNG)
+
+
+projekt_eimer = TokenEimer(GOOGLE_PROJEKT_MAX_RATE, GOOGLE_PROJEKT_MAX_RATE)
+nutzer_eimer = {}
+
+
+def begrenzer_sitzung():
+    """Ermittelt die Sitzung, deren Google-Kontingent ein Aufruf belastet."""
+    sitzungs_id = AKTIVE_STATUS_SITZUNG.get()
+    if sitzungs_id is None and has_request_context():
+        sitzungs_id = session.get('sitzungs_id')
+    return sitzungs_id
+
+
+def eimer_der_sitzung(sitzungs_id):
+    """Liefert den Token-Bucket einer Sitzung und legt ihn bei Bedarf an."""
+    eimer = nutzer_eimer.get(sitzungs_id)
+    if eimer is None:
+        eimer = TokenEimer(GOOGLE_NUTZER_START_RATE, GOOGLE_NUTZER_MAX_RATE)
+        nutzer_eimer[sitzungs_id] = eimer
+    return eimer
+
+
+def warte_auf_kontingent(kosten=1):
+    """Drosselt einen Aufruf gleichzeitig nach Nutzer- und Projektkontingent."""
+    sitzungs_id = begrenzer_sitzung()
+    wartezeit = projekt_eimer.reserviere(kosten)
+    if sitzungs_id:
+        wartezeit = max(wartezeit, eimer_der_sitzung(sitzungs_id).reserviere(kosten))
+    if wartezeit > 0:
+        metriken.zähle('geburtstage_ratenbegrenzer_wartezeit_sekunden_total', wartezeit)
+        schlafe(wartezeit)
+
+
+def melde_kontingent_ergebnis(gedrosselt):
+    """Passt Nutzer- und Projektrate nach einer Google-Antwort an."""
+    sitzungs_id = begrenzer_sitzung()
+    eimer = [projekt_eimer]
+    if sitzungs_id:
+        eimer.append(eimer_der_sitzung(sitzungs_id))
+    for einzelner in eimer:
+        if gedrosselt:
+            einzelner.senke()
+        else:
+            einzelner.erhöhe()
+
+
+def bereinige_ratenbegrenzer():
+    """Entfernt Token-Buckets von Sitzungen, die länger keine Aufrufe mehr hatten."""
+    grenzwert = time.monotonic() - TOKEN_BEREINIGUNGSINTERVALL_SEKUNDEN
+    for sitzungs_id, eimer in list(nutzer_eimer.items()):
+        if eimer.zeitpunkt < grenzwert:
+            nutzer_eimer.pop(sitzungs_id, None)
+
+
+def ratenbegrenzer_status():
+    """Fasst die aktuellen Raten ohne Sitzungskennungen zusammen."""
+    raten = [eimer.rate for eimer in nutzer_eimer.values()]
+    return {
+        'projekt_rate': round(projekt_eimer.rate, 2),
+        'projekt_max_rate': projekt_eimer.max_rate,
+        'nutzer_anzahl': len(raten),
+        'nutzer_rate_min': round(min(raten), 2) if raten else None,
+        'nutzer_rate_mittel': round(sum(raten) / len(raten), 2) if raten else None,
+        'nutzer_max_rate': GOOGLE_NUTZER_MAX_RATE,
+    }
+
+
+def ist_drosselung(fehler):
+    """Erkennt Antworten, mit denen Google die Aufrufrate zurückweist."""
+    return google_fehler_status(fehler) == 429 or ist_rate_limit_fehler(fehler)
+
+
+def mit_feldmaske(anforderung):
+    """Beschränkt die Antwort einer Google-Anforderung auf die genutzten Felder.
+
+    Maßgeblich ist :data:`ANTWORT_FELDMASKEN`; ein beim Aufruf gesetztes
+    ``fields`` bleibt unverändert.
+    """
+    maske = ANTWORT_FELDMASKEN.get(getattr(anforderung, 'methodId', None))
+    uri = getattr(anforderung, 'uri', None)
+    if maske and uri:
+        teile = urllib.parse.urlsplit(uri)
+        parameter = urllib.parse.parse_qsl(teile.query, keep_blank_values=True)
+        if not any(name == 'fields' for name, _ in parameter):
+            parameter.append(('fields', maske))
+            anforderung.uri = urllib.parse.urlunsplit(
+                teile._replace(query=urllib.parse.urlencode(parameter))
+            )
+    return anforderung
+
+
+def zähle_antwortbytes(anzahl, kodierung):
+    """Rechnet übertragene Antwortbytes der aktiven Google-Aktion zu."""
+    aktion = AKTIVE_GOOGLE_AKTION.get() or 'unbekannt'
+    metriken.zähle('geburtstage_google_api_antwort_bytes_total', anzahl, aktion=aktion, kodierung=kodierung)
+    profil = AKTIVES_LAUFPROFIL.get()
+    if profil is not None:
+        profil.antwort_empfangen(aktion, anzahl)
+
+
+class ZählendeAntwort(http.client.HTTPResponse):
+    """HTTP-Antwort, die ihren Inhalt so zählt, wie er über die Leitung kommt.
+
+    httplib2 entpackt gzip erst nach dem Lesen; gezählt wird also die
+    komprimierte Größe.
+    """
+
+    def read(self, amt=None):
+        inhalt = super().read(amt)
+        if inhalt:
+            zähle_antwortbytes(len(inhalt), self.getheader('content-encoding') or 'keine')
+        return inhalt
+
+
+class ZählendeHttpVerbindung(httplib2.HTTPConnectionWithTimeout):
+    response_class = ZählendeAntwort
+
+
+class ZählendeHttpsVerbindung(httplib2.HTTPSConnectionWithTimeout):
+    response_class = ZählendeAntwort
+
+
+class ZählendeHttp:
+    """Fordert komprimierte Antworten an und zählt deren Größe je Aktion.
+
+    Google liefert gzip nur, wenn zusätzlich der User-Agent ``gzip`` enthält;
+    das gilt auch für Batch-Anforderungen. Die Verbindungen lesen Antworten
+    über :class:`ZählendeAntwort`, sodass die tatsächlich übertragenen Bytes
+    gezählt werden.
+    """
+
+    VERBINDUNGEN = {'http': ZählendeHttpVerbindung, 'https': ZählendeHttpsVerbindung}
+
+    def __init__(self, http):
+        self.http = http
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        headers = dict(headers or {})
+        headers.setdefault('accept-encoding', 'gzip, deflate')
+        if 'gzip' not in headers.get('user-agent', ''):
+            headers['user-agent'] = f"{headers.get('user-agent', '')} (gzip)".lstrip()
+        if len(args) < 2 and not kwargs.get('connection_type'):
+            kwargs['connection_type'] = self.VERBINDUNGEN.get(urllib.parse.urlsplit(uri).scheme)
+        return self.http.request(uri, method, body, headers, *args, **kwargs)
+
+
+class HttpVerbindungspool:
+    """Teilt Keep-alive-Verbindungen zu Google zwischen Läufen, Sitzungen und Greenlets.
+
+    Ein ``httplib2.Http`` ist nicht für gleichzeitige Nutzung gedacht; jede
+    Anforderung leiht sich deshalb exklusiv einen Transport samt dessen offenen
+    Verbindungen je Host. Es entstehen höchstens ``größe`` Transporte, weitere
+    Anforderungen warten. Die Zugangsdaten setzt ``AuthorizedHttp`` je
+    Anforderung als Kopfzeile, daher dürfen Verbindungen nutzerübergreifend
+    wiederverwendet werden.
+    """
+
+    def __init__(self, größe, fabrik=build_http):
+        self.größe = größe
+        self.fabrik = fabrik
+        self.plätze = eventlet.semaphore.Semaphore(größe)
+        # Zuletzt genutzte Transporte zuerst, deren Verbindungen sind am ehesten offen.
+        self.frei = []
+
+    @staticmethod
+    def verbindungsschlüssel(uri):
+        """Bildet den Schlüssel, unter dem httplib2 die Verbindung zu einem Host führt."""
+        schema, host, _, _ = httplib2.urlnorm(uri)
+        return f"{schema}:{host}"
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        with self.plätze:
+            metriken.setze('geburtstage_google_http_pool_belegt', self.größe - self.plätze.counter)
+            http = self.frei.pop() if self.frei else self.fabrik()
+            schlüssel = self.verbindungsschlüssel(uri)
+            vorher = getattr(http.connections.get(schlüssel), 'sock', None)
+            try:
+                return http.request(uri, method, body, headers, *args, **kwargs)
+            finally:
+                # httplib2 baut abgelaufene Verbindungen still neu auf; dann wechselt der Socket.
+                nachher = getattr(http.connections.get(schlüssel), 'sock', None)
+                neu = vorher is None or (nachher is not None and nachher is not vorher)
+                metriken.zähle(
+                    'geburtstage_google_http_verbindungen_total',
+                    ergebnis='neu' if neu else 'wiederverwendet'
+                )
+                self.frei.append(http)
+                metriken.setze('geburtstage_google_http_pool_belegt', self.größe - self.plätze.counter - 1)
+
+    def close(self):
+        """Schließt die offenen Verbindungen aller freien Transporte."""
+        for http in list(self.frei):
+            http.close()
+
+
+google_http_pool = HttpVerbindungspool(GOOGLE_HTTP_POOL_GRÖSSE)
+
+
+def führe_google_api_aus(anforderung, aktion, kosten=1):
+    """Führt eine Google-API-Anforderung mit Wiederholungen bei kurzzeitigen Fehlern aus.
+
+    ``kosten`` gibt an, wie viele Anforderungen ein Aufruf gegenüber dem
+    gemeinsamen Ratenbegrenzer verbraucht, etwa die Teilanforderungen eines Batches.
+    """
+    mit_feldmaske(anforderung)
     versuch = 0
     while True:
+        warte_auf_kontingent(kosten)
+        beginn = time.monotonic()
+        profil = AKTIVES_LAUFPROFIL.get()
+        aktion_token = AKTIVE_GOOGLE_AKTION.set(aktion)
         try:
-            return anforderung.execute()
+            ergebnis = anforderung.execute()
         except HttpError as fehler:
+            dauer = time.monotonic() - beginn
+            if profil is not None:
+                profil.api_aufruf(aktion, dauer)
+            metriken.beobachte('geburtstage_google_api_dauer_sekunden', dauer, aktion=aktion)
+            metriken.zähle('geburtstage_google_api_aufrufe_total', aktion=aktion, ergebnis='fehler')
+            if ist_drosselung(fehler):
+                metriken.zähle('geburtstage_google_api_drosselungen_total', aktion=aktion)
+                melde_kontingent_ergebnis(gedrosselt=True)
             if warte_wegen_google_api_fehler(versuch, aktion, fehler):
                 versuch += 1
                 continue
             raise
+        finally:
+            AKTIVE_GOOGLE_AKTION.reset(aktion_token)
+        dauer = time.monotonic() - beginn
+        if profil is not None:
+            profil.api_aufruf(aktion, dauer)
+        metriken.beobachte('geburtstage_google_api_dauer_sekunden', dauer, aktion=aktion)
+        metriken.zähle('geburtstage_google_api_aufrufe_total', aktion=aktion, ergebnis='ok')
+        melde_kontingent_ergebnis(gedrosselt=False)
+        return ergebnis
+
+
+def führe_google_batch_aus(service, anforderungen, aktion):
+    """Sendet Anforderungen gebündelt und wiederholt kurzzeitig fehlgeschlagene einzeln.
+
+    ``anforderungen`` ist eine Liste aus ``(anforderungs_id, anforderung)``.
+    Zurückgegeben werden die Ergebnisse und die endgültigen Fehler je
+    Anforderungs-ID sowie die Zahl der Teilanforderungen, die Google im
+    ersten Anlauf wegen eines Rate Limits abgelehnt hat.
+    """
+    ergebnisse = {}
+    fehlgeschlagen = {}
+    if len(anforderungen) == 1:
+        anforderungs_id, anforderung = anforderungen[0]
+        try:
+            ergebnisse[anforderungs_id] = führe_google_api_aus(anforderung, aktion)
+        except HttpError as fehler:
+            fehlgeschlagen[anforderungs_id] = fehler
+        return ergebnisse, fehlgeschlagen, 0
+
+    def antwort_verarbeiten(anforderungs_id, antwort, fehler):
+        if fehler is None:
+            ergebnisse[anforderungs_id] = antwort
+            fehlgeschlagen.pop(anforderungs_id, None)
+        else:
+            fehlgeschlagen[anforderungs_id] = fehler
+
+    stapel = service.new_batch_http_request(callback=antwort_verarbeiten)
+    for anforderungs_id, anforderung in anforderungen:
+        stapel.add(mit_feldmaske(anforderung), request_id=anforderungs_id)
+    führe_google_api_aus(stapel, aktion, kosten=len(anforderungen))
+
+    gedrosselt = sum(1 for fehler in fehlgeschlagen.values() if ist_drosselung(fehler))
+    if gedrosselt:
+        melde_kontingent_ergebnis(gedrosselt=True)
+    wiederholbar = [
+        anforderungs_id for anforderungs_id, fehler in fehlgeschlagen.items()
+        if ist_wiederholbarer_google_fehler(fehler)
+    ]
+    if wiederholbar and warte_wegen_google_api_fehler(0, aktion, fehlgeschlagen[wiederholbar[0]]):
+        nach_id = dict(anforderungen)
+        for anforderungs_id in wiederholbar:
+            try:
+                ergebnisse[anforderungs_id] = führe_google_api_aus(nach_id[anforderungs_id], aktion)
+                del fehlgeschlagen[anforderungs_id]
+            except HttpError as fehler:
+                fehlgeschlagen[anforderungs_id] = fehler
+    return ergebnisse, fehlgeschlagen, gedrosselt
 
 
 def handle_sigint(sig, frame):
     """Beendet den Server geordnet, wenn Strg+C gedrückt wird."""
     emit_status("Server wird beendet...")
+    sende_alle_statuspuffer()
     socketio.stop()
     sys.exit(0)
 
 signal.signal(signal.SIGINT, handle_sigint)
 
-flows = {}
+# OAuth-State -> (Flow-Zustand, Ablaufzeitpunkt) in Anlagereihenfolge (FIFO), ohne gemeinsamen Zustand.
+flows = OrderedDict()
+
+
+def oauth_flow_zustand(flow):
+    """Reduziert einen Flow auf die Werte, die der Callback zum Neuaufbau braucht."""
+    return {
+        'redirect_uri': flow.redirect_uri,
+        'code_verifier': getattr(flow, 'code_verifier', None),
+    }
+
+
+def baue_oauth_flow(state, daten):
+    """Baut den Flow einer begonnenen Anmeldung aus seinem gespeicherten Zustand neu auf."""
+    flow = Flow.from_client_secrets_file(
+        CREDENTIALS_DATEI,
+        scopes=SCOPES,
+        state=state,
+        code_verifier=daten.get('code_verifier'),
+    )
+    flow.redirect_uri = daten['redirect_uri']
+    return flow
+
+
+def merke_oauth_flow(state, flow):
+    """Legt den Zustand eines begonnenen OAuth-Flows ab und verdrängt die ältesten.
+
+    Verdrängt wird nach Anlagezeitpunkt (FIFO), nicht nach letztem Zugriff: Ein
+    Flow wird nur einmal im Callback gelesen und danach vergessen, und bei
+    gleicher Lebensdauer entspricht die Anlagereihenfolge der Ablaufreihenfolge.
+    """
+    daten = oauth_flow_zustand(flow)
+    if geteilter_zustand is not None:
+        geteilter_zustand.merke_flow(state, daten)
+        return
+    flows[state] = (daten, time.monotonic() + OAUTH_FLOW_MAX_ALTER_SEKUNDEN)
+    flows.move_to_end(state)
+    while len(flows) > OAUTH_FLOW_MAX_ANZAHL:
+        flows.popitem(last=False)
+        metriken.zähle('geburtstage_oauth_flows_entfernt_total', grund='verdraengt')
+
+
+def hole_oauth_flow(state):
+    """Liefert den OAuth-Flow zu ``state``, solange seine Lebensdauer läuft.
+
+    Ein Treffer ändert die Verdrängungsreihenfolge nicht (FIFO).
+    """
+    if geteilter_zustand is not None:
+        daten = geteilter_zustand.hole_flow(state, OAUTH_FLOW_MAX_ALTER_SEKUNDEN)
+    else:
+        daten, ablauf = flows.get(state, (None, None))
+        if daten is not None and ablauf < time.monotonic():
+            flows.pop(state, None)
+            metriken.zähle('geburtstage_oauth_flows_entfernt_total', grund='abgelaufen')
+            daten = None
+    if daten is None:
+        return None
+    return baue_oauth_flow(state, daten)
+
+
+def vergiss_oauth_flow(state):
+    if geteilter_zustand is None:
+        flows.pop(state, None)
+        return
+    geteilter_zustand.vergiss_flow(state)
+
+
+def bereinige_oauth_flows():
+    """Entfernt abgelaufene OAuth-Flows und liefert ihre Zahl."""
+    if geteilter_zustand is not None:
+        abgelaufen, verdrängt = geteilter_zustand.bereinige_flows(
+            OAUTH_FLOW_MAX_ALTER_SEKUNDEN, OAUTH_FLOW_MAX_ANZAHL
+        )
+        metriken.zähle('geburtstage_oauth_flows_entfernt_total', verdrängt, grund='verdraengt')
+    else:
+        # Gleiche Lebensdauer für alle: die abgelaufenen stehen vorne.
+        jetzt = time.monotonic()
+        abgelaufen = 0
+        while flows and next(iter(flows.values()))[1] < jetzt:
+            flows.popitem(last=False)
+            abgelaufen += 1
+    metriken.zähle('geburtstage_oauth_flows_entfernt_total', abgelaufen, grund='abgelaufen')
+    return abgelaufen
+
+
+def oauth_flow_bereinigung_im_hintergrund():
+    """Räumt verlassene Google-Anmeldungen regelmäßig ab."""
+    while True:
+        bereinige_oauth_flows()
+        eventlet.sleep(OAUTH_FLOW_BEREINIGUNGSINTERVALL_SEKUNDEN)
+
+
+def anzahl_oauth_flows():
+    if geteilter_zustand is not None:
+        return geteilter_zustand.anzahl_flows()
+    return len(flows)
 
 
 def aktuelle_sitzungs_id():
@@ -242,18 +1273,166 @@ def csrf_token_ist_gueltig():
 
 
 def starte_synchronisation_für_sitzung(sitzungs_id):
-    """Merkt, dass für diese Browser-Sitzung bereits ein Lauf aktiv ist."""
+    """Merkt, dass für diese Browser-Sitzung bereits ein Lauf aktiv ist.
+
+    Mit ``GETEILTER_ZUSTAND_DATEI`` gilt die Sperre für alle Worker-Prozesse.
+    """
     with synchronisations_sperre:
         if sitzungs_id in laufende_synchronisationen:
             return False
+        if geteilter_zustand is not None and not geteilter_zustand.sperre(
+            sitzungs_id, SYNC_SPERRE_MAX_ALTER_SEKUNDEN
+        ):
+            return False
         laufende_synchronisationen.add(sitzungs_id)
+        if geteilter_zustand is not None:
+            sperren_erneuerung[sitzungs_id] = eventlet.spawn(erneuere_sync_sperre, sitzungs_id)
         return True
 
 
+def erneuere_sync_sperre(sitzungs_id):
+    """Hält die geteilte Sperre eines Laufs frisch, auch wenn er Stunden dauert.
+
+    Läuft, bis :func:`beende_synchronisation_für_sitzung` das Greenlet beendet;
+    bricht der Worker ab, bleiben die Erneuerungen aus und die Sperre verfällt.
+    """
+    while True:
+        eventlet.sleep(SYNC_SPERRE_ERNEUERUNG_SEKUNDEN)
+        try:
+            geteilter_zustand.erneuere_sperre(sitzungs_id)
+        except sqlite3.Error:
+            print("Sync-Sperre konnte nicht erneuert werden.", flush=True)
+
+
 def beende_synchronisation_für_sitzung(sitzungs_id):
     """Gibt den Synchronisationsstart für diese Browser-Sitzung wieder frei."""
     with synchronisations_sperre:
         laufende_synchronisationen.discard(sitzungs_id)
+        erneuerung = sperren_erneuerung.pop(sitzungs_id, None)
+        if erneuerung is not None:
+            erneuerung.kill()
+        if geteilter_zustand is not None:
+            geteilter_zustand.gib_frei(sitzungs_id)
+
+
+def synchronisation_läuft_anderswo(sitzungs_id):
+    """Prüft, ob ein anderer Worker-Prozess gerade für diese Sitzung synchronisiert."""
+    return (
+        geteilter_zustand is not None
+        and sitzungs_id not in laufende_synchronisationen
+        and geteilter_zustand.ist_gesperrt(sitzungs_id, SYNC_SPERRE_MAX_ALTER_SEKUNDEN)
+    )
+
+
+def uhrzeit_für(zeitpunkt):
+    """Formatiert einen Unix-Zeitpunkt als deutsche Uhrzeit."""
+    return datetime.datetime.fromtimestamp(zeitpunkt, ANZEIGE_ZEITZONE).strftime('%H:%M:%S Uhr')
+
+
+class SyncPlaner:
+    """Begrenzt gleichzeitige Synchronisationen und reiht weitere Läufe ein.
+
+    Jede Sitzung hat höchstens einen Lauf (siehe ``laufende_synchronisationen``),
+    daher ist die FIFO-Warteschlange zugleich fair zwischen den Sitzungen.
+    Wartende Browser erhalten ihre Position und einen geschätzten Startzeitpunkt.
+    """
+
+    def __init__(self, max_parallel):
+        self.max_parallel = max(1, max_parallel)
+        self.warteschlange = deque()
+        self.aktiv = {}
+        self.laufzeiten = deque(maxlen=20)
+
+    def mittlere_laufzeit(self):
+        if not self.laufzeiten:
+            return SYNC_STANDARD_LAUFZEIT_SEKUNDEN
+        return sum(self.laufzeiten) / len(self.laufzeiten)
+
+    def position(self, sitzungs_id):
+        """Liefert die Warteposition ab 1 oder 0, wenn die Sitzung nicht wartet."""
+        for position, (wartende_sitzung, _) in enumerate(self.warteschlange, start=1):
+            if wartende_sitzung == sitzungs_id:
+                return position
+        return 0
+
+    def geschätzter_start(self, position):
+        """Schätzt den Startzeitpunkt einer Warteposition aus den letzten Laufzeiten."""
+        jetzt = time.time()
+        if position <= 0:
+            return jetzt
+        laufzeit = self.mittlere_laufzeit()
+        frei = sorted(max(0.0, start + laufzeit - jetzt) for start in self.aktiv.values())
+        frei += [0.0] * (self.max_parallel - len(frei))
+        runde, platz = divmod(position - 1, self.max_parallel)
+        return jetzt + frei[platz] + runde * laufzeit
+
+    def melde_position(self, sitzungs_id, position):
+        emit_status(
+            f"⏳ Synchronisation wartet: Position {position} in der Warteschlange, "
+            f"voraussichtlicher Start gegen {uhrzeit_für(self.geschätzter_start(position))}.",
+            sitzungs_id=sitzungs_id
+        )
+
+    def reihe_ein(self, sitzungs_id, aufgabe):
+        """Startet die Aufgabe sofort oder reiht sie ein; liefert die Warteposition."""
+        self.warteschlange.append((sitzungs_id, aufgabe))
+        self.starte_wartende()
+        position = self.position(sitzungs_id)
+        if position:
+            self.melde_position(sitzungs_id, position)
+        return position
+
+    def starte_wartende(self):
+        gestartet = False
+        while self.warteschlange and len(self.aktiv) < self.max_parallel:
+            sitzungs_id, aufgabe = self.warteschlange.popleft()
+            self.aktiv[sitzungs_id] = time.time()
+            socketio.start_background_task(self.führe_aus, sitzungs_id, aufgabe)
+            gestartet = True
+        if gestartet:
+            for position, (sitzungs_id, _) in enumerate(self.warteschlange, start=1):
+                self.melde_position(sitzungs_id, position)
+
+    def führe_aus(self, sitzungs_id, aufgabe):
+        try:
+            aufgabe()
+        finally:
+            start = self.aktiv.pop(sitzungs_id, None)
+            if start is not None:
+                self.laufzeiten.append(time.time() - start)
+            self.starte_wartende()
+
+    def entferne(self, sitzungs_id):
+        """Nimmt einen noch nicht gestarteten Lauf aus der Warteschlange."""
+        for eintrag in list(self.warteschlange):
+            if eintrag[0] == sitzungs_id:
+                self.warteschlange.remove(eintrag)
+                return True
+        return False
+
+    def status(self, sitzungs_id):
+        position = self.position(sitzungs_id)
+        if sitzungs_id in self.aktiv:
+            zustand = 'läuft'
+        elif position:
+            zustand = 'wartet'
+        else:
+            zustand = 'inaktiv'
+        antwort = {
+            'zustand': zustand,
+            'aktiv': len(self.aktiv),
+            'wartend': len(self.warteschlange),
+            'max_parallel': self.max_parallel,
+        }
+        if position:
+            antwort['position'] = position
+            antwort['geschätzter_start'] = datetime.datetime.fromtimestamp(
+                self.geschätzter_start(position), ANZEIGE_ZEITZONE
+            ).isoformat(timespec='seconds')
+        return antwort
+
+
+sync_planer = SyncPlaner(SYNC_MAX_PARALLEL)
 
 
 def sicherer_dateiname(wert):
@@ -261,9 +1440,206 @@ def sicherer_dateiname(wert):
     return ''.join(zeichen for zeichen in wert if zeichen.isalnum() or zeichen in ('-', '_'))
 
 
-def token_pfad():
-    sitzungs_id = sicherer_dateiname(aktuelle_sitzungs_id())
-    return os.path.join(TOKEN_SPEICHER_DIR, f"{sitzungs_id}.json")
+class TokenSpeicher:
+    """OAuth-Daten und Synchronisationsmarken in einer SQLite-Datei mit Ablaufindex.
+
+    Nachschlagen erfolgt über den Primärschlüssel der Sitzung, abgelaufene
+    Einträge findet die Bereinigung über einen Index auf dem Nutzungszeitpunkt.
+    Alte Token-Dateien aus ``TOKEN_SPEICHER_DIR`` werden einmalig beim Anlegen
+    des Speichers übernommen und anschließend gelöscht.
+    """
+
+    # Nutzungszeitpunkte werden höchstens so oft aktualisiert.
+    NUTZUNG_AKTUALISIEREN_SEKUNDEN = 60 * 60
+
+    def __init__(self, verzeichnis):
+        self.verzeichnis = verzeichnis
+        self.pfad = os.path.join(verzeichnis, 'tokens.sqlite3')
+        self.verbindung = None
+        # Das Verzeichnis wird nur hier einmal nach Dateien älterer Versionen durchsucht.
+        if self.hat_alte_dateien():
+            self.verbinde(anlegen=True)
+            self.übernimm_alte_dateien()
+
+    def verbinde(self, anlegen=False):
+        """Öffnet die Datenbank; ohne ``anlegen`` nur, wenn sie bereits existiert."""
+        if self.verbindung is not None:
+            return self.verbindung
+        if not anlegen and not os.path.exists(self.pfad):
+            return None
+
+        os.makedirs(self.verzeichnis, mode=0o700, exist_ok=True)
+        os.chmod(self.verzeichnis, 0o700)
+        neu = not os.path.exists(self.pfad)
+        verbindung = KooperativeSqliteVerbindung.öffne(self.pfad)
+        if neu:
+            os.chmod(self.pfad, 0o600)
+        verbindung.execute('PRAGMA journal_mode=WAL')
+        verbindung.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS zugangsdaten (
+                sitzung TEXT PRIMARY KEY,
+                daten TEXT NOT NULL,
+                genutzt REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS zugangsdaten_genutzt ON zugangsdaten (genutzt);
+            CREATE TABLE IF NOT EXISTS sitzungszustand (
+                sitzung TEXT PRIMARY KEY,
+                daten TEXT NOT NULL,
+                genutzt REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sitzungszustand_genutzt ON sitzungszustand (genutzt);
+            """
+        )
+        self.verbindung = verbindung
+        return verbindung
+
+    def hat_alte_dateien(self):
+        try:
+            return any(name.endswith('.json') for name in os.listdir(self.verzeichnis))
+        except OSError:
+            return False
+
+    def übernimm_alte_dateien(self):
+        """Überführt Token-Dateien des früheren Verzeichnisformats in die Datenbank."""
+        try:
+            einträge = list(os.scandir(self.verzeichnis))
+        except OSError:
+            return
+        for eintrag in einträge:
+            if not eintrag.name.endswith('.json') or not eintrag.is_file(follow_symlinks=False):
+                continue
+            tabelle = 'sitzungszustand' if eintrag.name.endswith('.zustand.json') else 'zugangsdaten'
+            sitzung = eintrag.name.split('.', 1)[0]
+            try:
+                with open(eintrag.path, 'r', encoding='utf-8') as datei:
+                    daten = datei.read()
+                genutzt = eintrag.stat(follow_symlinks=False).st_mtime
+                self.verbindung.execute(
+                    f"INSERT OR IGNORE INTO {tabelle} (sitzung, daten, genutzt) VALUES (?, ?, ?)",
+                    (sitzung, daten, genutzt)
+                )
+                os.remove(eintrag.path)
+            except OSError:
+                continue
+
+    def lade(self, sitzung, tabelle='zugangsdaten', als_nutzung=True):
+        """Liest einen Eintrag; ``als_nutzung=False`` verlängert seine Aufbewahrung nicht."""
+        verbindung = self.verbinde()
+        if verbindung is None:
+            return None
+        zeile = verbindung.execute(
+            f"SELECT daten, genutzt FROM {tabelle} WHERE sitzung = ?", (sitzung,)
+        ).fetchone()
+        if zeile is None:
+            return None
+        jetzt = time.time()
+        if als_nutzung and zeile[1] < jetzt - self.NUTZUNG_AKTUALISIEREN_SEKUNDEN:
+            verbindung.execute(
+                f"UPDATE {tabelle} SET genutzt = ? WHERE sitzung = ?", (jetzt, sitzung)
+            )
+        return zeile[0]
+
+    def speichere(self, sitzung, daten, tabelle='zugangsdaten'):
+        self.verbinde(anlegen=True).execute(
+            f"INSERT OR REPLACE INTO {tabelle} (sitzung, daten, genutzt) VALUES (?, ?, ?)",
+            (sitzung, daten, time.time())
+        )
+
+    def aktualisiere(self, sitzung, daten, tabelle='zugangsdaten'):
+        """Ersetzt die Daten eines Eintrags, ohne seinen Nutzungszeitpunkt zu ändern."""
+        verbindung = self.verbinde()
+        if verbindung is None:
+            return
+        verbindung.execute(f"UPDATE {tabelle} SET daten = ? WHERE sitzung = ?", (daten, sitzung))
+
+    def automatik_kandidaten(self):
+        """Liefert Sitzung, Sitzungszustand (JSON oder ``None``) und Nutzung aller Zugänge."""
+        verbindung = self.verbinde()
+        if verbindung is None:
+            return []
+        return verbindung.execute(
+            "SELECT z.sitzung, s.daten, z.genutzt FROM zugangsdaten z "
+            "LEFT JOIN sitzungszustand s ON s.sitzung = z.sitzung"
+        ).fetchall()
+
+    def existiert(self, sitzung):
+        verbindung = self.verbinde()
+        if verbindung is None:
+            return False
+        return verbindung.execute(
+            "SELECT 1 FROM zugangsdaten WHERE sitzung = ?", (sitzung,)
+        ).fetchone() is not None
+
+    def lösche(self, sitzung):
+        verbindung = self.verbinde()
+        if verbindung is None:
+            return False
+        verbindung.execute("DELETE FROM sitzungszustand WHERE sitzung = ?", (sitzung,))
+        return verbindung.execute(
+            "DELETE FROM zugangsdaten WHERE sitzung = ?", (sitzung,)
+        ).rowcount > 0
+
+    def bereinige(self, grenzwert):
+        """Löscht alle Einträge, die vor ``grenzwert`` zuletzt genutzt wurden.
+
+        Liefert die Schlüssel der gelöschten Zugangsdaten.
+        """
+        verbindung = self.verbinde()
+        if verbindung is None:
+            return []
+        verbindung.execute("DELETE FROM sitzungszustand WHERE genutzt < ?", (grenzwert,))
+        abgelaufen = [
+            zeile[0] for zeile in verbindung.execute(
+                "SELECT sitzung FROM zugangsdaten WHERE genutzt < ?", (grenzwert,)
+            )
+        ]
+        verbindung.execute("DELETE FROM zugangsdaten WHERE genutzt < ?", (grenzwert,))
+        return abgelaufen
+
+    def anzahl(self):
+        verbindung = self.verbinde()
+        if verbindung is None:
+            return 0
+        return verbindung.execute("SELECT COUNT(*) FROM zugangsdaten").fetchone()[0]
+
+
+token_speicher_instanzen = {}
+
+
+def token_speicher():
+    """Liefert den Token-Speicher des konfigurierten Verzeichnisses."""
+    speicher = token_speicher_instanzen.get(TOKEN_SPEICHER_DIR)
+    if speicher is None:
+        speicher = TokenSpeicher(TOKEN_SPEICHER_DIR)
+        token_speicher_instanzen[TOKEN_SPEICHER_DIR] = speicher
+    return speicher
+
+
+def token_schlüssel():
+    """Liefert den Speicherschlüssel der aktuellen Browser-Sitzung."""
+    return sicherer_dateiname(aktuelle_sitzungs_id())
+
+
+def lade_sitzungszustand(sitzungs_id):
+    """Liest die Synchronisationsmarken einer Sitzung; sie enthalten keine Kontaktdaten."""
+    if not sitzungs_id:
+        return {}
+    try:
+        daten = token_speicher().lade(sicherer_dateiname(sitzungs_id), 'sitzungszustand')
+        zustand = json.loads(daten) if daten else {}
+    except (sqlite3.Error, ValueError):
+        return {}
+    return zustand if isinstance(zustand, dict) else {}
+
+
+def speichere_sitzungszustand(sitzungs_id, **werte):
+    """Ergänzt die Synchronisationsmarken einer Sitzung im Token-Speicher."""
+    if not sitzungs_id:
+        return
+    zustand = lade_sitzungszustand(sitzungs_id)
+    zustand.update(werte)
+    token_speicher().speichere(sicherer_dateiname(sitzungs_id), json.dumps(zustand), 'sitzungszustand')
 
 
 def zugangsdaten_als_json(creds):
@@ -293,68 +1669,128 @@ def normalisiere_oauth_bereiche(wert):
     return set()
 
 
+def merke_zugangsdaten(schlüssel, creds):
+    """Legt Zugangsdaten im begrenzten Zwischenspeicher ab und verdrängt die ältesten."""
+    zugangsdaten_cache[schlüssel] = (creds, time.monotonic() + ZUGANGSDATEN_CACHE_TTL_SEKUNDEN)
+    zugangsdaten_cache.move_to_end(schlüssel)
+    while len(zugangsdaten_cache) > ZUGANGSDATEN_CACHE_GRÖSSE:
+        zugangsdaten_cache.popitem(last=False)
+
+
+def zugangsdaten_aus_cache(schlüssel):
+    """Liefert zwischengespeicherte Zugangsdaten, solange ihre Lebensdauer läuft."""
+    eintrag = zugangsdaten_cache.get(schlüssel)
+    if eintrag is None:
+        return None
+    creds, ablauf = eintrag
+    if ablauf < time.monotonic():
+        zugangsdaten_cache.pop(schlüssel, None)
+        return None
+    merke_zugangsdaten(schlüssel, creds)
+    return creds
+
+
 def speichere_zugangsdaten(creds):
     """Speichert OAuth-Zugangsdaten serverseitig statt im Browser-Cookie."""
-    os.makedirs(TOKEN_SPEICHER_DIR, mode=0o700, exist_ok=True)
-    os.chmod(TOKEN_SPEICHER_DIR, 0o700)
-    pfad = token_pfad()
-    temporaerer_pfad = f"{pfad}.tmp"
-    with open(temporaerer_pfad, 'w', encoding='utf-8') as datei:
-        datei.write(zugangsdaten_als_json(creds))
-    os.chmod(temporaerer_pfad, 0o600)
-    os.replace(temporaerer_pfad, pfad)
+    schlüssel = token_schlüssel()
+    token_speicher().speichere(schlüssel, zugangsdaten_als_json(creds))
+    merke_zugangsdaten(schlüssel, creds)
 
 
 def lösche_zugangsdaten():
     """Entfernt beschädigte oder abgelaufene serverseitige OAuth-Daten."""
-    try:
-        os.remove(token_pfad())
-        return True
-    except FileNotFoundError:
-        return False
+    schlüssel = token_schlüssel()
+    zugangsdaten_cache.pop(schlüssel, None)
+    return token_speicher().lösche(schlüssel)
 
 
-def bereinige_token_speicher():
-    """Löscht OAuth-Dateien nach der festgelegten Inaktivitätsfrist."""
-    if not os.path.isdir(TOKEN_SPEICHER_DIR):
-        return 0
+def sekunden_bis_ablauf(creds):
+    """Liefert die Restlaufzeit eines Zugriffstokens oder ``None`` ohne Ablaufzeit."""
+    if not creds.expiry:
+        return None
+    return (creds.expiry - datetime.datetime.utcnow()).total_seconds()
 
-    grenzwert = time.time() - (OAUTH_TOKEN_AUFBEWAHRUNG_TAGE * 24 * 60 * 60)
-    gelöscht = 0
-    try:
-        einträge = list(os.scandir(TOKEN_SPEICHER_DIR))
-    except OSError:
-        return 0
 
-    for eintrag in einträge:
-        if not eintrag.name.endswith('.json') or not eintrag.is_file(follow_symlinks=False):
+def erneuere_zugangsdaten_vorab():
+    """Erneuert zwischengespeicherte Zugriffstokens kurz vor ihrem Ablauf.
+
+    Liefert die Zahl der erneuerten Tokens. Fehlgeschlagene Erneuerungen
+    bleiben unbehandelt; ``get_services`` fordert dann wie bisher eine neue
+    Anmeldung an.
+    """
+    erneuert = 0
+    jetzt = time.monotonic()
+    for schlüssel, (creds, ablauf) in list(zugangsdaten_cache.items()):
+        if ablauf < jetzt:
+            zugangsdaten_cache.pop(schlüssel, None)
+            continue
+        restlaufzeit = sekunden_bis_ablauf(creds)
+        if not creds.refresh_token or restlaufzeit is None or restlaufzeit > TOKEN_VORAB_ERNEUERN_SEKUNDEN:
             continue
         try:
-            if eintrag.stat(follow_symlinks=False).st_mtime < grenzwert:
-                os.remove(eintrag.path)
-                gelöscht += 1
-        except (FileNotFoundError, OSError):
+            creds.refresh(GoogleAuthRequest())
+        except Exception:
+            continue
+        # Während der Erneuerung gelöschte Zugänge bleiben gelöscht; das Schreiben
+        # zählt außerdem nicht als Nutzung für die Aufbewahrungsfrist.
+        if zugangsdaten_cache.get(schlüssel, (None,))[0] is not creds:
+            continue
+        try:
+            token_speicher().aktualisiere(schlüssel, zugangsdaten_als_json(creds))
+        except (OSError, sqlite3.Error):
             continue
-    return gelöscht
+        erneuert += 1
+    return erneuert
+
+
+def zugangsdaten_erneuerung_im_hintergrund():
+    """Hält Zugriffstokens aktiver Sitzungen frisch, damit /sync nicht darauf wartet."""
+    while True:
+        erneuere_zugangsdaten_vorab()
+        eventlet.sleep(TOKEN_ERNEUERUNGSINTERVALL_SEKUNDEN)
+
+
+def bereinige_token_speicher():
+    """Löscht OAuth-Daten nach der festgelegten Inaktivitätsfrist."""
+    grenzwert = time.time() - (OAUTH_TOKEN_AUFBEWAHRUNG_TAGE * 24 * 60 * 60)
+    try:
+        abgelaufen = token_speicher().bereinige(grenzwert)
+    except (OSError, sqlite3.Error):
+        return 0
+    # Gelöschte Zugänge dürfen auch aus dem Arbeitsspeicher nicht mehr nutzbar sein.
+    for schlüssel in abgelaufen:
+        zugangsdaten_cache.pop(schlüssel, None)
+    return len(abgelaufen)
 
 
 def token_bereinigung_im_hintergrund():
     """Bereinigt den Token-Speicher regelmäßig während des Serverbetriebs."""
     while True:
-        bereinige_token_speicher()
+        beginn = time.monotonic()
+        metriken.zähle('geburtstage_token_bereinigt_total', bereinige_token_speicher())
+        metriken.setze('geburtstage_token_bereinigung_dauer_sekunden', time.monotonic() - beginn)
+        bereinige_kalender_schnappschüsse()
+        bereinige_ratenbegrenzer()
         eventlet.sleep(TOKEN_BEREINIGUNGSINTERVALL_SEKUNDEN)
 
 
 def lade_zugangsdaten():
     """Lädt OAuth-Zugangsdaten aus dem serverseitigen Token-Speicher."""
     session.pop('creds', None)
-    pfad = token_pfad()
-    if not os.path.exists(pfad):
+    schlüssel = token_schlüssel()
+    zugangsdaten = zugangsdaten_aus_cache(schlüssel)
+    if zugangsdaten is not None:
+        # Ein anderer Worker kann den Zugang inzwischen gelöscht haben.
+        if geteilter_zustand is None or token_speicher().existiert(schlüssel):
+            return zugangsdaten
+        zugangsdaten_cache.pop(schlüssel, None)
         return None
 
     try:
-        with open(pfad, 'r', encoding='utf-8') as datei:
-            daten = json.load(datei)
+        gespeichert = token_speicher().lade(schlüssel)
+        if gespeichert is None:
+            return None
+        daten = json.loads(gespeichert)
         gespeicherte_bereiche = normalisiere_oauth_bereiche(
             daten.get('scopes') or daten.get('scope')
         )
@@ -366,9 +1802,9 @@ def lade_zugangsdaten():
             lösche_zugangsdaten()
             return None
         zugangsdaten = Credentials.from_authorized_user_info(daten, SCOPES)
-        os.utime(pfad, None)
+        merke_zugangsdaten(schlüssel, zugangsdaten)
         return zugangsdaten
-    except (OSError, ValueError, json.JSONDecodeError) as exc:
+    except (OSError, ValueError, sqlite3.Error) as exc:
         emit_status(f"⚠️ Gespeicherte OAuth-Zugangsdaten konnten nicht gelesen werden: {exc}")
         lösche_zugangsdaten()
         return None
@@ -377,7 +1813,6 @@ def lade_zugangsdaten():
 @app.before_request
 def bereite_sitzung_vor():
     """Stellt Sitzungs-ID und CSRF-Token bereit, ohne OAuth-Daten ins Cookie zu legen."""
-    bereinige_token_speicher()
     aktuelle_sitzungs_id()
     hole_csrf_token()
     session.pop('creds', None)
@@ -386,9 +1821,29 @@ def bereite_sitzung_vor():
 @socketio.on('connect')
 def websocket_verbinden():
     """Verbindet den Browser mit seinem privaten Status-Raum."""
+    metriken.zähle('geburtstage_socketio_verbindungen')
     sitzungs_id = session.get('sitzungs_id')
     if sitzungs_id:
         join_room(sitzungs_id)
+        melde_automatik_bericht(sitzungs_id)
+
+
+def melde_automatik_bericht(sitzungs_id):
+    """Zeigt das Ergebnis eines geplanten Laufs beim nächsten Besuch einmalig an."""
+    try:
+        bericht = lade_sitzungszustand(sitzungs_id).get('automatik_bericht')
+        if not bericht:
+            return
+        speichere_sitzungszustand(sitzungs_id, automatik_bericht=None)
+    except (OSError, sqlite3.Error):
+        return
+    zeitpunkt = datetime.datetime.fromtimestamp(bericht['zeit'], ANZEIGE_ZEITZONE).strftime('%d.%m.%Y %H:%M Uhr')
+    emit_status(f"{bericht['meldung']} (Lauf vom {zeitpunkt})", sitzungs_id=sitzungs_id)
+
+
+@socketio.on('disconnect')
+def websocket_trennen():
+    metriken.zähle('geburtstage_socketio_verbindungen', -1)
 
 
 def get_redirect_uri():
@@ -402,6 +1857,44 @@ def get_redirect_uri():
     return uri
 
 
+def dienstvorlage(name, version):
+    """Liefert die geteilte Dienstvorlage aus dem mitgelieferten Discovery-Dokument.
+
+    Das Dokument wird nur beim ersten Zugriff gelesen und geparst; die
+    Vorlage selbst trägt keine Zugangsdaten.
+    """
+    schlüssel = (name, version)
+    vorlage = dienstvorlagen.get(schlüssel)
+    if vorlage is None:
+        pfad = os.path.join(DISCOVERY_DIR, f"{name}.{version}.json")
+        with open(pfad, 'r', encoding='utf-8') as datei:
+            dokument = json.load(datei)
+        vorlage = build_from_document(dokument, http=build_http())
+        dienstvorlagen[schlüssel] = vorlage
+    return vorlage
+
+
+def lade_dienstvorlagen():
+    """Parst die Discovery-Dokumente einmalig beim Serverstart."""
+    for name, version in (('people', 'v1'), ('calendar', 'v3')):
+        dienstvorlage(name, version)
+
+
+def dienst_für(name, version, creds):
+    """Erzeugt einen Dienst für die Zugangsdaten aus der geteilten Vorlage.
+
+    Schema, Modell und Beschreibung werden geteilt; nur die HTTP-Verbindung
+    mit den Zugangsdaten und die Methodenbindungen sind pro Dienst neu. Die
+    Verbindungen selbst stammen aus dem gemeinsamen :data:`google_http_pool`;
+    gzip wird angefordert und die Antwortgröße je Aktion gezählt.
+    """
+    zustand = dienstvorlage(name, version).__getstate__()
+    zustand['_http'] = ZählendeHttp(AuthorizedHttp(creds, http=google_http_pool))
+    dienst = Resource.__new__(Resource)
+    dienst.__setstate__(zustand)
+    return dienst
+
+
 def get_services():
     creds = lade_zugangsdaten()
 
@@ -423,12 +1916,12 @@ def get_services():
             access_type='offline',
             hl='en'
         )
-        flows[state] = flow
+        merke_oauth_flow(state, flow)
         session['oauth_state'] = state
         return None, None, auth_url
 
-    people_service = build('people', 'v1', credentials=creds)
-    calendar_service = build('calendar', 'v3', credentials=creds)
+    people_service = dienst_für('people', 'v1', creds)
+    calendar_service = dienst_für('calendar', 'v3', creds)
     return people_service, calendar_service, None
 
 
@@ -451,16 +1944,53 @@ def widerrufe_google_zugang(zugangsdaten):
     except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError):
         return False
 
-def get_or_create_calendar(service, name="Geburtstage"):
+def gemerkter_kalender_gültig(service, kalender_id, name="Geburtstage"):
+    """Prüft mit einem einzelnen Aufruf, ob die gemerkte ID noch den Zielkalender bezeichnet."""
+    try:
+        kalender = führe_google_api_aus(
+            service.calendars().get(calendarId=kalender_id, fields='id,summary'),
+            'Prüfen des gemerkten Kalenders'
+        )
+    except HttpError as fehler:
+        # Gelöschte oder nicht mehr freigegebene Kalender werden neu gesucht.
+        if google_fehler_status(fehler) in (403, 404, 410):
+            return False
+        raise
+    return (kalender.get('summary') or '').lower() == name.lower()
+
+
+def finde_kalender(service, name="Geburtstage", bekannte_id=None):
+    """Liefert die ID des Zielkalenders oder ``None``, ohne ihn anzulegen.
+
+    Eine aus dem letzten Lauf bekannte ID wird nur bestätigt; andernfalls wird die
+    Kalenderliste seitenweise und mit minimaler Feldauswahl durchsucht.
+    """
+    if bekannte_id and gemerkter_kalender_gültig(service, bekannte_id, name):
+        return bekannte_id
+    page_token = None
+    while True:
+        seite = führe_google_api_aus(
+            service.calendarList().list(
+                maxResults=250,
+                pageToken=page_token,
+                fields='items(id,summary),nextPageToken'
+            ),
+            'Abrufen der Kalenderliste'
+        )
+        for cal in seite.get('items', []):
+            if (cal.get('summary') or '').lower() == name.lower():
+                return cal['id']
+        page_token = seite.get('nextPageToken')
+        if not page_token:
+            return None
+
+
+def get_or_create_calendar(service, name="Geburtstage", bekannte_id=None):
     emit_status(f"Suche nach Kalender '{name}'...")
-    calendars = führe_google_api_aus(
-        service.calendarList().list(),
-        'Abrufen der Kalenderliste'
-    )
-    for cal in calendars.get('items', []):
-        if cal['summary'].lower() == name.lower():
-            emit_status("Kalender bereits vorhanden.")
-            return cal['id']
+    kalender_id = finde_kalender(service, name, bekannte_id)
+    if kalender_id:
+        emit_status("Kalender bereits vorhanden.")
+        return kalender_id
 
     emit_status("Kalender nicht gefunden – wird erstellt.")
     new_cal = {'summary': name, 'timeZone': 'Europe/Berlin'}
@@ -470,202 +2000,861 @@ def get_or_create_calendar(service, name="Geburtstage"):
     )
     return created['id']
 
-def clear_calendar(service, calendar_id):
-    """Entfernt alle Ereignisse aus dem angegebenen Kalender."""
-    emit_status("Lösche vorhandene Einträge im Kalender...")
+def lese_kalenderseiten(calendar_service, calendar_id, aktion, sync_token=None):
+    """Liest den Zielkalender vollständig oder nur die Änderungen seit ``sync_token``.
+
+    Liefert die gelesenen Ereignisse und das Sync-Token für den nächsten Lauf.
+    """
+    ereignisse = []
     page_token = None
-    deleted_any = False
+    nächster_sync_token = None
     while True:
-        try:
-            events = führe_google_api_aus(
-                service.events().list(
-                    calendarId=calendar_id,
-                    pageToken=page_token,
-                    maxResults=2500,
-                ),
-                'Abrufen der Kalenderereignisse'
-            )
-        except HttpError as e:
-            emit_status(f"❌ Fehler beim Abrufen der Kalenderereignisse: {e}")
-            raise
-
-        for ev in events.get('items', []):
-            while True:
-                try:
-                    führe_google_api_aus(
-                        service.events().delete(calendarId=calendar_id, eventId=ev['id']),
-                        'Löschen eines Kalenderereignisses'
-                    )
-                    deleted_any = True
-                    time.sleep(0.1)
-                    break
-                except HttpError as e:
-                    status = google_fehler_status(e)
-                    emit_status(f"❌ Fehler beim Löschen eines Kalenderereignisses (HTTP {status}).")
-                    break
-
-        page_token = events.get('nextPageToken')
+        parameter = {'calendarId': calendar_id, 'maxResults': 2500, 'pageToken': page_token}
+        if sync_token:
+            parameter['syncToken'] = sync_token
+        seite = führe_google_api_aus(calendar_service.events().list(**parameter), aktion)
+        ereignisse.extend(seite.get('items', []))
+        nächster_sync_token = seite.get('nextSyncToken', nächster_sync_token)
+        page_token = seite.get('nextPageToken')
         if not page_token:
             break
+    return ereignisse, nächster_sync_token
 
-    if deleted_any:
+
+def schnappschuss_eintrag(ereignis):
+    """Behält nur die Termin-Felder, die Abgleich und Dublettenprüfung benötigen."""
+    return {
+        feld: ereignis[feld]
+        for feld in ('id', 'summary', 'start', 'end', 'description', 'extendedProperties')
+        if feld in ereignis
+    }
+
+
+def bereinige_kalender_schnappschüsse():
+    """Verwirft Kalender-Schnappschüsse, die länger nicht genutzt wurden."""
+    grenzwert = time.monotonic() - KALENDER_SCHNAPPSCHUSS_MAX_ALTER_SEKUNDEN
+    for sitzungs_id, schnappschuss in list(kalender_schnappschüsse.items()):
+        if schnappschuss['genutzt'] < grenzwert:
+            kalender_schnappschüsse.pop(sitzungs_id, None)
+
+
+def lese_kalenderereignisse(calendar_service, calendar_id, aktion, sitzungs_id=None):
+    """Liefert alle (Serien-)Ereignisse des Zielkalenders.
+
+    Pro Sitzung bleibt ein Schnappschuss mit Calendar-Sync-Token im
+    Arbeitsspeicher, sodass spätere Läufe nur Änderungen abrufen. Lehnt
+    Google das Token ab (410 Gone), wird der Kalender vollständig gelesen.
+    """
+    sitzungs_id = sitzungs_id or AKTIVE_STATUS_SITZUNG.get()
+    schnappschuss = kalender_schnappschüsse.get(sitzungs_id) if sitzungs_id else None
+    if schnappschuss and (
+        schnappschuss['kalender_id'] != calendar_id
+        or not schnappschuss['sync_token']
+        or schnappschuss['genutzt'] < time.monotonic() - KALENDER_SCHNAPPSCHUSS_MAX_ALTER_SEKUNDEN
+    ):
+        schnappschuss = None
+
+    try:
+        if schnappschuss:
+            try:
+                änderungen, sync_token = lese_kalenderseiten(
+                    calendar_service, calendar_id, aktion, schnappschuss['sync_token']
+                )
+            except HttpError as fehler:
+                if not ist_abgelaufenes_sync_token(fehler):
+                    raise
+                emit_status("Sync-Token des Kalenders ist abgelaufen – lese alle Einträge neu...")
+                schnappschuss = None
+            else:
+                for ereignis in änderungen:
+                    if ereignis.get('status') == 'cancelled':
+                        schnappschuss['ereignisse'].pop(ereignis['id'], None)
+                    else:
+                        schnappschuss['ereignisse'][ereignis['id']] = schnappschuss_eintrag(ereignis)
+                schnappschuss['sync_token'] = sync_token
+
+        if not schnappschuss:
+            vollständig, sync_token = lese_kalenderseiten(calendar_service, calendar_id, aktion)
+            schnappschuss = {
+                'kalender_id': calendar_id,
+                'sync_token': sync_token,
+                'ereignisse': {
+                    ereignis['id']: schnappschuss_eintrag(ereignis)
+                    for ereignis in vollständig
+                    if ereignis.get('status') != 'cancelled'
+                },
+            }
+    except HttpError as e:
+        emit_status(f"❌ Fehler beim Abrufen der Kalenderereignisse: {e}")
+        raise
+
+    schnappschuss['genutzt'] = time.monotonic()
+    if sitzungs_id:
+        kalender_schnappschüsse[sitzungs_id] = schnappschuss
+    return list(schnappschuss['ereignisse'].values())
+
+
+def lösche_kalenderereignisse(service, calendar_id, ereignis_ids, pause=0.0):
+    """Löscht Ereignisse gebündelt und passt die Pause an Rate-Limit-Rückmeldungen an.
+
+    Ohne Rate-Limit-Antworten wird ohne Pause gelöscht. Lehnt Google
+    Teilanforderungen wegen eines Rate Limits ab, wächst die Pause zwischen
+    den Batches und schrumpft danach schrittweise wieder.
+    Liefert gelöschte und fehlgeschlagene Einträge sowie die neue Pause.
+    """
+    gelöscht = 0
+    fehlgeschlagen = 0
+    termine = service.events()
+    for start in range(0, len(ereignis_ids), LÖSCH_BATCH_GRÖSSE):
+        if pause:
+            schlafe(pause)
+        teil = ereignis_ids[start:start + LÖSCH_BATCH_GRÖSSE]
+        ergebnisse, fehler, gedrosselt = führe_google_batch_aus(
+            service,
+            [
+                (ereignis_id, termine.delete(calendarId=calendar_id, eventId=ereignis_id))
+                for ereignis_id in teil
+            ],
+            'Löschen eines Kalenderereignisses'
+        )
+        gelöscht += len(ergebnisse)
+        for einzelfehler in fehler.values():
+            # Bereits entfernte Einträge gelten als gelöscht.
+            if google_fehler_status(einzelfehler) in (404, 410):
+                gelöscht += 1
+            else:
+                fehlgeschlagen += 1
+
+        if gedrosselt:
+            pause = min(RATE_LIMIT_MAX_WARTEZEIT, max(RATE_LIMIT_START_WARTEZEIT, pause * 2))
+        else:
+            pause = pause / 2 if pause >= 0.1 else 0.0
+    return gelöscht, fehlgeschlagen, pause
+
+
+def clear_calendar(service, calendar_id):
+    """Entfernt alle Ereignisse aus dem angegebenen Kalender."""
+    emit_status("Lösche vorhandene Einträge im Kalender...")
+    ereignis_ids = [
+        ev['id'] for ev in lese_kalenderereignisse(service, calendar_id, 'Abrufen der Kalenderereignisse')
+    ]
+    gelöscht_gesamt = 0
+    pause = 0.0
+    for seite, start in enumerate(range(0, len(ereignis_ids), 2500), start=1):
+        gelöscht, fehlgeschlagen, pause = lösche_kalenderereignisse(
+            service, calendar_id, ereignis_ids[start:start + 2500], pause
+        )
+        gelöscht_gesamt += gelöscht
+        hinweis = '⚠️ ' if fehlgeschlagen else ''
+        emit_status(
+            f"{hinweis}Calendar API (calendar.app.created): Seite {seite}: "
+            f"{gelöscht} Einträge gelöscht, {fehlgeschlagen} fehlgeschlagen."
+        )
+
+    if gelöscht_gesamt:
         emit_status("Kalender geleert.")
     else:
         emit_status("Kalender war bereits leer.")
 
-def get_all_events(people_service):
-    """Liest Geburtstage und datierte Ereignisse aus Google Kontakten."""
-    emit_status("Lese Kontakte und Ereignisse...")
-    events = []
-    kontaktzahl = 0
+def ist_abgelaufenes_sync_token(fehler):
+    """Erkennt abgelaufene oder ungültige Sync-Tokens der Google APIs."""
+    status = google_fehler_status(fehler)
+    fehlertext = str(fehler).lower()
+    return status == 410 or (
+        status == 400 and ('expired_sync_token' in fehlertext or 'sync token' in fehlertext)
+    )
+
+
+class Kontaktereignis:
+    """Kompakter Datensatz für ein datiertes Kontaktfeld.
+
+    Titel, ISO-Datum, Enddatum und Dublettenschlüssel werden beim Lesen
+    einmal berechnet; ``__slots__`` spart bei großen Adressbüchern das
+    Wörterbuch pro Ereignis.
+    """
+
+    __slots__ = ('name', 'event_type', 'label', 'quelle', 'titel', 'datum', 'ende', 'schlüssel')
+
+    def __init__(self, name, date, event_type='event', label='', quelle=None):
+        self.name = name
+        self.event_type = event_type
+        self.label = label
+        self.quelle = quelle
+        if event_type == 'birthday':
+            self.titel = f'🎂 {name}'
+        elif event_type == 'anniversary':
+            self.titel = f'💍 {name}'
+        else:
+            self.titel = f'🗓️ {label} - {name}' if label else f'🗓️ {name}'
+        datum = datetime.date(date.get('year', 2000), date['month'], date['day'])
+        self.datum = datum.isoformat()
+        self.ende = (datum + datetime.timedelta(days=1)).isoformat()
+        # Dublettenschlüssel aus Titel und Startdatum wie bei :func:`eintragsschlüssel`.
+        self.schlüssel = (self.titel, self.datum)
+
+    @property
+    def beschreibung(self):
+        return f'{self.label} von {self.name}' if self.label else f'Ereignis von {self.name}'
+
+
+def ereignisse_der_person(person):
+    """Liefert die datierten Felder eines People-API-Kontakts als :class:`Kontaktereignis`."""
+    if person.get('metadata', {}).get('deleted'):
+        return
+    names = person.get('names', [])
+    if not names:
+        return
+    name = names[0].get('displayName')
+    if not name:
+        return
+    ressource = person.get('resourceName')
+
+    for position, b in enumerate(person.get('birthdays', [])):
+        date = b.get('date')
+        if date and date.get('month') and date.get('day'):
+            yield Kontaktereignis(
+                name,
+                date,
+                'birthday',
+                'Geburtstag',
+                f"{ressource}#birthdays.{position}" if ressource else None
+            )
+
+    for position, e in enumerate(person.get('events', [])):
+        typ = (e.get('type') or '').lower()
+        if typ == 'birthday':
+            # Geburtstage wurden bereits über das eigene Feld erfasst.
+            continue
+        date = e.get('date')
+        if not date or not date.get('month') or not date.get('day'):
+            continue
+        label = e.get('formattedType') or e.get('customType') or typ
+        yield Kontaktereignis(
+            name,
+            date,
+            typ or 'event',
+            label,
+            f"{ressource}#events.{position}" if ressource else None
+        )
+
+
+def streame_kontaktseiten(people_service, sync_token=None):
+    """Liest Kontakte Seite für Seite und liefert je Seite die datierten Felder.
+
+    Jede Seite ergibt ``(events, betroffene_kontakte, kontaktzahl, sync_token)``;
+    das nächste Sync-Token liefert Google erst mit der letzten Seite.
+    """
     page_token = None
     while True:
+        parameter = {
+            'resourceName': 'people/me',
+            'personFields': 'names,birthdays,events',
+            'pageSize': 1000,
+            'pageToken': page_token,
+            'requestSyncToken': True,
+        }
+        if sync_token:
+            parameter['syncToken'] = sync_token
         results = führe_google_api_aus(
-            people_service.people().connections().list(
-                resourceName='people/me',
-                personFields='names,birthdays,events',
-                pageSize=1000,
-                pageToken=page_token
-            ),
+            people_service.people().connections().list(**parameter),
             'Abrufen der Kontakte'
         )
 
+        events = []
+        betroffene_kontakte = set()
         kontakte = results.get('connections', [])
-        kontaktzahl += len(kontakte)
         for person in kontakte:
-            names = person.get('names', [])
-            if not names:
-                continue
-            name = names[0].get('displayName')
-            if not name:
-                continue
+            ressource = person.get('resourceName')
+            if ressource:
+                betroffene_kontakte.add(ressource)
+            events.extend(ereignisse_der_person(person))
 
-            for b in person.get('birthdays', []):
-                date = b.get('date')
-                if date and date.get('month') and date.get('day'):
-                    events.append({
-                        'name': name,
-                        'date': date,
-                        'event_type': 'birthday',
-                        'label': 'Geburtstag'
-                    })
-
-            for e in person.get('events', []):
-                typ = (e.get('type') or '').lower()
-                if typ == 'birthday':
-                    # Geburtstage wurden bereits über das eigene Feld erfasst.
-                    continue
-                date = e.get('date')
-                if not date or not date.get('month') or not date.get('day'):
-                    continue
-                label = e.get('formattedType') or e.get('customType') or typ
-                events.append({
-                    'name': name,
-                    'date': date,
-                    'event_type': typ or 'event',
-                    'label': label
-                })
+        yield events, betroffene_kontakte, len(kontakte), results.get('nextSyncToken')
 
         page_token = results.get('nextPageToken')
         if not page_token:
             break
 
-    emit_status(
-        f"People API (contacts.readonly): {kontaktzahl} Google-Kontakte gelesen."
-    )
-    emit_status(
-        f"{len(events)} datierte Kontaktfelder für die Verarbeitung gefunden."
+
+def lies_voraus(seiten, puffergröße):
+    """Liest einen Seiten-Iterator in einem eigenen Greenlet voraus.
+
+    Die begrenzte Warteschlange hält höchstens ``puffergröße`` Seiten, sodass
+    Lesen und Verarbeiten sich überlappen, ohne dass der Speicher mit der
+    Zahl der Seiten wächst. Fehler des Lesers werden beim Abholen ausgelöst.
+
+    Bricht der Verbraucher vorzeitig ab, hört der Leser an der nächsten
+    Seitengrenze auf. Eine laufende Anfrage wird nicht unterbrochen, damit
+    keine halb gelesene Verbindung in den HTTP-Pool zurückkehrt.
+    """
+    puffer = eventlet.queue.Queue(maxsize=max(1, puffergröße))
+    ende = object()
+    abgebrochen = False
+
+    def lesen():
+        fehler = None
+        try:
+            for seite in seiten:
+                puffer.put((seite, None))
+                if abgebrochen:
+                    break
+        except Exception as lesefehler:
+            fehler = lesefehler
+        puffer.put((ende, fehler))
+
+    leser = eventlet.spawn(contextvars.copy_context().run, lesen)
+    seite = None
+    try:
+        while True:
+            seite, fehler = puffer.get()
+            if fehler is not None:
+                raise fehler
+            if seite is ende:
+                return
+            yield seite
+    finally:
+        abgebrochen = True
+        # Den Puffer leeren, bis der Leser sein Ende meldet; so kann ein
+        # blockiertes put nicht hängen bleiben.
+        while seite is not ende:
+            seite, _ = puffer.get()
+        leser.wait()
+
+
+def lese_kontakte_gestreamt(people_service, sync_token=None, kontaktstand=None):
+    """Liefert Kontaktseiten als ``(events, betroffene_kontakte, vollständig)``.
+
+    Mit ``sync_token`` werden nur seitdem geänderte Kontakte gelesen; ist das
+    Token abgelaufen, wird automatisch vollständig gelesen. Kontaktzahl und
+    neues Sync-Token landen nach dem Durchlauf in ``kontaktstand``.
+    """
+    kontaktstand = {} if kontaktstand is None else kontaktstand
+    emit_status("Lese Kontakte und Ereignisse...")
+    vollständig = not sync_token
+    seiten = lies_voraus(streame_kontaktseiten(people_service, sync_token), SYNC_PUFFER_SEITEN)
+    if sync_token:
+        try:
+            erste_seite = next(seiten, None)
+        except HttpError as fehler:
+            if not ist_abgelaufenes_sync_token(fehler):
+                raise
+            emit_status("Sync-Token der Kontakte ist abgelaufen – lese alle Kontakte neu...")
+            vollständig = True
+            seiten = lies_voraus(streame_kontaktseiten(people_service), SYNC_PUFFER_SEITEN)
+        else:
+            if erste_seite is not None:
+                seiten = itertools.chain([erste_seite], seiten)
+
+    kontaktzahl = 0
+    felder = 0
+    for events, betroffene_kontakte, anzahl, nächster_sync_token in seiten:
+        kontaktzahl += anzahl
+        felder += len(events)
+        if nächster_sync_token:
+            kontaktstand['sync_token'] = nächster_sync_token
+        yield events, betroffene_kontakte, vollständig
+
+    kontaktstand['kontaktzahl'] = kontaktzahl
+    if vollständig:
+        emit_status(f"People API (contacts.readonly): {kontaktzahl} Google-Kontakte gelesen.")
+    else:
+        emit_status(f"People API (contacts.readonly): {kontaktzahl} geänderte Google-Kontakte gelesen.")
+    emit_status(f"{felder} datierte Kontaktfelder für die Verarbeitung gefunden.")
+
+
+def kontaktseiten_mit_änderungen(kontaktseiten):
+    """Liest Kontaktseiten bis zur ersten mit Änderungen.
+
+    Liefert alle Seiten einschließlich der schon gelesenen oder ``None``, wenn
+    keine Seite einen Kontakt betrifft. Eine vollständig gelesene Seite zählt
+    immer als Änderung, auch wenn sie leer ist.
+    """
+    gelesen = []
+    for seite in kontaktseiten:
+        gelesen.append(seite)
+        events, betroffene_kontakte, vollständig = seite
+        if events or betroffene_kontakte or vollständig:
+            return itertools.chain(gelesen, kontaktseiten)
+    return None
+
+
+def lese_kontakte(people_service, sync_token=None):
+    """Liest datierte Kontaktfelder, mit Sync-Token nur die seitdem geänderten Kontakte.
+
+    Liefert Ereignisse, Kontaktzahl, die betroffenen Kontakt-Ressourcen
+    (``None`` nach einem vollständigen Lesen) und das neue Sync-Token.
+    """
+    kontaktstand = {}
+    events = []
+    betroffene_kontakte = set()
+    vollständig = not sync_token
+    for seiten_events, seiten_betroffene, vollständig in lese_kontakte_gestreamt(
+        people_service, sync_token, kontaktstand
+    ):
+        events.extend(seiten_events)
+        betroffene_kontakte.update(seiten_betroffene)
+    return (
+        events,
+        kontaktstand['kontaktzahl'],
+        None if vollständig else betroffene_kontakte,
+        kontaktstand.get('sync_token'),
     )
+
+
+def get_all_events(people_service):
+    """Liest Geburtstage und datierte Ereignisse aus Google Kontakten."""
+    events, kontaktzahl, _, _ = lese_kontakte(people_service)
     return events, kontaktzahl
 
 
+def kalendereintrag_für(ereignis):
+    """Baut den jährlichen Ganztagstermin für ein datiertes Kontaktfeld."""
+    eintrag = {
+        'summary': ereignis.titel,
+        'start': {'date': ereignis.datum},
+        'end': {'date': ereignis.ende},
+        'recurrence': ['RRULE:FREQ=YEARLY'],
+        'description': ereignis.beschreibung,
+        'transparency': 'transparent'
+    }
+    if ereignis.quelle:
+        eintrag['extendedProperties'] = {'private': {QUELLEN_EIGENSCHAFT: ereignis.quelle}}
+    return eintrag
+
+
+def eintragsschlüssel(eintrag):
+    """Liefert den Dublettenschlüssel aus Titel und Startdatum."""
+    return eintrag.get('summary'), eintrag.get('start', {}).get('date')
+
+
+def eintragsquelle(eintrag):
+    """Liest die Herkunft (Kontakt und Feld) aus einem Kalendereintrag."""
+    return eintrag.get('extendedProperties', {}).get('private', {}).get(QUELLEN_EIGENSCHAFT)
+
+
+def schreibe_gebündelt(calendar_service, anforderungen, aktion, gesamtzahl, einheit):
+    """Sendet Schreibanforderungen in Batches und meldet alle 25 Einträge den Fortschritt.
+
+    ``anforderungen`` liefert ``(anforderungs_id, anforderung)``-Paare und darf
+    ein Generator sein; ist die Gesamtzahl vorab unbekannt, wird ``None``
+    übergeben. Endgültig fehlgeschlagene Anforderungen brechen den Lauf wie
+    bei einzelnen Aufrufen ab.
+    """
+    geschrieben = 0
+    gemeldet = 0
+    ausstehend = []
+
+    def senden():
+        nonlocal geschrieben, gemeldet
+        ergebnisse, fehlgeschlagen, _ = führe_google_batch_aus(calendar_service, ausstehend, aktion)
+        geschrieben += len(ergebnisse)
+        if fehlgeschlagen:
+            raise next(iter(fehlgeschlagen.values()))
+        ausstehend.clear()
+        # Ein Batch kann mehrere 25er-Schritte überspringen; jeder erhält seine eigene Zeile.
+        stände = list(range((gemeldet // 25 + 1) * 25, geschrieben + 1, 25))
+        if geschrieben == gesamtzahl and geschrieben % 25:
+            stände.append(geschrieben)
+        gemeldet = geschrieben
+        for anzahl in stände:
+            stand = f"{anzahl} von {gesamtzahl}" if gesamtzahl is not None else str(anzahl)
+            emit_status(f"Calendar API (calendar.app.created): {stand} {einheit}.")
+
+    for anforderung in anforderungen:
+        ausstehend.append(anforderung)
+        if len(ausstehend) >= EINFÜGE_BATCH_GRÖSSE:
+            senden()
+    if ausstehend:
+        senden()
+    return geschrieben
+
+
+def fingerabdruck(events):
+    """Bildet einen kompakten Hash über die Kalendereinträge aller Kontaktereignisse.
+
+    Die Reihenfolge der Kontakte spielt keine Rolle; gespeichert wird nur der
+    Hash, keine Kontaktdaten.
+    """
+    prüfsumme = hashlib.sha256()
+    for eintrag in sorted(json.dumps(kalendereintrag_für(ereignis), sort_keys=True) for ereignis in events):
+        prüfsumme.update(eintrag.encode('utf-8'))
+        prüfsumme.update(b'\n')
+    return prüfsumme.hexdigest()
+
+
+def kalender_seit_letztem_lauf(calendar_service, calendar_id, zustand, abdruck):
+    """Liefert ein neues Calendar-Sync-Token, wenn Kontakte und Kalender unverändert sind.
+
+    Voraussetzung sind derselbe Fingerabdruck wie beim letzten erfolgreichen
+    Lauf und ein Calendar-Sync-Token, seit dem Google keine Änderungen meldet.
+    Andernfalls ``None``.
+    """
+    if (
+        zustand.get('fingerabdruck') != abdruck
+        or zustand.get('kalender_id') != calendar_id
+        or not zustand.get('kalender_sync_token')
+    ):
+        return None
+    ergebnis = kalenderänderungen_seit(calendar_service, calendar_id, zustand['kalender_sync_token'])
+    if ergebnis is None:
+        return None
+    änderungen, sync_token = ergebnis
+    return None if änderungen else sync_token
+
+
+def kalenderänderungen_seit(calendar_service, calendar_id, sync_token):
+    """Liefert ``(änderungen, neues_sync_token)`` seit ``sync_token`` oder ``None``, wenn es abgelaufen ist."""
+    try:
+        return lese_kalenderseiten(calendar_service, calendar_id, 'Prüfen auf Kalenderänderungen', sync_token)
+    except HttpError as fehler:
+        if ist_abgelaufenes_sync_token(fehler):
+            return None
+        raise
+
+
+def verwaltete_termine_unverändert(calendar_service, calendar_id, sync_token):
+    """Liefert ein neues Calendar-Sync-Token, wenn seit ``sync_token`` niemand verwaltete Termine geändert hat.
+
+    ``sync_token`` stammt vom Ende des letzten Laufs und enthält dessen eigene
+    Schreibzugriffe. Gelöschte Termine meldet Google nur mit ID und Status; sie
+    zählen daher immer als Änderung. Ohne oder mit abgelaufenem Token ``None``.
+    """
+    if not sync_token:
+        return None
+    ergebnis = kalenderänderungen_seit(calendar_service, calendar_id, sync_token)
+    if ergebnis is None:
+        return None
+    änderungen, neues_sync_token = ergebnis
+    if any(ereignis.get('status') == 'cancelled' or eintragsquelle(ereignis) for ereignis in änderungen):
+        return None
+    return neues_sync_token
+
+
+def kalender_sync_token_nach_lauf(calendar_service, calendar_id, sitzungs_id):
+    """Liefert ein Calendar-Sync-Token, das die eigenen Schreibzugriffe schon enthält."""
+    if not sitzungs_id:
+        return None
+    lese_kalenderereignisse(calendar_service, calendar_id, 'Abrufen des Kalenderstands', sitzungs_id)
+    schnappschuss = kalender_schnappschüsse.get(sitzungs_id)
+    return schnappschuss['sync_token'] if schnappschuss else None
+
+
 def create_events(calendar_service, calendar_id, events):
     emit_status("Prüfe vorhandene Ereignisse im Kalender...")
-    existing = set()
-    page_token = None
-    created_count = 0
+    existing = {
+        eintragsschlüssel(event)
+        for event in lese_kalenderereignisse(
+            calendar_service, calendar_id, 'Prüfen vorhandener Kalenderereignisse'
+        )
+    }
+
+    neue_einträge = []
     skipped_count = 0
-    while True:
-        try:
-            existing_events = führe_google_api_aus(
-                calendar_service.events().list(
-                    calendarId=calendar_id,
-                    maxResults=2500,
-                    singleEvents=True,
-                    orderBy='startTime',
-                    pageToken=page_token,
-                ),
-                'Prüfen vorhandener Kalenderereignisse'
-            )
-        except HttpError as e:
-            emit_status(f"❌ Fehler beim Abrufen der Kalenderereignisse: {e}")
-            raise
+    for b in events:
+        if b.schlüssel in existing:
+            skipped_count += 1
+            continue
+        neue_einträge.append(kalendereintrag_für(b))
+
+    termine = calendar_service.events()
+    created_count = schreibe_gebündelt(
+        calendar_service,
+        (
+            (str(position), termine.insert(calendarId=calendar_id, body=eintrag))
+            for position, eintrag in enumerate(neue_einträge)
+        ),
+        'Einfügen',
+        len(neue_einträge),
+        'neuen Einträgen geschrieben'
+    )
+    emit_status(
+        f"Calendar API (calendar.app.created): {created_count} Einträge erstellt, "
+        f"{skipped_count} vorhandene Einträge übersprungen."
+    )
+    return created_count, skipped_count
 
-        for event in existing_events.get('items', []):
-            if 'summary' in event and 'start' in event and 'date' in event['start']:
-                key = (event['summary'], event['start']['date'])
-                existing.add(key)
 
-        page_token = existing_events.get('nextPageToken')
-        if not page_token:
-            break
+def eintrag_ist_aktuell(vorhanden, ereignis):
+    """Prüft, ob ein vorhandener Termin bereits dem gewünschten Stand entspricht."""
+    return (
+        eintragsschlüssel(vorhanden) == ereignis.schlüssel
+        and vorhanden.get('description') == ereignis.beschreibung
+        and vorhanden.get('end', {}).get('date') == ereignis.ende
+    )
 
-    gesamtzahl = len(events)
-    for index, b in enumerate(events, start=1):
-        name = b['name']
-        d = b['date']
-        month = d['month']
-        day = d['day']
-        year = d.get('year', 2000)
-        dt = datetime.date(year, month, day)
-        event_type = b.get('event_type', 'event')
-        label = b.get('label', '')
-        if event_type == 'birthday':
-            summary = f'🎂 {name}'
-        elif event_type == 'anniversary':
-            summary = f'💍 {name}'
-        else:
-            summary = f'🗓️ {label} - {name}' if label else f'🗓️ {name}'
-        key = (summary, dt.isoformat())
 
-        if key in existing:
-            skipped_count += 1
-            continue
+class Abgleich:
+    """Ordnet datierte Kontaktfelder den vorhandenen Terminen des Zielkalenders zu.
+
+    Der Index über die vorhandenen Termine wird einmal aufgebaut; Kontaktfelder
+    können danach seitenweise zugeordnet werden, sodass Schreibanforderungen
+    schon während des Lesens der Kontakte entstehen. Termine älterer Versionen
+    ohne Herkunftsangabe werden über Titel und Datum übernommen und dabei
+    nachträglich markiert, statt gelöscht und neu angelegt zu werden.
+    """
+
+    def __init__(self, vorhandene_einträge):
+        self.nach_quelle = {}
+        self.ohne_quelle = {}
+        self.doppelte = []
+        self.unverändert = 0
+        for vorhanden in vorhandene_einträge:
+            quelle = eintragsquelle(vorhanden)
+            if quelle is None:
+                self.ohne_quelle.setdefault(eintragsschlüssel(vorhanden), []).append(vorhanden)
+            elif quelle in self.nach_quelle:
+                self.doppelte.append(vorhanden)
+            else:
+                self.nach_quelle[quelle] = vorhanden
+
+    def ordne_zu(self, ereignis, übernehmen=True):
+        """Liefert ``('einfügen', eintrag)``, ``('aktualisieren', (id, eintrag))`` oder ``None``.
+
+        Mit ``übernehmen=False`` bleiben Termine ohne Herkunftsangabe unberührt.
+        """
+        vorhanden = self.nach_quelle.pop(ereignis.quelle, None)
+        if vorhanden is None:
+            kandidaten = self.ohne_quelle.get(ereignis.schlüssel) if übernehmen else None
+            if not kandidaten:
+                return 'einfügen', kalendereintrag_für(ereignis)
+            vorhanden = kandidaten.pop()
+            if not ereignis.quelle and eintrag_ist_aktuell(vorhanden, ereignis):
+                self.unverändert += 1
+                return None
+        elif eintrag_ist_aktuell(vorhanden, ereignis):
+            self.unverändert += 1
+            return None
+        return 'aktualisieren', (vorhanden['id'], kalendereintrag_für(ereignis))
 
-        event = {
-            'summary': summary,
-            'start': {'date': dt.isoformat()},
-            'end': {'date': (dt + datetime.timedelta(days=1)).isoformat()},
-            'recurrence': ['RRULE:FREQ=YEARLY'],
-            'description': f'{label} von {name}' if label else f'Ereignis von {name}',
-            'transparency': 'transparent'
-        }
+    def unberührt(self, betroffene_kontakte):
+        """Zählt die verbliebenen Termine von Kontakten außerhalb von ``betroffene_kontakte``.
 
-        führe_google_api_aus(
-            calendar_service.events().insert(calendarId=calendar_id, body=event),
-            'Einfügen'
+        Diese Kontakte sind seit dem letzten Lauf unverändert; ihre Termine
+        gelten als aktuell, sofern der Kalender seitdem nicht bearbeitet wurde.
+        """
+        return sum(
+            1 for vorhanden in self.nach_quelle.values()
+            if eintragsquelle(vorhanden).split('#', 1)[0] not in betroffene_kontakte
         )
-        created_count += 1
-        if index == gesamtzahl or index % 25 == 0:
-            emit_status(
-                f"Calendar API (calendar.app.created): {index} von {gesamtzahl} "
-                "Kontaktfeldern verarbeitet."
+
+    def zu_löschen(self, betroffene_kontakte=None):
+        """Liefert die IDs entfallener Termine.
+
+        Mit ``betroffene_kontakte`` werden nur Termine dieser Kontakte gelöscht,
+        alle übrigen bleiben unangetastet.
+        """
+        if betroffene_kontakte is None:
+            entfallen = self.doppelte + list(self.nach_quelle.values()) + [
+                vorhanden for kandidaten in self.ohne_quelle.values() for vorhanden in kandidaten
+            ]
+        else:
+            entfallen = [
+                vorhanden
+                for vorhanden in self.doppelte + list(self.nach_quelle.values())
+                if eintragsquelle(vorhanden).split('#', 1)[0] in betroffene_kontakte
+            ]
+        return [vorhanden['id'] for vorhanden in entfallen]
+
+
+def plane_abgleich(vorhandene_einträge, events, betroffene_kontakte=None):
+    """Berechnet Einfüge-, Aktualisierungs- und Löschmengen für den Abgleich.
+
+    Mit ``betroffene_kontakte`` werden nur Termine dieser Kontakte betrachtet;
+    die Termine aller übrigen Kontakte zählen als unverändert.
+    """
+    abgleich = Abgleich(vorhandene_einträge)
+    einfügen = []
+    aktualisieren = []
+    for ereignis in events:
+        ergebnis = abgleich.ordne_zu(ereignis, übernehmen=betroffene_kontakte is None)
+        if ergebnis is None:
+            continue
+        art, daten = ergebnis
+        (einfügen if art == 'einfügen' else aktualisieren).append(daten)
+    unverändert = abgleich.unverändert
+    if betroffene_kontakte is not None:
+        unverändert += abgleich.unberührt(betroffene_kontakte)
+    return einfügen, aktualisieren, abgleich.zu_löschen(betroffene_kontakte), unverändert
+
+
+def gleiche_kalender_ab(calendar_service, calendar_id, kontaktseiten, sitzungs_id=None,
+                        kalender_unverändert=False):
+    """Schreibt nur die Unterschiede zwischen Kontakten und Zielkalender.
+
+    ``kontaktseiten`` liefert ``(events, betroffene_kontakte, vollständig)`` je
+    Kontaktseite, etwa aus :func:`lese_kontakte_gestreamt`. Einfügungen und
+    Aktualisierungen einer Seite werden geschrieben, während die nächste Seite
+    noch gelesen wird; entfallene Termine stehen erst nach der letzten Seite
+    fest und werden danach gelöscht.
+
+    Nur geänderte Kontakte (``vollständig`` falsch) sind ausschließlich mit
+    ``kalender_unverändert`` erlaubt, also wenn seit dem letzten Lauf niemand
+    verwaltete Termine bearbeitet hat (:func:`verwaltete_termine_unverändert`).
+    Die Termine der übrigen Kontakte zählen dann als unverändert. Ohne diese
+    Bestätigung bricht der Abgleich vor dem ersten Schreibzugriff mit
+    ``ValueError`` ab.
+    """
+    emit_status("Vergleiche Kontakte mit vorhandenen Kalendereinträgen...")
+    with phase('Kalender lesen'):
+        abgleich = Abgleich(
+            lese_kalenderereignisse(
+                calendar_service, calendar_id, 'Prüfen vorhandener Kalenderereignisse', sitzungs_id
             )
-        time.sleep(EINFÜGE_PAUSE_SEKUNDEN)
+        )
+    betroffene_kontakte = set()
+    vollständig = True
+    zähler = {'einfügen': 0, 'aktualisieren': 0}
+    # events() baut die Ressource samt aller Methoden jedes Mal neu auf.
+    termine = calendar_service.events()
+
+    def anforderungen():
+        nonlocal vollständig
+        for events, seiten_betroffene, vollständig in kontaktseiten:
+            if not vollständig and not kalender_unverändert:
+                raise ValueError("Abgleich nur geänderter Kontakte ohne bestätigten Kalenderstand")
+            betroffene_kontakte.update(seiten_betroffene)
+            for ereignis in events:
+                ergebnis = abgleich.ordne_zu(ereignis, übernehmen=vollständig)
+                if ergebnis is None:
+                    continue
+                art, daten = ergebnis
+                zähler[art] += 1
+                if art == 'einfügen':
+                    yield f"neu-{zähler[art]}", termine.insert(calendarId=calendar_id, body=daten)
+                else:
+                    ereignis_id, eintrag = daten
+                    yield ereignis_id, termine.update(
+                        calendarId=calendar_id, eventId=ereignis_id, body=eintrag
+                    )
+
+    with phase('Kontakte lesen und schreiben'):
+        schreibe_gebündelt(
+            calendar_service,
+            anforderungen(),
+            'Schreiben',
+            None,
+            'neue oder geänderte Einträge geschrieben'
+        )
+    unverändert = abgleich.unverändert
+    if vollständig:
+        zu_löschen = abgleich.zu_löschen()
+    else:
+        zu_löschen = abgleich.zu_löschen(betroffene_kontakte)
+        unverändert += abgleich.unberührt(betroffene_kontakte)
     emit_status(
-        f"Calendar API (calendar.app.created): {created_count} Einträge erstellt, "
-        f"{skipped_count} vorhandene Einträge übersprungen."
+        f"Abgleich: {zähler['einfügen']} neu, {zähler['aktualisieren']} geändert, "
+        f"{len(zu_löschen)} entfallen, {unverändert} unverändert."
     )
-    return created_count, skipped_count
+    gelöscht = 0
+    if zu_löschen:
+        with phase('Entfallene löschen'):
+            gelöscht, fehlgeschlagen, _ = lösche_kalenderereignisse(calendar_service, calendar_id, zu_löschen)
+        if fehlgeschlagen:
+            emit_status(f"⚠️ {fehlgeschlagen} entfallene Einträge konnten nicht gelöscht werden.")
+    return zähler['einfügen'], zähler['aktualisieren'], gelöscht, unverändert
+
+
+def plane_synchronisation(people_service, calendar_service, sitzungs_id=None):
+    """Berechnet den Schreibumfang eines Laufs, ohne den Kalender zu verändern.
+
+    Liest alle Kontakte und den Zielkalender wie ein vollständiger Lauf; im
+    Modus ``neuaufbau`` genügt bei unverändertem Fingerabdruck der Blick auf die
+    Kalenderänderungen seit dem letzten Lauf. Die Dauer wird aus der aktuellen
+    Rate der Sitzung (anfangs aus ``EINFÜGE_PAUSE_SEKUNDEN``) und der beim Lesen
+    beobachteten Latenz geschätzt.
+    """
+    profil = Laufprofil()
+    token = AKTIVES_LAUFPROFIL.set(profil)
+    try:
+        with phase('Kontakte lesen'):
+            events, kontaktzahl, _, _ = lese_kontakte(people_service)
+        with phase('Kalender lesen'):
+            zustand = lade_sitzungszustand(sitzungs_id)
+            calendar_id = finde_kalender(calendar_service, bekannte_id=zustand.get('kalender_id'))
+            # Wie im Lauf selbst entfällt der Neuaufbau, wenn sich nichts geändert hat.
+            nichts_zu_tun = bool(
+                SYNC_MODUS == 'neuaufbau' and calendar_id
+                and kalender_seit_letztem_lauf(calendar_service, calendar_id, zustand, fingerabdruck(events))
+            )
+            vorhandene = lese_kalenderereignisse(
+                calendar_service, calendar_id, 'Prüfen vorhandener Kalenderereignisse', sitzungs_id
+            ) if calendar_id and not nichts_zu_tun else []
+    finally:
+        AKTIVES_LAUFPROFIL.reset(token)
+
+    if nichts_zu_tun:
+        einfügen, aktualisieren, löschen, unverändert = 0, 0, 0, len(events)
+    elif SYNC_MODUS == 'neuaufbau':
+        einfügen, aktualisieren, löschen, unverändert = len(events), 0, len(vorhandene), 0
+    else:
+        neu, geändert, entfallen, unverändert = plane_abgleich(vorhandene, events)
+        einfügen, aktualisieren, löschen = len(neu), len(geändert), len(entfallen)
+
+    kalender_anlegen = 0 if calendar_id else 1
+    aufrufe = (
+        kalender_anlegen
+        + math.ceil((einfügen + aktualisieren) / EINFÜGE_BATCH_GRÖSSE)
+        + math.ceil(löschen / LÖSCH_BATCH_GRÖSSE)
+    )
+    teilanforderungen = kalender_anlegen + einfügen + aktualisieren + löschen
+    rate = projekt_eimer.rate
+    if sitzungs_id:
+        rate = min(rate, eimer_der_sitzung(sitzungs_id).rate)
+    gelesen = profil.zusammenfassung()
+    latenz = gelesen['api_sekunden'] / gelesen['api_aufrufe'] if gelesen['api_aufrufe'] else 0.0
+    return {
+        'kontakte': kontaktzahl,
+        'ereignisse': len(events),
+        'kalender_vorhanden': bool(calendar_id),
+        'einfügen': einfügen,
+        'aktualisieren': aktualisieren,
+        'löschen': löschen,
+        'unverändert': unverändert,
+        'lese_aufrufe': gelesen['api_aufrufe'],
+        'schreib_aufrufe': aufrufe,
+        'teilanforderungen': teilanforderungen,
+        'rate_pro_sekunde': round(rate, 2),
+        'latenz_sekunden': round(latenz, 3),
+        'geschätzte_dauer_sekunden': round(teilanforderungen / rate + aufrufe * latenz, 1),
+    }
+
+
+@app.context_processor
+def automatik_angaben():
+    """Stellt Oberfläche und Rechtstexten das Intervall des geplanten Abgleichs bereit."""
+    return {'automatik_intervall': automatik_intervall_text()}
+
 
 @app.route('/')
 def index():
     return render_template(
         'index.html',
         csrf_token=hole_csrf_token(),
-        google_verbunden=os.path.exists(token_pfad())
+        google_verbunden=token_speicher().existiert(token_schlüssel()),
+        automatik_aktiv=bool(lade_sitzungszustand(aktuelle_sitzungs_id()).get('automatik'))
     )
 
+@app.route('/ratenbegrenzung')
+def ratenbegrenzung():
+    """Zeigt die aktuelle gemeinsame Drosselung der Google-Aufrufe."""
+    return jsonify(ratenbegrenzer_status())
+
+@app.route('/metrics')
+def metriken_anzeigen():
+    """Liefert Betriebsmetriken im Prometheus-Textformat."""
+    if METRIKEN_TOKEN and not secrets.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {METRIKEN_TOKEN}'
+    ):
+        return 'Nicht autorisiert', 401
+    metriken.setze('geburtstage_synchronisationen_aktiv', len(sync_planer.aktiv))
+    metriken.setze('geburtstage_synchronisationen_wartend', len(sync_planer.warteschlange))
+    try:
+        metriken.setze('geburtstage_token_speicher_eintraege', token_speicher().anzahl())
+        metriken.setze('geburtstage_oauth_flows_ausstehend', anzahl_oauth_flows())
+    except (OSError, sqlite3.Error):
+        pass
+    return metriken.als_text(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/datenschutz')
 def privacy():
     return render_template('datenschutz.html')
@@ -691,14 +2880,109 @@ def ergänze_sicherheitskopfzeilen(antwort):
         antwort.headers['Strict-Transport-Security'] = 'max-age=31536000'
     return antwort
 
-def sync_events_ausführen(people_service, calendar_service):
+def sync_events_ausführen(people_service, calendar_service, sitzungs_id=None):
     """Führt den eigentlichen Import aus und meldet den Fortschritt per WebSocket."""
+    sitzungs_id = sitzungs_id or AKTIVE_STATUS_SITZUNG.get()
+    profil = Laufprofil()
+    token = AKTIVES_LAUFPROFIL.set(profil)
+    ergebnis = None
+    try:
+        with profiliere_lauf():
+            ergebnis = führe_synchronisation_aus(people_service, calendar_service, sitzungs_id, profil)
+        return ergebnis
+    finally:
+        AKTIVES_LAUFPROFIL.reset(token)
+        schreibe_laufprofil(profil, 'fehler' if ergebnis else 'ok')
+        # Grundlage für den Zeitplan der automatischen Synchronisation; ein
+        # Speicherfehler darf Ergebnis oder Fehler des Laufs nicht ersetzen.
+        try:
+            speichere_sitzungszustand(
+                sitzungs_id,
+                letzter_lauf=time.time(),
+                letztes_ergebnis='fehler' if ergebnis else 'ok',
+                letzte_anzahlen=profil.anzahlen
+            )
+        except sqlite3.Error:
+            print("Sitzungszustand konnte nach dem Lauf nicht gespeichert werden.", flush=True)
+
+
+def führe_synchronisation_aus(people_service, calendar_service, sitzungs_id, profil):
+    """Gleicht Kontakte und Zielkalender ab und füllt dabei das Laufprofil."""
     try:
-        all_events, _ = get_all_events(people_service)
-        emit_status("Kontakte geladen – bereite Kalender vor...")
-        calendar_id = get_or_create_calendar(calendar_service)
-        clear_calendar(calendar_service, calendar_id)
-        created_count, skipped_count = create_events(calendar_service, calendar_id, all_events)
+        zustand = lade_sitzungszustand(sitzungs_id)
+        emit_status("Bereite Kalender vor...")
+        with phase('Kalender vorbereiten'):
+            calendar_id = get_or_create_calendar(calendar_service, bekannte_id=zustand.get('kalender_id'))
+        # Ein neuer Zielkalender enthält die unveränderten Kontakte noch nicht.
+        sync_token = zustand.get('kontakte_sync_token') if zustand.get('kalender_id') == calendar_id else None
+        abdruck = kalender_sync_token = kalender_unverändert = None
+        if SYNC_MODUS == 'neuaufbau':
+            with phase('Kontakte lesen'):
+                all_events, kontaktzahl, _, kontakte_sync_token = lese_kontakte(people_service)
+            abdruck = fingerabdruck(all_events)
+            with phase('Kalender prüfen'):
+                kalender_sync_token = kalender_seit_letztem_lauf(calendar_service, calendar_id, zustand, abdruck)
+            if kalender_sync_token:
+                emit_status("Kontakte und Kalender sind seit dem letzten Lauf unverändert – nichts zu schreiben.")
+                created_count, skipped_count = 0, len(all_events)
+            else:
+                with phase('Kalender leeren'):
+                    clear_calendar(calendar_service, calendar_id)
+                with phase('Einträge erstellen'):
+                    created_count, skipped_count = create_events(calendar_service, calendar_id, all_events)
+                kalender_sync_token = kalender_sync_token_nach_lauf(calendar_service, calendar_id, sitzungs_id)
+            profil.anzahlen.update(kontakte=kontaktzahl, erstellt=created_count, vorhanden=skipped_count)
+            verwaltete_termine = created_count + skipped_count
+        else:
+            if sync_token:
+                # Nur geänderte Kontakte zu lesen setzt voraus, dass die übrigen Termine
+                # noch so im Kalender stehen, wie der letzte Lauf sie hinterlassen hat.
+                with phase('Kalender prüfen'):
+                    kalender_unverändert = verwaltete_termine_unverändert(
+                        calendar_service, calendar_id, zustand.get('kalender_sync_token')
+                    )
+                if not kalender_unverändert:
+                    if zustand.get('kalender_sync_token'):
+                        emit_status("Termine im Kalender wurden seit dem letzten Lauf verändert – lese alle Kontakte neu...")
+                    sync_token = None
+            kontaktstand = {}
+            kontaktseiten = lese_kontakte_gestreamt(people_service, sync_token, kontaktstand)
+            if kalender_unverändert:
+                with phase('Kontakte lesen'):
+                    kontaktseiten = kontaktseiten_mit_änderungen(kontaktseiten)
+            if kontaktseiten is None:
+                # Weder Kontakte noch verwaltete Termine haben sich geändert; der
+                # Kalender muss dafür nicht einmal gelesen werden.
+                emit_status("Kontakte und Kalender sind seit dem letzten Lauf unverändert – nichts zu schreiben.")
+                created_count = updated_count = deleted_count = 0
+                skipped_count = zustand.get('verwaltete_termine') or 0
+                kalender_sync_token = kalender_unverändert
+            else:
+                created_count, updated_count, deleted_count, skipped_count = gleiche_kalender_ab(
+                    calendar_service,
+                    calendar_id,
+                    kontaktseiten,
+                    sitzungs_id,
+                    kalender_unverändert=bool(sync_token)
+                )
+                kalender_sync_token = kalender_sync_token_nach_lauf(calendar_service, calendar_id, sitzungs_id)
+            kontakte_sync_token = kontaktstand.get('sync_token')
+            verwaltete_termine = created_count + updated_count + skipped_count
+            profil.anzahlen.update(
+                kontakte=kontaktstand.get('kontaktzahl', 0),
+                erstellt=created_count,
+                aktualisiert=updated_count,
+                gelöscht=deleted_count,
+                unverändert=skipped_count
+            )
+        speichere_sitzungszustand(
+            sitzungs_id,
+            kontakte_sync_token=kontakte_sync_token,
+            kalender_id=calendar_id,
+            fingerabdruck=abdruck,
+            kalender_sync_token=kalender_sync_token,
+            verwaltete_termine=verwaltete_termine
+        )
     except HttpError as fehler:
         status = google_fehler_status(fehler)
         if status == 403 and "SERVICE_DISABLED" in str(fehler):
@@ -710,7 +2994,13 @@ def sync_events_ausführen(people_service, calendar_service):
         emit_status("❌ Unerwarteter Fehler beim Synchronisieren.")
         return "Error", 500
 
-    if skipped_count:
+    emit_status(profil.als_meldung())
+    if SYNC_MODUS != 'neuaufbau':
+        emit_status(
+            f"🎉 Synchronisation abgeschlossen. {created_count} Einträge erstellt, "
+            f"{updated_count} aktualisiert, {deleted_count} entfernt, {skipped_count} unverändert."
+        )
+    elif skipped_count:
         emit_status(
             f"🎉 Synchronisation abgeschlossen. {created_count} Einträge in den Kalender geschrieben. "
             f"{skipped_count} Einträge waren bereits vorhanden."
@@ -719,15 +3009,154 @@ def sync_events_ausführen(people_service, calendar_service):
         emit_status(f"🎉 Synchronisation abgeschlossen. {created_count} Einträge in den Kalender geschrieben.")
 
 
+def zugangsdaten_ohne_browser(schlüssel):
+    """Lädt und erneuert Zugangsdaten für geplante Läufe.
+
+    Der Zugriff zählt nicht als Nutzung, damit die Aufbewahrungsfrist der
+    Tokens weiter ab dem letzten Besuch läuft. Liefert ``None``, wenn eine
+    neue Anmeldung nötig ist.
+    """
+    gespeichert = token_speicher().lade(schlüssel, als_nutzung=False)
+    if gespeichert is None:
+        return None
+    daten = json.loads(gespeichert)
+    gespeicherte_bereiche = normalisiere_oauth_bereiche(daten.get('scopes') or daten.get('scope'))
+    if gespeicherte_bereiche and gespeicherte_bereiche != ERLAUBTE_OAUTH_BEREICHE:
+        return None
+    zugangsdaten = Credentials.from_authorized_user_info(daten, SCOPES)
+    if not zugangsdaten.valid and zugangsdaten.refresh_token:
+        zugangsdaten.refresh(GoogleAuthRequest())
+        token_speicher().aktualisiere(schlüssel, zugangsdaten_als_json(zugangsdaten))
+    return zugangsdaten if zugangsdaten.valid else None
+
+
+def automatik_intervall_text():
+    """Beschreibt das Intervall des geplanten Abgleichs oder liefert ``None``, wenn er aus ist."""
+    sekunden = AUTOSYNC_INTERVALL_SEKUNDEN
+    if sekunden <= 0:
+        return None
+    if sekunden % 86400 == 0:
+        return 'täglich' if sekunden == 86400 else f'alle {sekunden // 86400} Tage'
+    if sekunden % 3600 == 0:
+        return 'stündlich' if sekunden == 3600 else f'alle {sekunden // 3600} Stunden'
+    return f'alle {max(1, round(sekunden / 60))} Minuten'
+
+
+def nächster_automatischer_lauf(sitzung, zustand, genutzt):
+    """Berechnet den Termin des nächsten geplanten Laufs einer Sitzung.
+
+    Die Streuung hängt von Sitzung und letztem Lauf ab und bleibt damit über
+    mehrere Takte stabil; gemeinsame Abendspitzen verteilen sich so über den Tag.
+    """
+    letzter_lauf = zustand.get('letzter_lauf') or genutzt
+    streuung = random.Random(f'{sitzung}:{letzter_lauf}').uniform(-AUTOSYNC_STREUUNG, AUTOSYNC_STREUUNG)
+    return letzter_lauf + AUTOSYNC_INTERVALL_SEKUNDEN * (1 + streuung)
+
+
+def fällige_automatische_läufe(jetzt):
+    """Liefert (Sitzung, letzter Lauf) fälliger Sitzungen, die am längsten wartenden zuerst."""
+    fällig = []
+    for sitzung, zustand_json, genutzt in token_speicher().automatik_kandidaten():
+        try:
+            zustand = json.loads(zustand_json) if zustand_json else {}
+        except ValueError:
+            zustand = {}
+        if not isinstance(zustand, dict) or not zustand.get('automatik'):
+            # Geplante Läufe nur für Sitzungen, die sie ausdrücklich eingeschaltet haben.
+            continue
+        termin = nächster_automatischer_lauf(sitzung, zustand, genutzt)
+        if termin <= jetzt:
+            fällig.append((termin, sitzung, zustand.get('letzter_lauf')))
+    return [(sitzung, letzter_lauf) for _, sitzung, letzter_lauf in sorted(fällig)]
+
+
+def automatischer_lauf(sitzungs_id):
+    """Synchronisiert eine Sitzung ohne Browser und hinterlegt einen Bericht für ihren nächsten Besuch."""
+    token = AKTIVE_STATUS_SITZUNG.set(sitzungs_id)
+    try:
+        try:
+            zugangsdaten = zugangsdaten_ohne_browser(sicherer_dateiname(sitzungs_id))
+        except Exception:
+            zugangsdaten = None
+        if zugangsdaten is None:
+            ergebnis = 'anmeldung'
+            meldung = "⚠️ Automatische Synchronisation übersprungen: Bitte erneut über Google anmelden."
+            speichere_sitzungszustand(sitzungs_id, letzter_lauf=time.time(), letztes_ergebnis='fehler')
+        else:
+            fehler = sync_events_ausführen(
+                dienst_für('people', 'v1', zugangsdaten),
+                dienst_für('calendar', 'v3', zugangsdaten),
+                sitzungs_id
+            )
+            anzahlen = lade_sitzungszustand(sitzungs_id).get('letzte_anzahlen') or {}
+            if fehler:
+                ergebnis = 'fehler'
+                meldung = "⚠️ Automatische Synchronisation fehlgeschlagen. Bitte manuell synchronisieren."
+            else:
+                ergebnis = 'ok'
+                meldung = (
+                    f"🕑 Automatische Synchronisation: {anzahlen.get('erstellt', 0)} Einträge erstellt, "
+                    f"{anzahlen.get('aktualisiert', 0)} aktualisiert, {anzahlen.get('gelöscht', 0)} entfernt, "
+                    f"{anzahlen.get('unverändert', 0)} unverändert."
+                )
+        metriken.zähle('geburtstage_automatische_synchronisationen_total', ergebnis=ergebnis)
+        speichere_sitzungszustand(sitzungs_id, automatik_bericht={'zeit': time.time(), 'meldung': meldung})
+    finally:
+        AKTIVE_STATUS_SITZUNG.reset(token)
+        automatische_läufe.discard(sitzungs_id)
+        beende_synchronisation_für_sitzung(sitzungs_id)
+
+
+def plane_automatische_läufe(jetzt=None):
+    """Startet fällige Läufe, solange Budget und freie Plätze im Sync-Planer reichen.
+
+    Wartende Browser-Läufe haben Vorrang; geplante Läufe werden nie eingereiht.
+    Liefert die Zahl der gestarteten Läufe.
+    """
+    frei = min(
+        AUTOSYNC_MAX_PARALLEL - len(automatische_läufe),
+        sync_planer.max_parallel - len(sync_planer.aktiv) - len(sync_planer.warteschlange)
+    )
+    if frei <= 0:
+        return 0
+    gestartet = 0
+    for sitzungs_id, letzter_lauf in fällige_automatische_läufe(jetzt or time.time()):
+        if gestartet >= frei:
+            break
+        if not starte_synchronisation_für_sitzung(sitzungs_id):
+            continue
+        # Ein anderer Worker kann die Sitzung gerade erst abgeglichen haben.
+        if lade_sitzungszustand(sitzungs_id).get('letzter_lauf') != letzter_lauf:
+            beende_synchronisation_für_sitzung(sitzungs_id)
+            continue
+        automatische_läufe.add(sitzungs_id)
+        sync_planer.reihe_ein(sitzungs_id, lambda sitzungs_id=sitzungs_id: automatischer_lauf(sitzungs_id))
+        gestartet += 1
+    return gestartet
+
+
+def automatische_synchronisation_im_hintergrund():
+    """Gleicht gespeicherte Zugänge regelmäßig ab, verteilt über den Tag."""
+    # Mehrere Worker sollen nicht im Gleichschritt planen.
+    eventlet.sleep(random.uniform(0, AUTOSYNC_TAKT_SEKUNDEN))
+    while True:
+        try:
+            plane_automatische_läufe()
+        except (OSError, sqlite3.Error):
+            pass
+        eventlet.sleep(AUTOSYNC_TAKT_SEKUNDEN)
+
+
 @app.route('/sync', methods=['POST'])
 def sync_events():
     if not csrf_token_ist_gueltig():
         emit_status("❌ Ungültiges CSRF-Token.")
         return "CSRF-Fehler", 400
 
+    nur_planen = request.values.get('plan', '').lower() in ('1', 'true', 'ja')
     people_service, calendar_service, auth_url = get_services()
     if auth_url:
-        session['oauth_fortsetzung'] = 'sync'
+        session['oauth_fortsetzung'] = 'plan' if nur_planen else 'sync'
         return jsonify({'auth_url': auth_url}), 401
 
     sitzungs_id = aktuelle_sitzungs_id()
@@ -737,16 +3166,72 @@ def sync_events():
     def synchronisation_im_hintergrund():
         token = AKTIVE_STATUS_SITZUNG.set(sitzungs_id)
         try:
-            sync_events_ausführen(people_service, calendar_service)
+            if nur_planen:
+                sync_plan_erstellen(people_service, calendar_service, sitzungs_id)
+            else:
+                emit_status("Synchronisation im Hintergrund gestartet.")
+                sync_events_ausführen(people_service, calendar_service, sitzungs_id)
         finally:
             AKTIVE_STATUS_SITZUNG.reset(token)
             beende_synchronisation_für_sitzung(sitzungs_id)
 
-    socketio.start_background_task(synchronisation_im_hintergrund)
-    emit_status("Synchronisation im Hintergrund gestartet.", sitzungs_id=sitzungs_id)
+    position = sync_planer.reihe_ein(sitzungs_id, synchronisation_im_hintergrund)
+    if position:
+        return jsonify({'status': 'eingereiht', 'position': position}), 202
     return jsonify({'status': 'gestartet'}), 202
 
 
+def sync_plan_erstellen(people_service, calendar_service, sitzungs_id):
+    """Erstellt im Hintergrund den Plan für ``/sync?plan=1``.
+
+    Das Ergebnis geht als Statusmeldung hinaus und liegt ohne Kontaktdaten im
+    Sitzungszustand, sodass ``/sync/status`` es ebenfalls liefert.
+    """
+    emit_status("Erstelle Synchronisationsplan ohne Schreibzugriffe...")
+    try:
+        plan = plane_synchronisation(people_service, calendar_service, sitzungs_id)
+    except HttpError as fehler:
+        emit_status(f"❌ Google API Fehler beim Planen (HTTP {google_fehler_status(fehler)}).")
+        return None
+    except Exception:
+        emit_status("❌ Unerwarteter Fehler beim Planen.")
+        return None
+    speichere_sitzungszustand(sitzungs_id, letzter_plan=dict(plan, erstellt=time.time()))
+    emit_status(
+        f"📋 Plan: {plan['einfügen']} neu, {plan['aktualisieren']} geändert, {plan['löschen']} entfallen, "
+        f"{plan['unverändert']} unverändert; {plan['schreib_aufrufe']} Schreibaufrufe mit "
+        f"{plan['teilanforderungen']} Teilanforderungen, etwa {plan['geschätzte_dauer_sekunden']:.0f} s."
+    )
+    return plan
+
+
+@app.route('/automatik', methods=['POST'])
+def automatik_umschalten():
+    """Schaltet den geplanten Abgleich ohne Browser für diese Sitzung ein oder aus."""
+    if not csrf_token_ist_gueltig():
+        return jsonify({'fehler': 'Ungültiges CSRF-Token.'}), 400
+    if not automatik_intervall_text():
+        return jsonify({'fehler': 'Der geplante Abgleich ist auf diesem Server nicht aktiviert.'}), 404
+    if not token_speicher().existiert(token_schlüssel()):
+        return jsonify({'fehler': 'Bitte zuerst mit Google verbinden.'}), 409
+    aktiv = bool((request.get_json(silent=True) or {}).get('aktiv'))
+    speichere_sitzungszustand(aktuelle_sitzungs_id(), automatik=aktiv)
+    return jsonify({'automatik': aktiv})
+
+
+@app.route('/sync/status')
+def sync_status():
+    """Liefert den Zustand des Synchronisationslaufs dieser Sitzung."""
+    sitzungs_id = aktuelle_sitzungs_id()
+    antwort = sync_planer.status(sitzungs_id)
+    if antwort['zustand'] == 'inaktiv' and synchronisation_läuft_anderswo(sitzungs_id):
+        antwort['zustand'] = 'läuft'
+    letzter_plan = lade_sitzungszustand(sitzungs_id).get('letzter_plan')
+    if letzter_plan:
+        antwort['letzter_plan'] = letzter_plan
+    return jsonify(antwort)
+
+
 @app.route('/zugang-loeschen', methods=['POST'])
 def google_zugang_löschen():
     """Widerruft Google-Zugriff und löscht den lokalen OAuth-Token."""
@@ -759,9 +3244,12 @@ def google_zugang_löschen():
         bei_google_widerrufen = widerrufe_google_zugang(zugangsdaten)
 
     lokal_gelöscht = lösche_zugangsdaten()
+    kalender_schnappschüsse.pop(aktuelle_sitzungs_id(), None)
+    if sync_planer.entferne(aktuelle_sitzungs_id()):
+        beende_synchronisation_für_sitzung(aktuelle_sitzungs_id())
     oauth_state = session.get('oauth_state')
     if oauth_state:
-        flows.pop(oauth_state, None)
+        vergiss_oauth_flow(oauth_state)
     session.clear()
 
     if zugangsdaten and not bei_google_widerrufen:
@@ -797,7 +3285,7 @@ def oauth2callback():
         emit_status("❌ OAuth-Status stimmt nicht mit der Session überein.")
         return "Ungültiger OAuth-Status", 400
 
-    flow = flows.get(state)
+    flow = hole_oauth_flow(state)
     if not flow:
         emit_status("❌ OAuth-Flow nicht gefunden. Bitte erneut starten.")
         return "OAuth-Flow fehlt", 400
@@ -810,16 +3298,21 @@ def oauth2callback():
 
     creds = flow.credentials
     speichere_zugangsdaten(creds)
-    flows.pop(state, None)
+    vergiss_oauth_flow(state)
     session.pop('oauth_state', None)
     emit_status("✅ OAuth erfolgreich abgeschlossen.")
     fortsetzung = session.pop('oauth_fortsetzung', 'sync')
-    if fortsetzung != 'sync':
+    if fortsetzung not in ('sync', 'plan'):
         fortsetzung = 'sync'
     return redirect(url_for('index', autostart=fortsetzung))
 
 if __name__ == '__main__':
+    lade_dienstvorlagen()
     socketio.start_background_task(token_bereinigung_im_hintergrund)
+    socketio.start_background_task(zugangsdaten_erneuerung_im_hintergrund)
+    socketio.start_background_task(oauth_flow_bereinigung_im_hintergrund)
+    if AUTOSYNC_INTERVALL_SEKUNDEN > 0:
+        socketio.start_background_task(automatische_synchronisation_im_hintergrund)
     socketio.run(
         app,
         debug=umgebung_ist_wahr('FLASK_DEBUG', False),
@@ -0,0 +1,376 @@
+"""Lokaler Ersatz für People API und Calendar API für Benchmarks und Lasttests.
+
+Die Attrappe bildet nur das ab, was ``app.py`` nutzt: seitenweises Lesen der
+Kontakte und Kalendertermine samt Sync-Tokens, die Kalenderliste, Einfügen,
+Aktualisieren und Löschen von Terminen sowie Batch-Anforderungen. Latenz,
+zufällige 429- und 5xx-Antworten und ein Kontingent pro Sekunde lassen sich
+einstellen, damit Durchsatz und Wiederholungslogik ohne Google messbar sind.
+
+:class:`GoogleServer` stellt die Attrappen über einen lokalen HTTP-Endpunkt
+mit den REST-Pfaden, dem Batch-Format, Feldmasken und gzip der Google-APIs
+bereit. Die Dienste der Anwendung entstehen dabei wie im Betrieb über
+``dienst_für``, sodass Verbindungspool, Byte-Zählung, Feldmasken und Batches
+mitgemessen werden.
+"""
+import email.parser
+import gzip
+import json
+import os
+import random
+import re
+import time
+import urllib.parse
+import uuid
+from collections import deque
+
+import eventlet
+import eventlet.wsgi
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import build_http
+
+
+def synthetische_kontakte(anzahl):
+    """Erzeugt People-API-Kontakte mit Geburtstag und jedem dritten Jahrestag."""
+    for nummer in range(anzahl):
+        person = {
+            'resourceName': f'people/c{nummer}',
+            'names': [{'displayName': f'Kontakt {nummer}'}],
+            'birthdays': [{'date': {'year': 1950 + nummer % 60, 'month': nummer % 12 + 1, 'day': nummer % 28 + 1}}],
+        }
+        if nummer % 3 == 0:
+            person['events'] = [{
+                'type': 'anniversary',
+                'formattedType': 'Jahrestag',
+                'date': {'year': 2000 + nummer % 20, 'month': nummer % 12 + 1, 'day': nummer % 28 + 1},
+            }]
+        yield person
+
+
+class GoogleFehler(Exception):
+    """Fehlerantwort der Attrappe mit HTTP-Status und Google-Fehlergrund."""
+
+    def __init__(self, status, grund):
+        super().__init__(grund)
+        self.status = status
+        self.grund = grund
+
+
+class GoogleAttrappe:
+    """Dient zugleich als People- und als Calendar-Dienst einer Sitzung.
+
+    ``kontingent`` begrenzt die Teilanforderungen pro Sekunde wie Googles
+    Nutzerkontingent; darüber hinaus wird mit 429 geantwortet.
+    """
+
+    def __init__(self, kontakte, latenz=0.0, fehlerquote_429=0.0, fehlerquote_5xx=0.0,
+                 kontingent=None, seed=0):
+        self.latenz = latenz
+        self.fehlerquote_429 = fehlerquote_429
+        self.fehlerquote_5xx = fehlerquote_5xx
+        self.kontingent = kontingent
+        self.zufall = random.Random(seed)
+        self.http_aufrufe = 0
+        self.teilanforderungen = 0
+        self.fehler_eingestreut = 0
+        self.letzte_anforderungen = deque()
+
+        self.stand = 1
+        self.kontakte = {person['resourceName']: (self.stand, person) for person in kontakte}
+        self.kalender = {}
+        self.termine = {}
+        self.nächste_id = 0
+
+    # Störungen und Kontingent
+
+    def http_aufruf(self, teilanforderungen):
+        self.http_aufrufe += 1
+        self.teilanforderungen += teilanforderungen
+        if self.latenz:
+            time.sleep(self.latenz)
+
+    def prüfe_störung(self):
+        if self.kontingent:
+            jetzt = time.monotonic()
+            while self.letzte_anforderungen and jetzt - self.letzte_anforderungen[0] >= 1.0:
+                self.letzte_anforderungen.popleft()
+            if len(self.letzte_anforderungen) >= self.kontingent:
+                self.fehler_eingestreut += 1
+                raise GoogleFehler(429, 'rateLimitExceeded')
+            self.letzte_anforderungen.append(jetzt)
+        wurf = self.zufall.random()
+        if wurf < self.fehlerquote_429:
+            self.fehler_eingestreut += 1
+            raise GoogleFehler(429, 'rateLimitExceeded')
+        if wurf < self.fehlerquote_429 + self.fehlerquote_5xx:
+            self.fehler_eingestreut += 1
+            raise GoogleFehler(503, 'backendError')
+
+    def ändere_kontakte(self, personen):
+        """Legt Kontakte an oder ändert sie, sichtbar für den nächsten Delta-Abruf."""
+        self.stand += 1
+        for person in personen:
+            self.kontakte[person['resourceName']] = (self.stand, person)
+
+    # People API
+
+    def liste_kontakte(self, resourceName, personFields, pageSize=100, pageToken=None,
+                       requestSyncToken=False, syncToken=None, **_):
+        ab_stand = int(syncToken) if syncToken else 0
+        passende = [person for stand, person in self.kontakte.values() if stand > ab_stand]
+        beginn = int(pageToken or 0)
+        antwort = {'connections': passende[beginn:beginn + pageSize], 'totalPeople': len(passende)}
+        if beginn + pageSize < len(passende):
+            antwort['nextPageToken'] = str(beginn + pageSize)
+        elif requestSyncToken:
+            antwort['nextSyncToken'] = str(self.stand)
+        return antwort
+
+    # Calendar API
+
+    def liste_kalender(self, maxResults=100, pageToken=None, **_):
+        alle = list(self.kalender.values())
+        beginn = int(pageToken or 0)
+        antwort = {'items': alle[beginn:beginn + maxResults]}
+        if beginn + maxResults < len(alle):
+            antwort['nextPageToken'] = str(beginn + maxResults)
+        return antwort
+
+    def hole_kalender(self, calendarId, **_):
+        if calendarId not in self.kalender:
+            raise GoogleFehler(404, 'notFound')
+        return self.kalender[calendarId]
+
+    def erstelle_kalender(self, body):
+        kalender = dict(body, id=f'kalender-{len(self.kalender) + 1}')
+        self.kalender[kalender['id']] = kalender
+        self.termine[kalender['id']] = {}
+        return kalender
+
+    def liste_termine(self, calendarId, maxResults=250, pageToken=None, syncToken=None, **_):
+        ab_stand = int(syncToken) if syncToken else 0
+        passende = [
+            termin for stand, termin in self.termine[calendarId].values()
+            if stand > ab_stand and (syncToken or termin.get('status') != 'cancelled')
+        ]
+        beginn = int(pageToken or 0)
+        antwort = {'items': passende[beginn:beginn + maxResults]}
+        if beginn + maxResults < len(passende):
+            antwort['nextPageToken'] = str(beginn + maxResults)
+        else:
+            antwort['nextSyncToken'] = str(self.stand)
+        return antwort
+
+    def speichere_termin(self, calendarId, termin):
+        self.stand += 1
+        self.termine[calendarId][termin['id']] = (self.stand, termin)
+        return dict(termin)
+
+    def füge_termin_ein(self, calendarId, body):
+        self.nächste_id += 1
+        return self.speichere_termin(calendarId, dict(body, id=f'termin-{self.nächste_id}'))
+
+    def aktualisiere_termin(self, calendarId, eventId, body):
+        if eventId not in self.termine[calendarId]:
+            raise GoogleFehler(404, 'notFound')
+        return self.speichere_termin(calendarId, dict(body, id=eventId))
+
+    def lösche_termin(self, calendarId, eventId):
+        vorhanden = self.termine[calendarId].get(eventId)
+        if vorhanden is None or vorhanden[1].get('status') == 'cancelled':
+            raise GoogleFehler(410, 'deleted')
+        self.speichere_termin(calendarId, {'id': eventId, 'status': 'cancelled'})
+        return ''
+
+    def anzahl_termine(self):
+        return sum(
+            1
+            for termine in self.termine.values()
+            for _, termin in termine.values()
+            if termin.get('status') != 'cancelled'
+        )
+
+
+def lies_feldmaske(maske):
+    """Zerlegt eine Feldmaske wie ``items(id,start/date),nextPageToken`` in einen Baum.
+
+    Jedes Feld wird auf seine Unterauswahl abgebildet, ``None`` steht für das
+    ganze Feld.
+    """
+    baum = {}
+
+    def liste(position, ziel):
+        while position < len(maske) and maske[position] != ')':
+            knoten = ziel
+            while True:
+                name = re.match(r'[^,()/]+', maske[position:]).group()
+                position += len(name)
+                zeichen = maske[position:position + 1]
+                if zeichen == '/':
+                    knoten = knoten.setdefault(name, {})
+                    position += 1
+                    continue
+                if zeichen == '(':
+                    position = liste(position + 1, knoten.setdefault(name, {})) + 1
+                else:
+                    knoten[name] = None
+                break
+            if maske[position:position + 1] == ',':
+                position += 1
+        return position
+
+    liste(0, baum)
+    return baum
+
+
+def wende_feldmaske_an(wert, baum):
+    """Behält in ``wert`` nur die Felder aus ``baum``; Listen werden elementweise gekürzt."""
+    if baum is None:
+        return wert
+    if isinstance(wert, list):
+        return [wende_feldmaske_an(eintrag, baum) for eintrag in wert]
+    if not isinstance(wert, dict):
+        return wert
+    return {name: wende_feldmaske_an(wert[name], unterbaum) for name, unterbaum in baum.items() if name in wert}
+
+
+ROUTEN = [
+    (methode, re.compile(muster), name)
+    for methode, muster, name in (
+        ('GET', r'/v1/(?P<resourceName>people/[^/]+)/connections', 'liste_kontakte'),
+        ('GET', r'/calendar/v3/users/me/calendarList', 'liste_kalender'),
+        ('POST', r'/calendar/v3/calendars', 'erstelle_kalender'),
+        ('GET', r'/calendar/v3/calendars/(?P<calendarId>[^/]+)', 'hole_kalender'),
+        ('GET', r'/calendar/v3/calendars/(?P<calendarId>[^/]+)/events', 'liste_termine'),
+        ('POST', r'/calendar/v3/calendars/(?P<calendarId>[^/]+)/events', 'füge_termin_ein'),
+        ('PUT', r'/calendar/v3/calendars/(?P<calendarId>[^/]+)/events/(?P<eventId>[^/]+)', 'aktualisiere_termin'),
+        ('DELETE', r'/calendar/v3/calendars/(?P<calendarId>[^/]+)/events/(?P<eventId>[^/]+)', 'lösche_termin'),
+    )
+]
+BATCH_PFADE = ('/batch', '/batch/calendar/v3')
+ZAHL_PARAMETER = ('pageSize', 'maxResults')
+STATUSTEXTE = {200: 'OK', 204: 'No Content', 404: 'Not Found', 410: 'Gone', 429: 'Too Many Requests',
+               503: 'Service Unavailable'}
+
+
+def als_parameterwert(name, wert):
+    if name in ZAHL_PARAMETER:
+        return int(wert)
+    return {'true': True, 'false': False}.get(wert, wert)
+
+
+class GoogleServer:
+    """Stellt Attrappen als lokalen HTTP-Endpunkt der People- und Calendar-API bereit.
+
+    Welche Attrappe antwortet, bestimmt der Zugriffstoken im
+    ``Authorization``-Header; ``attrappen`` bildet Tokens auf Attrappen ab und
+    darf nach dem Start ergänzt werden. Der Server läuft als Greenlet im
+    Prozess der Anwendung, die Anforderungen gehen aber über echte Sockets.
+    Wie bei Google wird gzip nur geliefert, wenn zusätzlich der User-Agent
+    ``gzip`` enthält.
+    """
+
+    def __init__(self, attrappen):
+        self.attrappen = attrappen
+        self.socket = eventlet.listen(('127.0.0.1', 0))
+        self.url = f"http://127.0.0.1:{self.socket.getsockname()[1]}/"
+        self.antwortbytes = 0
+        self.server = eventlet.spawn(eventlet.wsgi.server, self.socket, self, log_output=False)
+
+    def richte_dienste_ein(self, anwendung):
+        """Lenkt die Dienstvorlagen der Anwendung auf diesen Server um."""
+        for name, version in (('people', 'v1'), ('calendar', 'v3')):
+            pfad = os.path.join(anwendung.DISCOVERY_DIR, f"{name}.{version}.json")
+            with open(pfad, 'r', encoding='utf-8') as datei:
+                dokument = json.load(datei)
+            dokument['rootUrl'] = self.url
+            dokument['baseUrl'] = self.url + dokument['servicePath']
+            anwendung.dienstvorlagen[(name, version)] = build_from_document(dokument, http=build_http())
+
+    def stoppe(self):
+        self.server.kill()
+        self.socket.close()
+
+    def __call__(self, umgebung, start_response):
+        token = umgebung.get('HTTP_AUTHORIZATION', '').partition(' ')[2]
+        attrappe = self.attrappen.get(token)
+        länge = int(umgebung.get('CONTENT_LENGTH') or 0)
+        inhalt = umgebung['wsgi.input'].read(länge) if länge else b''
+        if attrappe is None:
+            status, kopfzeilen, antwort = self.fehlerantwort(GoogleFehler(401, 'authError'))
+        elif umgebung['PATH_INFO'] in BATCH_PFADE:
+            status, kopfzeilen, antwort = self.stapel(attrappe, umgebung.get('CONTENT_TYPE', ''), inhalt)
+        else:
+            attrappe.http_aufruf(1)
+            status, kopfzeilen, antwort = self.einzeln(
+                attrappe, umgebung['REQUEST_METHOD'], umgebung['PATH_INFO'], umgebung.get('QUERY_STRING', ''), inhalt
+            )
+        if antwort and 'gzip' in umgebung.get('HTTP_ACCEPT_ENCODING', '') \
+                and 'gzip' in umgebung.get('HTTP_USER_AGENT', ''):
+            antwort = gzip.compress(antwort)
+            kopfzeilen.append(('Content-Encoding', 'gzip'))
+        kopfzeilen.append(('Content-Length', str(len(antwort))))
+        self.antwortbytes += len(antwort)
+        start_response(f"{status} {STATUSTEXTE.get(status, '')}", kopfzeilen)
+        return [antwort]
+
+    def einzeln(self, attrappe, methode, pfad, abfrage, inhalt):
+        """Beantwortet eine einzelne REST-Anforderung als ``(status, kopfzeilen, inhalt)``."""
+        parameter = {
+            name: als_parameterwert(name, werte[-1])
+            for name, werte in urllib.parse.parse_qs(abfrage).items()
+        }
+        parameter.pop('alt', None)
+        maske = parameter.pop('fields', None)
+        for routen_methode, muster, name in ROUTEN:
+            treffer = muster.fullmatch(pfad)
+            if routen_methode == methode and treffer:
+                break
+        else:
+            return self.fehlerantwort(GoogleFehler(404, 'notFound'))
+        parameter.update({schlüssel: urllib.parse.unquote(wert) for schlüssel, wert in treffer.groupdict().items()})
+        if inhalt:
+            parameter['body'] = json.loads(inhalt)
+        try:
+            attrappe.prüfe_störung()
+            daten = getattr(attrappe, name)(**parameter)
+        except GoogleFehler as fehler:
+            return self.fehlerantwort(fehler)
+        if methode == 'DELETE':
+            return 204, [], b''
+        if maske:
+            daten = wende_feldmaske_an(daten, lies_feldmaske(maske))
+        return 200, [('Content-Type', 'application/json; charset=UTF-8')], json.dumps(daten).encode()
+
+    @staticmethod
+    def fehlerantwort(fehler):
+        daten = {'error': {
+            'code': fehler.status,
+            'message': fehler.grund,
+            'errors': [{'reason': fehler.grund, 'message': fehler.grund}],
+        }}
+        return fehler.status, [('Content-Type', 'application/json; charset=UTF-8')], json.dumps(daten).encode()
+
+    def stapel(self, attrappe, inhaltstyp, inhalt):
+        """Beantwortet eine ``multipart/mixed``-Batch-Anforderung Teil für Teil."""
+        nachricht = email.parser.BytesParser().parsebytes(
+            f"Content-Type: {inhaltstyp}\r\n\r\n".encode() + inhalt
+        )
+        teile = nachricht.get_payload()
+        attrappe.http_aufruf(len(teile))
+        grenze = uuid.uuid4().hex
+        antwort = []
+        for teil in teile:
+            anfrage = teil.get_payload().replace('\r\n', '\n')
+            kopf, _, körper = anfrage.partition('\n\n')
+            methode, ziel, _ = kopf.split('\n', 1)[0].split(' ', 2)
+            pfad, _, abfrage = ziel.partition('?')
+            status, kopfzeilen, daten = self.einzeln(attrappe, methode, pfad, abfrage, körper.encode())
+            antwort.append(
+                f"--{grenze}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{teil['Content-ID'][1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {STATUSTEXTE.get(status, '')}\r\n"
+                + ''.join(f"{name}: {wert}\r\n" for name, wert in kopfzeilen)
+                + f"\r\n{daten.decode()}\r\n"
+            )
+        antwort.append(f"--{grenze}--\r\n")
+        return 200, [('Content-Type', f'multipart/mixed; boundary={grenze}')], ''.join(antwort).encode()
@@ -0,0 +1,216 @@
+"""Lasttest mit vielen gleichzeitigen Sitzungen gegen die lokale Google-Attrappe.
+
+Jede simulierte Sitzung ruft die Startseite auf (Sitzungs-ID und CSRF-Token),
+erhält vorab gespeicherte OAuth-Zugangsdaten im Token-Speicher, verbindet einen
+Socket.IO-Client mit ihrem Status-Raum, startet ``/sync`` und fragt
+``/sync/status`` ab, bis der Lauf beendet ist. Alle Sitzungen laufen als
+Greenlets im selben eventlet-Prozess wie die Anwendung. Die Attrappen antworten
+über einen gemeinsamen lokalen HTTP-Endpunkt; die Anwendung erreicht ihn über
+ihre echten Dienste, den Verbindungspool und Batch-Anforderungen.
+
+Ausgegeben werden p50/p99 der HTTP-Latenz je Endpunkt, die Verzögerung zwischen
+``emit_status`` und dem Versand des Socket.IO-Frames sowie Blockaden der
+Ereignisschleife (Überschreitung eines 10-ms-Takts). Wie beim Durchsatz-Benchmark
+wird der gemeinsame Ratenbegrenzer ohne ``--echte-raten`` weit geöffnet.
+
+Aufruf aus dem Projektverzeichnis, zum Beispiel::
+
+    python benchmarks/last_test.py --sitzungen 50
+    python benchmarks/last_test.py --sitzungen 200 --kontakte 500 --latenz 0.02
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_SECRET_KEY', 'lasttest')
+os.environ.setdefault('FLASK_SESSION_COOKIE_SECURE', '0')
+
+TAKT_SEKUNDEN = 0.01
+
+
+def argumente():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--sitzungen', type=int, default=50)
+    parser.add_argument('--kontakte', type=int, default=200, help='Kontakte pro Sitzung')
+    parser.add_argument('--latenz', type=float, default=0.01, help='Sekunden pro Google-Aufruf')
+    parser.add_argument('--abfrageintervall', type=float, default=0.25, help='Sekunden zwischen /sync/status')
+    parser.add_argument('--echte-raten', action='store_true', help='Ratenbegrenzer nicht öffnen')
+    return parser.parse_args()
+
+
+def perzentil(werte, anteil):
+    if not werte:
+        return 0.0
+    geordnet = sorted(werte)
+    return geordnet[min(len(geordnet) - 1, int(len(geordnet) * anteil))]
+
+
+def zeile(bezeichnung, werte, einheit=1000, suffix='ms'):
+    return (
+        f"{bezeichnung:<24} n={len(werte):>6}  p50={perzentil(werte, 0.5) * einheit:8.1f} {suffix}"
+        f"  p99={perzentil(werte, 0.99) * einheit:8.1f} {suffix}  max={max(werte, default=0) * einheit:8.1f} {suffix}"
+    )
+
+
+class Messung:
+    """Sammelt Latenzen, Statusverzögerungen und Blockaden der Ereignisschleife."""
+
+    def __init__(self):
+        self.http = defaultdict(list)
+        self.status_verzögerung = []
+        self.offene_meldungen = defaultdict(deque)
+        self.blockaden = []
+        self.läuft = True
+
+    def http_aufruf(self, endpunkt, aufruf):
+        beginn = time.perf_counter()
+        antwort = aufruf()
+        self.http[endpunkt].append(time.perf_counter() - beginn)
+        return antwort
+
+    def überwache_ereignisschleife(self, eventlet):
+        while self.läuft:
+            beginn = time.perf_counter()
+            eventlet.sleep(TAKT_SEKUNDEN)
+            self.blockaden.append(max(0.0, time.perf_counter() - beginn - TAKT_SEKUNDEN))
+
+
+def instrumentiere(anwendung, messung):
+    """Misst die Zeit vom Erzeugen einer Statusmeldung bis zum Versand ihres Frames."""
+    emit_status = anwendung.emit_status
+    emit = anwendung.socketio.emit
+
+    def gemessenes_emit_status(msg, sitzungs_id=None):
+        ziel = sitzungs_id or anwendung.AKTIVE_STATUS_SITZUNG.get()
+        if ziel is None and anwendung.has_request_context():
+            ziel = anwendung.session.get('sitzungs_id')
+        messung.offene_meldungen[ziel].append(time.perf_counter())
+        emit_status(msg, sitzungs_id)
+
+    def gemessenes_emit(ereignis, daten=None, to=None, **weiter):
+        if ereignis == 'statusmeldungen':
+            jetzt = time.perf_counter()
+            offen = messung.offene_meldungen[to]
+            for _ in daten:
+                if offen:
+                    messung.status_verzögerung.append(jetzt - offen.popleft())
+        return emit(ereignis, daten, to=to, **weiter)
+
+    anwendung.emit_status = gemessenes_emit_status
+    anwendung.socketio.emit = gemessenes_emit
+
+
+def sitzung(anwendung, attrappen, messung, nummer, optionen):
+    from google_attrappe import GoogleAttrappe, synthetische_kontakte
+
+    client = anwendung.app.test_client()
+    messung.http_aufruf('GET /', lambda: client.get('/'))
+    with client.session_transaction() as daten:
+        sitzungs_id = daten['sitzungs_id']
+        csrf_token = daten['csrf_token']
+
+    schlüssel = anwendung.sicherer_dateiname(sitzungs_id)
+    # Der Zugriffstoken ist der Sitzungsschlüssel; daran erkennt der Server die Attrappe.
+    attrappen[schlüssel] = GoogleAttrappe(
+        synthetische_kontakte(optionen.kontakte), latenz=optionen.latenz, seed=nummer
+    )
+    anwendung.token_speicher().speichere(schlüssel, json.dumps({
+        'token': schlüssel,
+        'refresh_token': schlüssel,
+        'client_id': 'lasttest',
+        'client_secret': 'lasttest',
+        'scopes': anwendung.SCOPES,
+    }))
+    # Gültige Zugriffstokens liegen im Betrieb nach der Vorab-Erneuerung im Cache.
+    zugangsdaten = anwendung.Credentials(schlüssel, refresh_token=schlüssel, scopes=anwendung.SCOPES)
+    zugangsdaten.expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    anwendung.merke_zugangsdaten(schlüssel, zugangsdaten)
+
+    socket = anwendung.socketio.test_client(anwendung.app, flask_test_client=client)
+    antwort = messung.http_aufruf(
+        'POST /sync', lambda: client.post('/sync', headers={'X-CSRF-Token': csrf_token})
+    )
+    if antwort.status_code != 202:
+        return False, 0
+
+    import eventlet
+    while True:
+        eventlet.sleep(optionen.abfrageintervall)
+        zustand = messung.http_aufruf('GET /sync/status', lambda: client.get('/sync/status')).get_json()
+        if zustand['zustand'] == 'inaktiv':
+            break
+
+    meldungen = [
+        meldung
+        for paket in socket.get_received()
+        if paket['name'] == 'statusmeldungen'
+        for meldung in paket['args'][0]
+    ]
+    socket.disconnect()
+    return any('🎉' in meldung for meldung in meldungen), len(meldungen)
+
+
+def main():
+    optionen = argumente()
+    if 'TOKEN_SPEICHER_DIR' in os.environ:
+        miss_last(optionen)
+        return
+    # Ohne eigenes Verzeichnis landen die Tokens in einem temporären, das danach verschwindet.
+    with tempfile.TemporaryDirectory(prefix='geburtstage-lasttest-') as verzeichnis:
+        os.environ['TOKEN_SPEICHER_DIR'] = verzeichnis
+        miss_last(optionen)
+
+
+def miss_last(optionen):
+    if not optionen.echte_raten:
+        os.environ.setdefault('EINFUEGE_PAUSE_SEKUNDEN', '0.000001')
+        os.environ.setdefault('GOOGLE_NUTZER_MAX_RATE', '1000000')
+        os.environ.setdefault('GOOGLE_PROJEKT_MAX_RATE', '1000000')
+
+    import eventlet
+    import app as anwendung
+    from google_attrappe import GoogleServer
+
+    anwendung.app.config.update(SESSION_COOKIE_SECURE=False)
+    attrappen = {}
+    server = GoogleServer(attrappen)
+    server.richte_dienste_ein(anwendung)
+    messung = Messung()
+    instrumentiere(anwendung, messung)
+
+    wächter = eventlet.spawn(messung.überwache_ereignisschleife, eventlet)
+    beginn = time.perf_counter()
+    with open(os.devnull, 'w') as stumm, contextlib.redirect_stdout(stumm):
+        pool = eventlet.GreenPool(optionen.sitzungen)
+        ergebnisse = list(pool.imap(
+            lambda nummer: sitzung(anwendung, attrappen, messung, nummer, optionen),
+            range(optionen.sitzungen)
+        ))
+    dauer = time.perf_counter() - beginn
+    messung.läuft = False
+    wächter.wait()
+    server.stoppe()
+
+    erfolgreich = sum(1 for fertig, _ in ergebnisse if fertig)
+    print(
+        f"{optionen.sitzungen} Sitzungen mit je {optionen.kontakte} Kontakten, "
+        f"SYNC_MAX_PARALLEL={anwendung.SYNC_MAX_PARALLEL}: {dauer:.1f} s, "
+        f"{erfolgreich} Synchronisierungen abgeschlossen, "
+        f"{sum(anzahl for _, anzahl in ergebnisse)} Statuszeilen empfangen."
+    )
+    for endpunkt, werte in messung.http.items():
+        print(zeile(endpunkt, werte))
+    print(zeile('Statusverzögerung', messung.status_verzögerung))
+    print(zeile('Blockade Ereignisschleife', messung.blockaden))
+    print(f"{'':<24} {sum(1 for wert in messung.blockaden if wert > 0.1)} Blockaden über 100 ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Speicherbedarf der Kontaktereignisse für große Adressbücher.
+
+Vergleicht die früheren Wörterbücher pro datiertem Kontaktfeld mit
+``Kontaktereignis`` und gibt Bytes pro Ereignis (tracemalloc) sowie den
+höchsten Arbeitsspeicher des Prozesses (RSS) aus.
+
+Aufruf aus dem Projektverzeichnis::
+
+    python benchmarks/speicher_kontaktereignisse.py [1000 10000 100000]
+"""
+import os
+import resource
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+
+import app as anwendung  # noqa: E402
+from google_attrappe import synthetische_kontakte  # noqa: E402
+
+
+def als_wörterbuch(ereignis):
+    """Bildet die frühere Darstellung mit verschachteltem Datum nach."""
+    jahr, monat, tag = (int(teil) for teil in ereignis.datum.split('-'))
+    return {
+        'name': ereignis.name,
+        'date': {'year': jahr, 'month': monat, 'day': tag},
+        'event_type': ereignis.event_type,
+        'label': ereignis.label,
+        'quelle': ereignis.quelle,
+    }
+
+
+def miss(kontakte, umwandlung):
+    tracemalloc.start()
+    ereignisse = [
+        umwandlung(ereignis)
+        for person in kontakte
+        for ereignis in anwendung.ereignisse_der_person(person)
+    ]
+    belegt, spitze = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(ereignisse), belegt, spitze
+
+
+def main(größen):
+    print(f"{'Kontakte':>9} {'Darstellung':<15} {'Ereignisse':>10} {'Bytes/Ereignis':>15} {'Spitze MiB':>11} {'RSS MiB':>8}")
+    for anzahl in größen:
+        kontakte = list(synthetische_kontakte(anzahl))
+        for bezeichnung, umwandlung in (
+            ('Wörterbuch', als_wörterbuch),
+            ('Kontaktereignis', lambda ereignis: ereignis),
+        ):
+            ereignisse, belegt, spitze = miss(kontakte, umwandlung)
+            # ru_maxrss ist unter Linux in KiB angegeben.
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(
+                f"{anzahl:>9} {bezeichnung:<15} {ereignisse:>10} "
+                f"{belegt / ereignisse:>15.1f} {spitze / 2 ** 20:>11.1f} {rss:>8.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main([int(wert) for wert in sys.argv[1:]] or [1000, 10000, 100000])
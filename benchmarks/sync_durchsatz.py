@@ -0,0 +1,131 @@
+"""Durchsatz vollständiger Synchronisierungen gegen die lokale Google-Attrappe.
+
+Für jede Kontaktzahl läuft ``sync_events_ausführen`` einmal vollständig gegen
+einen leeren Kalender und einmal als Folgelauf ohne Änderungen. Die Attrappe
+antwortet über einen lokalen HTTP-Endpunkt; die Dienste entstehen wie im
+Betrieb über ``dienst_für`` samt Verbindungspool, Feldmasken und gzip.
+Ausgegeben werden Ereignisse pro Sekunde, HTTP-Aufrufe, Teilanforderungen und
+übertragene Antwortbytes pro Ereignis sowie der Spitzenwert des
+Python-Speichers (tracemalloc, einschließlich der Attrappe im selben Prozess).
+
+Aufruf aus dem Projektverzeichnis, zum Beispiel::
+
+    python benchmarks/sync_durchsatz.py 100 1000 10000 50000
+    python benchmarks/sync_durchsatz.py --latenz 0.05 --fehler-429 0.01 --kontingent 500 1000
+
+Der gemeinsame Ratenbegrenzer der Anwendung wird ohne ``--echte-raten`` weit
+geöffnet, damit die Messung den Code und nicht die eingestellte Drosselung zeigt.
+Eingestreute 429-Antworten senken ihn trotzdem wie im Betrieb (AIMD).
+"""
+import argparse
+import contextlib
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+os.environ.setdefault('RATE_LIMIT_START_WARTEZEIT', '0.05')
+
+
+def argumente():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('kontakte', nargs='*', type=int, default=[100, 1000, 10000, 50000])
+    parser.add_argument('--latenz', type=float, default=0.0, help='Sekunden pro HTTP-Aufruf')
+    parser.add_argument('--fehler-429', type=float, default=0.0, help='Anteil der 429-Antworten')
+    parser.add_argument('--fehler-5xx', type=float, default=0.0, help='Anteil der 503-Antworten')
+    parser.add_argument('--kontingent', type=int, default=None, help='Teilanforderungen pro Sekunde')
+    parser.add_argument('--modus', choices=('abgleich', 'neuaufbau'), default='abgleich')
+    parser.add_argument('--echte-raten', action='store_true', help='Ratenbegrenzer nicht öffnen')
+    return parser.parse_args()
+
+
+def miss_lauf(anwendung, server, attrappe, sitzungs_id):
+    http_vorher = attrappe.http_aufrufe
+    teile_vorher = attrappe.teilanforderungen
+    bytes_vorher = server.antwortbytes
+    zugangsdaten = anwendung.Credentials(sitzungs_id)
+    people_service = anwendung.dienst_für('people', 'v1', zugangsdaten)
+    calendar_service = anwendung.dienst_für('calendar', 'v3', zugangsdaten)
+    tracemalloc.start()
+    beginn = time.perf_counter()
+    token = anwendung.AKTIVE_STATUS_SITZUNG.set(sitzungs_id)
+    try:
+        # Wichtige Statusmeldungen landen sonst zwischen den Tabellenzeilen.
+        with open(os.devnull, 'w') as stumm, contextlib.redirect_stdout(stumm):
+            fehler = anwendung.sync_events_ausführen(people_service, calendar_service, sitzungs_id)
+    finally:
+        anwendung.AKTIVE_STATUS_SITZUNG.reset(token)
+    dauer = time.perf_counter() - beginn
+    _, spitze = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'fehler': fehler is not None,
+        'dauer': dauer,
+        'http': attrappe.http_aufrufe - http_vorher,
+        'teile': attrappe.teilanforderungen - teile_vorher,
+        'bytes': server.antwortbytes - bytes_vorher,
+        'spitze': spitze,
+    }
+
+
+def main():
+    optionen = argumente()
+    if 'TOKEN_SPEICHER_DIR' in os.environ:
+        messe(optionen)
+        return
+    # Ohne eigenes Verzeichnis landen die Tokens in einem temporären, das danach verschwindet.
+    with tempfile.TemporaryDirectory(prefix='geburtstage-benchmark-') as verzeichnis:
+        os.environ['TOKEN_SPEICHER_DIR'] = verzeichnis
+        messe(optionen)
+
+
+def messe(optionen):
+    if not optionen.echte_raten:
+        os.environ.setdefault('EINFUEGE_PAUSE_SEKUNDEN', '0.000001')
+        os.environ.setdefault('GOOGLE_NUTZER_MAX_RATE', '1000000')
+        os.environ.setdefault('GOOGLE_PROJEKT_MAX_RATE', '1000000')
+
+    import app as anwendung
+    from google_attrappe import GoogleAttrappe, GoogleServer, synthetische_kontakte
+
+    anwendung.SYNC_MODUS = optionen.modus
+    attrappen = {}
+    server = GoogleServer(attrappen)
+    server.richte_dienste_ein(anwendung)
+    print(
+        f"{'Kontakte':>9} {'Lauf':<10} {'Ereignisse':>10} {'Sekunden':>9} {'Ereig./s':>9} "
+        f"{'HTTP/Ereig.':>11} {'Teile/Ereig.':>12} {'Bytes/Ereig.':>12} {'Spitze MiB':>11} {'RSS MiB':>8}"
+    )
+    for anzahl in optionen.kontakte:
+        attrappe = GoogleAttrappe(
+            synthetische_kontakte(anzahl),
+            latenz=optionen.latenz,
+            fehlerquote_429=optionen.fehler_429,
+            fehlerquote_5xx=optionen.fehler_5xx,
+            kontingent=optionen.kontingent,
+        )
+        sitzungs_id = f'benchmark-{anzahl}'
+        attrappen[sitzungs_id] = attrappe
+        for lauf in ('erstlauf', 'folgelauf'):
+            messung = miss_lauf(anwendung, server, attrappe, sitzungs_id)
+            ereignisse = attrappe.anzahl_termine()
+            # ru_maxrss ist unter Linux in KiB angegeben.
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(
+                f"{anzahl:>9} {lauf:<10} {ereignisse:>10} {messung['dauer']:>9.2f} "
+                f"{ereignisse / messung['dauer']:>9.0f} {messung['http'] / max(1, ereignisse):>11.3f} "
+                f"{messung['teile'] / max(1, ereignisse):>12.3f} {messung['bytes'] / max(1, ereignisse):>12.1f} "
+                f"{messung['spitze'] / 2 ** 20:>11.1f} "
+                f"{rss:>8.1f}" + ('  (mit Fehler beendet)' if messung['fehler'] else '')
+            )
+        if attrappe.fehler_eingestreut:
+            print(f"{'':>9} {attrappe.fehler_eingestreut} Fehlerantworten eingestreut")
+    server.stoppe()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,18 @@
+import datetime
+import gzip
+import json
 import os
 import tempfile
 import time
 import unittest
 from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
 from unittest.mock import patch
 
+import eventlet.wsgi
+import httplib2
+from googleapiclient.errors import HttpError
+
 import app as anwendung
 
 
@@ -13,14 +21,18 @@ class AusführbareAnforderung:
         self.ergebnis = ergebnis
 
     def execute(self):
+        if isinstance(self.ergebnis, Exception):
+            raise self.ergebnis
         return self.ergebnis
 
 
 class Verbindungen:
     def __init__(self, seiten):
         self.seiten = list(seiten)
+        self.parameter = []
 
-    def list(self, **_):
+    def list(self, **parameter):
+        self.parameter.append(parameter)
         return AusführbareAnforderung(self.seiten.pop(0))
 
 
@@ -40,6 +52,136 @@ class PersonenDienst:
         return self.personen
 
 
+class FehlschlagendeAnforderung:
+    def __init__(self, status, ergebnis):
+        self.status = status
+        self.ergebnis = ergebnis
+        self.versuche = 0
+
+    def fehler(self):
+        antwort = httplib2.Response({'status': self.status})
+        return HttpError(antwort, b'rateLimitExceeded')
+
+    def execute(self):
+        self.versuche += 1
+        if self.versuche == 1:
+            raise self.fehler()
+        return self.ergebnis
+
+
+class Stapel:
+    def __init__(self, dienst, callback):
+        self.dienst = dienst
+        self.callback = callback
+        self.anforderungen = []
+
+    def add(self, anforderung, request_id):
+        self.anforderungen.append((request_id, anforderung))
+
+    def execute(self):
+        self.dienst.stapelgrößen.append(len(self.anforderungen))
+        for anforderungs_id, anforderung in self.anforderungen:
+            if isinstance(anforderung, FehlschlagendeAnforderung):
+                anforderung.versuche += 1
+                self.callback(anforderungs_id, None, anforderung.fehler())
+            else:
+                self.callback(anforderungs_id, anforderung.execute(), None)
+
+
+class Kalenderereignisse:
+    def __init__(self, dienst):
+        self.dienst = dienst
+
+    def list(self, **parameter):
+        self.dienst.listenaufrufe.append(parameter)
+        if self.dienst.listen:
+            return AusführbareAnforderung(self.dienst.listen.pop(0))
+        return AusführbareAnforderung({'items': self.dienst.vorhandene})
+
+    def insert(self, calendarId, body):
+        self.dienst.eingefügt.append(body)
+        if len(self.dienst.eingefügt) == self.dienst.fehler_bei:
+            return FehlschlagendeAnforderung(429, {'id': 'wiederholt'})
+        return AusführbareAnforderung({'id': str(len(self.dienst.eingefügt))})
+
+    def update(self, calendarId, eventId, body):
+        self.dienst.aktualisiert.append((eventId, body))
+        return AusführbareAnforderung(body)
+
+    def delete(self, calendarId, eventId):
+        self.dienst.gelöscht.append(eventId)
+        if eventId in self.dienst.fehlerhafte_löschungen:
+            return FehlschlagendeAnforderung(self.dienst.fehlerhafte_löschungen[eventId], '')
+        return AusführbareAnforderung('')
+
+
+class KalenderDienst:
+    def __init__(self, vorhandene=None, fehler_bei=None, fehlerhafte_löschungen=None, listen=None):
+        self.vorhandene = list(vorhandene or [])
+        self.listen = list(listen or [])
+        self.listenaufrufe = []
+        self.fehler_bei = fehler_bei
+        self.fehlerhafte_löschungen = dict(fehlerhafte_löschungen or {})
+        self.eingefügt = []
+        self.aktualisiert = []
+        self.gelöscht = []
+        self.stapelgrößen = []
+
+    def events(self):
+        return Kalenderereignisse(self)
+
+    def new_batch_http_request(self, callback):
+        return Stapel(self, callback)
+
+
+class Kalenderliste:
+    def __init__(self, seiten, kalender):
+        self.seiten = list(seiten)
+        self.kalender = dict(kalender)
+        self.parameter = []
+        self.abrufe = []
+
+    def calendarList(self):
+        return self
+
+    def calendars(self):
+        return self
+
+    def list(self, **parameter):
+        self.parameter.append(parameter)
+        return AusführbareAnforderung(self.seiten.pop(0))
+
+    def get(self, calendarId, fields):
+        self.abrufe.append(calendarId)
+        if calendarId not in self.kalender:
+            return AusführbareAnforderung(HttpError(httplib2.Response({'status': 404}), b'notFound'))
+        return AusführbareAnforderung(self.kalender[calendarId])
+
+
+def geburtstag(name, tag=1, quelle=None):
+    return anwendung.Kontaktereignis(
+        name, {'year': 1980, 'month': 3, 'day': tag}, 'birthday', 'Geburtstag', quelle
+    )
+
+
+def kalendereintrag(ereignis_id, ereignis):
+    return dict(anwendung.kalendereintrag_für(ereignis), id=ereignis_id)
+
+
+class ErneuerbareZugangsdaten:
+    def __init__(self, restlaufzeit):
+        self.refresh_token = 'refresh'
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=restlaufzeit)
+        self.erneuerungen = 0
+
+    def refresh(self, _):
+        self.erneuerungen += 1
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+
+    def to_json(self):
+        return '{}'
+
+
 class OAuthFluss:
     def __init__(self):
         self.credentials = object()
@@ -69,6 +211,36 @@ class GeburtstagsimportTest(unittest.TestCase):
         with self.client.session_transaction() as sitzung:
             return sitzung['csrf_token']
 
+    def frische_metriken(self):
+        """Ersetzt die Metriken bis zum Testende durch leere mit denselben Beschreibungen."""
+        metriken = anwendung.Metriken()
+        for name, (typ, hilfe, grenzen) in anwendung.metriken.beschreibungen.items():
+            metriken.registriere(name, typ, hilfe, grenzen)
+        ersetzung = patch.object(anwendung, 'metriken', metriken)
+        ersetzung.start()
+        self.addCleanup(ersetzung.stop)
+        return metriken
+
+    @patch.object(anwendung, 'STATUS_SAMMELFENSTER_SEKUNDEN', 0.01)
+    def test_statusmeldungen_werden_gesammelt_gesendet(self):
+        with patch.object(anwendung.socketio, 'emit') as emit, \
+                patch.dict(anwendung.statuspuffer, clear=True):
+            anwendung.emit_status('Eins', sitzungs_id='a')
+            anwendung.emit_status('Zwei', sitzungs_id='a')
+            anwendung.emit_status('Drei', sitzungs_id='b')
+            self.assertFalse(emit.called)
+            anwendung.emit_status('⚠️ Rate Limit', sitzungs_id='b')
+            self.assertEqual(emit.call_count, 1)
+            anwendung.emit_status('🎉 Fertig', sitzungs_id='a')
+            anwendung.eventlet.sleep(0.05)
+
+        self.assertEqual(
+            [(aufruf.args[0], len(aufruf.args[1]), aufruf.kwargs['to']) for aufruf in emit.call_args_list],
+            [('statusmeldungen', 2, 'b'), ('statusmeldungen', 3, 'a')],
+        )
+        self.assertTrue(emit.call_args_list[0].args[1][1].endswith('⚠️ Rate Limit'))
+        self.assertTrue(emit.call_args_list[1].args[1][2].endswith('🎉 Fertig'))
+
     def test_zeitstempel_endet_mit_uhr(self):
         zeitstempel = anwendung.aktueller_zeitstempel()
 
@@ -103,8 +275,582 @@ class GeburtstagsimportTest(unittest.TestCase):
 
         self.assertEqual(kontaktzahl, 2)
         self.assertEqual(len(ereignisse), 2)
-        self.assertEqual(ereignisse[0]['label'], 'Geburtstag')
-        self.assertEqual(ereignisse[1]['label'], 'Jahrestag')
+        self.assertEqual(ereignisse[0].label, 'Geburtstag')
+        self.assertEqual(ereignisse[1].label, 'Jahrestag')
+
+    def test_kontaktereignis_ist_kompakt_und_passt_zum_kalendereintrag(self):
+        ereignis = anwendung.Kontaktereignis(
+            'Anna', {'month': 2, 'day': 29}, 'anniversary', 'Jahrestag', 'people/c1#events.0'
+        )
+        eintrag = anwendung.kalendereintrag_für(ereignis)
+
+        self.assertFalse(hasattr(ereignis, '__dict__'))
+        self.assertEqual(ereignis.schlüssel, ('💍 Anna', '2000-02-29'))
+        self.assertIs(ereignis.schlüssel, ereignis.schlüssel)
+        self.assertEqual(ereignis.ende, '2000-03-01')
+        self.assertEqual(anwendung.eintragsschlüssel(eintrag), ereignis.schlüssel)
+        self.assertEqual(eintrag['end']['date'], '2000-03-01')
+        self.assertTrue(anwendung.eintrag_ist_aktuell(eintrag, ereignis))
+
+    def test_abgelaufenes_sync_token_führt_zu_vollständigem_lesen(self):
+        abgelaufen = HttpError(httplib2.Response({'status': 410}), b'EXPIRED_SYNC_TOKEN')
+        dienst = PersonenDienst([
+            abgelaufen,
+            {
+                'connections': [
+                    {
+                        'resourceName': 'people/c1',
+                        'names': [{'displayName': 'Erik Schauer'}],
+                        'birthdays': [{'date': {'month': 1, 'day': 11}}],
+                    },
+                    {'resourceName': 'people/c2', 'metadata': {'deleted': True}},
+                ],
+                'nextSyncToken': 'neues-token',
+            },
+        ])
+
+        with anwendung.app.test_request_context('/'):
+            ereignisse, _, betroffene, sync_token = anwendung.lese_kontakte(dienst, 'altes-token')
+
+        parameter = dienst.personen.verbindungen.parameter
+        self.assertEqual(parameter[0]['syncToken'], 'altes-token')
+        self.assertNotIn('syncToken', parameter[1])
+        self.assertTrue(parameter[1]['requestSyncToken'])
+        self.assertIsNone(betroffene)
+        self.assertEqual(sync_token, 'neues-token')
+        self.assertEqual(ereignisse[0].quelle, 'people/c1#birthdays.0')
+
+    def test_abgleich_mit_sync_token_betrifft_nur_geänderte_kontakte(self):
+        vorhanden = [
+            kalendereintrag('fremd', geburtstag('Anna', quelle='people/c1#birthdays.0')),
+            kalendereintrag('gelöscht', geburtstag('Bernd', quelle='people/c2#birthdays.0')),
+        ]
+
+        einfügen, aktualisieren, zu_löschen, unverändert = anwendung.plane_abgleich(
+            vorhanden, [], betroffene_kontakte={'people/c2'}
+        )
+
+        self.assertEqual((einfügen, aktualisieren, zu_löschen), ([], [], ['gelöscht']))
+        self.assertEqual(unverändert, 1)
+
+    @patch.object(anwendung, 'RATE_LIMIT_START_WARTEZEIT', 0)
+    def test_einfügen_erfolgt_gebündelt_mit_einzelner_wiederholung(self):
+        dienst = KalenderDienst(
+            vorhandene=[{'id': 'k0', 'summary': '🎂 Kontakt 0', 'start': {'date': '1980-03-01'}}],
+            fehler_bei=7,
+        )
+        ereignisse = [geburtstag(f'Kontakt {nummer}') for nummer in range(61)]
+
+        with anwendung.app.test_request_context('/'), \
+                patch.object(anwendung, 'emit_status') as emit_status:
+            erstellt, übersprungen = anwendung.create_events(dienst, 'kalender', ereignisse)
+
+        self.assertEqual((erstellt, übersprungen), (60, 1))
+        self.assertEqual(dienst.stapelgrößen, [50, 10])
+        fortschritt = [
+            aufruf.args[0].split(': ', 1)[1] for aufruf in emit_status.call_args_list
+            if aufruf.args[0].endswith('neuen Einträgen geschrieben.')
+        ]
+        self.assertEqual(fortschritt, [
+            '25 von 60 neuen Einträgen geschrieben.',
+            '50 von 60 neuen Einträgen geschrieben.',
+            '60 von 60 neuen Einträgen geschrieben.',
+        ])
+
+    @patch.object(anwendung, 'RATE_LIMIT_START_WARTEZEIT', 0.5)
+    @patch.object(anwendung.time, 'sleep')
+    def test_löschen_erfolgt_gebündelt_und_drosselt_bei_rate_limit(self, sleep):
+        dienst = KalenderDienst(fehlerhafte_löschungen={'b': 429, 'c': 404})
+
+        with anwendung.app.test_request_context('/'):
+            gelöscht, fehlgeschlagen, pause = anwendung.lösche_kalenderereignisse(
+                dienst, 'kalender', ['a', 'b', 'c']
+            )
+
+        self.assertEqual((gelöscht, fehlgeschlagen), (3, 0))
+        self.assertEqual(pause, 0.5)
+        self.assertEqual(dienst.gelöscht.count('b'), 1)
+
+    def test_kalenderschnappschuss_holt_nur_änderungen(self):
+        dienst = KalenderDienst(listen=[
+            {'items': [{'id': 'a', 'summary': '🎂 Anna'}, {'id': 'b', 'summary': '🎂 Bernd'}],
+             'nextSyncToken': 'token-1'},
+            {'items': [{'id': 'b', 'status': 'cancelled'}, {'id': 'c', 'summary': '🎂 Clara'}],
+             'nextSyncToken': 'token-2'},
+            HttpError(httplib2.Response({'status': 410}), b'Gone'),
+            {'items': [{'id': 'c', 'summary': '🎂 Clara'}], 'nextSyncToken': 'token-3'},
+        ])
+
+        with patch.dict(anwendung.kalender_schnappschüsse, clear=True):
+            with anwendung.app.test_request_context('/'):
+                ergebnisse = [
+                    [
+                        eintrag['id'] for eintrag in anwendung.lese_kalenderereignisse(
+                            dienst, 'kalender', 'Prüfen', sitzungs_id='sitzung'
+                        )
+                    ]
+                    for _ in range(3)
+                ]
+
+        self.assertEqual(ergebnisse, [['a', 'b'], ['a', 'c'], ['c']])
+        self.assertEqual(
+            [aufruf.get('syncToken') for aufruf in dienst.listenaufrufe],
+            [None, 'token-1', 'token-2', None],
+        )
+
+    def test_abgleich_schreibt_nur_änderungen(self):
+        vorhanden = [
+            kalendereintrag('gleich', geburtstag('Anna', quelle='people/c1#birthdays.0')),
+            kalendereintrag('alt', geburtstag('Bernd', 2, quelle='people/c2#birthdays.0')),
+            kalendereintrag('entfallen', geburtstag('Clara', quelle='people/c3#birthdays.0')),
+            kalendereintrag('ohne-herkunft', geburtstag('Dora')),
+        ]
+        gewünscht = [
+            geburtstag('Anna', quelle='people/c1#birthdays.0'),
+            geburtstag('Bernd', 5, quelle='people/c2#birthdays.0'),
+            geburtstag('Dora', quelle='people/c4#birthdays.0'),
+            geburtstag('Emil', quelle='people/c5#birthdays.0'),
+        ]
+
+        einfügen, aktualisieren, zu_löschen, unverändert = anwendung.plane_abgleich(
+            vorhanden, gewünscht
+        )
+
+        self.assertEqual([eintrag['summary'] for eintrag in einfügen], ['🎂 Emil'])
+        self.assertEqual([ereignis_id for ereignis_id, _ in aktualisieren], ['alt', 'ohne-herkunft'])
+        self.assertEqual(
+            anwendung.eintragsquelle(aktualisieren[1][1]),
+            'people/c4#birthdays.0',
+        )
+        self.assertEqual(zu_löschen, ['entfallen'])
+        self.assertEqual(unverändert, 1)
+
+    def test_abgleich_schreibt_kontaktseiten_während_des_lesens(self):
+        def seite(von, bis, **weiter):
+            return dict(weiter, connections=[
+                {
+                    'resourceName': f'people/c{nummer}',
+                    'names': [{'displayName': f'Kontakt {nummer}'}],
+                    'birthdays': [{'date': {'month': 3, 'day': 1}}],
+                }
+                for nummer in range(von, bis)
+            ])
+
+        personen = PersonenDienst([
+            seite(0, 30, nextPageToken='zweite-seite'),
+            seite(30, 60, nextSyncToken='neues-token'),
+        ])
+        kalender = KalenderDienst(vorhandene=[
+            kalendereintrag('entfallen', geburtstag('Alt', quelle='people/alt#birthdays.0')),
+        ])
+        kontaktstand = {}
+
+        with patch.dict(anwendung.kalender_schnappschüsse, clear=True):
+            with anwendung.app.test_request_context('/'):
+                ergebnis = anwendung.gleiche_kalender_ab(
+                    kalender,
+                    'kalender',
+                    anwendung.lese_kontakte_gestreamt(personen, kontaktstand=kontaktstand),
+                )
+
+        self.assertEqual(ergebnis, (60, 0, 1, 0))
+        self.assertEqual(kalender.stapelgrößen, [50, 10])
+        self.assertEqual(kalender.gelöscht, ['entfallen'])
+        self.assertEqual(kontaktstand, {'sync_token': 'neues-token', 'kontaktzahl': 60})
+
+    def test_abgleich_geänderter_kontakte_braucht_bestätigten_kalenderstand(self):
+        vorhanden = [
+            kalendereintrag('unberührt', geburtstag('Anna', quelle='people/c1#birthdays.0')),
+            kalendereintrag('gelöscht', geburtstag('Bernd', quelle='people/c2#birthdays.0')),
+        ]
+        seiten = [([geburtstag('Clara', quelle='people/c3#birthdays.0')], {'people/c2', 'people/c3'}, False)]
+
+        with patch.dict(anwendung.kalender_schnappschüsse, clear=True):
+            with anwendung.app.test_request_context('/'):
+                kalender = KalenderDienst(vorhandene=vorhanden)
+                with self.assertRaises(ValueError):
+                    anwendung.gleiche_kalender_ab(kalender, 'kalender', iter(seiten))
+                self.assertEqual((kalender.stapelgrößen, kalender.gelöscht), ([], []))
+
+                kalender = KalenderDienst(vorhandene=vorhanden)
+                ergebnis = anwendung.gleiche_kalender_ab(
+                    kalender, 'kalender', iter(seiten), kalender_unverändert=True
+                )
+
+        self.assertEqual(ergebnis, (1, 0, 1, 1))
+        self.assertEqual(kalender.gelöscht, ['gelöscht'])
+
+    def test_vorausleser_endet_beim_abbruch_an_der_seitengrenze(self):
+        protokoll = []
+
+        def seiten():
+            for nummer in range(5):
+                protokoll.append(f'anfrage {nummer}')
+                anwendung.eventlet.sleep(0.01)
+                protokoll.append(f'antwort {nummer}')
+                yield nummer
+
+        vorausleser = anwendung.lies_voraus(seiten(), 1)
+        self.assertEqual(next(vorausleser), 0)
+        vorausleser.close()
+
+        self.assertEqual(protokoll[-1][:7], 'antwort')
+        self.assertNotIn('anfrage 4', protokoll)
+
+    @patch.object(anwendung, 'RATE_LIMIT_START_WARTEZEIT', 0)
+    def test_metriken_zählen_google_aufrufe_und_drosselungen(self):
+        self.frische_metriken()
+        with anwendung.app.test_request_context('/'):
+            anwendung.führe_google_api_aus(AusführbareAnforderung({}), 'Einfügen')
+            anwendung.führe_google_api_aus(FehlschlagendeAnforderung(429, {}), 'Einfügen')
+        antwort = self.client.get('/metrics')
+
+        text = antwort.get_data(as_text=True)
+        self.assertEqual(antwort.status_code, 200)
+        self.assertIn('geburtstage_google_api_aufrufe_total{aktion="Einfügen",ergebnis="ok"} 2', text)
+        self.assertIn('geburtstage_google_api_aufrufe_total{aktion="Einfügen",ergebnis="fehler"} 1', text)
+        self.assertIn('geburtstage_google_api_drosselungen_total{aktion="Einfügen"} 1', text)
+        self.assertIn('geburtstage_google_api_dauer_sekunden_count{aktion="Einfügen"} 3', text)
+        self.assertIn('geburtstage_synchronisationen_wartend 0', text)
+
+    def test_google_antworten_sind_maskiert_komprimiert_und_gezählt(self):
+        inhalt = json.dumps({'items': [{'id': str(nummer)} for nummer in range(200)]}).encode('utf-8')
+        komprimiert = gzip.compress(inhalt)
+        kopfzeilen = {}
+
+        def google(umgebung, start_response):
+            kopfzeilen.update(
+                accept_encoding=umgebung.get('HTTP_ACCEPT_ENCODING'), user_agent=umgebung.get('HTTP_USER_AGENT')
+            )
+            start_response('200 OK', [
+                ('Content-Type', 'application/json'),
+                ('Content-Encoding', 'gzip'),
+                ('Content-Length', str(len(komprimiert))),
+            ])
+            return [komprimiert]
+
+        server = eventlet.listen(('127.0.0.1', 0))
+        eventlet.spawn(eventlet.wsgi.server, server, google, log_output=False)
+
+        class Anforderung:
+            methodId = 'calendar.events.list'
+
+            def __init__(self, http):
+                self.http = http
+                self.uri = f'http://127.0.0.1:{server.getsockname()[1]}/calendar/v3/calendars/x/events?alt=json'
+
+            def execute(self):
+                _, antwort = self.http.request(self.uri, headers={'user-agent': 'google-api-python-client/1.7'})
+                return json.loads(antwort)
+
+        metriken = self.frische_metriken()
+        anforderung = Anforderung(anwendung.ZählendeHttp(httplib2.Http()))
+        profil = anwendung.Laufprofil()
+        token = anwendung.AKTIVES_LAUFPROFIL.set(profil)
+        try:
+            ergebnis = anwendung.führe_google_api_aus(anforderung, 'Lesen')
+        finally:
+            anwendung.AKTIVES_LAUFPROFIL.reset(token)
+            server.close()
+
+        felder = dict(parse_qsl(urlsplit(anforderung.uri).query))
+        self.assertEqual(felder['fields'], anwendung.ANTWORT_FELDMASKEN['calendar.events.list'])
+        self.assertEqual(kopfzeilen['accept_encoding'], 'gzip, deflate')
+        self.assertTrue(kopfzeilen['user_agent'].endswith('(gzip)'))
+        self.assertEqual(len(ergebnis['items']), 200)
+        # Gezählt wird die übertragene, nicht die entpackte Größe.
+        self.assertLess(len(komprimiert), len(inhalt))
+        self.assertIn(
+            f'geburtstage_google_api_antwort_bytes_total{{aktion="Lesen",kodierung="gzip"}} {len(komprimiert)}',
+            metriken.als_text()
+        )
+        self.assertEqual(profil.zusammenfassung()['aktionen']['Lesen']['bytes'], len(komprimiert))
+
+    def test_http_verbindungspool_verwendet_verbindungen_wieder(self):
+        class Transport:
+            angelegt = 0
+
+            def __init__(self):
+                Transport.angelegt += 1
+                self.connections = {}
+
+            def request(self, uri, method='GET', body=None, headers=None):
+                schlüssel = anwendung.HttpVerbindungspool.verbindungsschlüssel(uri)
+                verbindung = self.connections.setdefault(schlüssel, type('Verbindung', (), {'sock': None})())
+                if verbindung.sock is None:
+                    verbindung.sock = object()
+                return httplib2.Response({'status': 200}), b'{}'
+
+        metriken = self.frische_metriken()
+        pool = anwendung.HttpVerbindungspool(2, fabrik=Transport)
+
+        pool.request('https://people.googleapis.com/v1/people/me/connections')
+        pool.request('https://people.googleapis.com/v1/people/me/connections?pageToken=2')
+        pool.request('https://www.googleapis.com/calendar/v3/users/me/calendarList')
+        # Die Verbindung ist unterwegs abgelaufen; httplib2 baut sie neu auf.
+        pool.frei[-1].connections['https:www.googleapis.com'].sock = None
+        pool.request('https://www.googleapis.com/calendar/v3/calendars/x/events')
+
+        text = metriken.als_text()
+        self.assertEqual(Transport.angelegt, 1)
+        self.assertIn('geburtstage_google_http_verbindungen_total{ergebnis="neu"} 3', text)
+        self.assertIn('geburtstage_google_http_verbindungen_total{ergebnis="wiederverwendet"} 1', text)
+        self.assertIn('geburtstage_google_http_pool_belegt 0', text)
+        self.assertIsInstance(
+            anwendung.dienst_für('calendar', 'v3', anwendung.Credentials('token'))._http.http.http,
+            anwendung.HttpVerbindungspool
+        )
+
+    def test_sync_plan_schätzt_ohne_zu_schreiben(self):
+        anna = {
+            'resourceName': 'people/c1',
+            'names': [{'displayName': 'Anna'}],
+            'birthdays': [{'date': {'month': 3, 'day': 1}}],
+        }
+        bernd = {
+            'resourceName': 'people/c2',
+            'names': [{'displayName': 'Bernd'}],
+            'birthdays': [{'date': {'month': 4, 'day': 2}}],
+        }
+        vorhanden = kalendereintrag('anna', next(anwendung.ereignisse_der_person(anna)))
+        entfallen = dict(
+            kalendereintrag('alt', geburtstag('Carla', quelle='people/c3#birthday')), id='alt'
+        )
+        personen = PersonenDienst([{'connections': [anna, bernd], 'nextSyncToken': 'token'}])
+        kalender = KalenderDienst(vorhandene=[vorhanden, entfallen])
+        zustand = {}
+
+        def speichere(_, **werte):
+            zustand.update(werte)
+
+        with patch.object(anwendung, 'get_services', return_value=(personen, kalender, None)), \
+                patch.object(anwendung, 'finde_kalender', return_value='kalender'), \
+                patch.object(anwendung, 'EINFÜGE_BATCH_GRÖSSE', 50), \
+                patch.object(anwendung, 'nutzer_eimer', {}), \
+                patch.object(anwendung, 'GOOGLE_NUTZER_START_RATE', 2.0), \
+                patch.object(anwendung, 'sync_planer', anwendung.SyncPlaner(1)), \
+                patch.object(anwendung, 'lade_sitzungszustand', side_effect=lambda _: dict(zustand)), \
+                patch.object(anwendung, 'speichere_sitzungszustand', side_effect=speichere), \
+                patch.dict(anwendung.kalender_schnappschüsse, clear=True), \
+                patch.object(anwendung, 'emit_status') as emit_status:
+            with patch.object(anwendung.socketio, 'start_background_task') as start_background_task:
+                antwort = self.client.post('/sync?plan=1', headers={'X-CSRF-Token': self.csrf_token()})
+                doppelt = self.client.post('/sync', headers={'X-CSRF-Token': self.csrf_token()})
+            funktion, *argumente = start_background_task.call_args.args
+            funktion(*argumente)
+            status = self.client.get('/sync/status').get_json()
+
+        self.assertEqual(antwort.status_code, 202)
+        self.assertEqual(doppelt.status_code, 409)
+        self.assertEqual(status['zustand'], 'inaktiv')
+        plan = status['letzter_plan']
+        self.assertEqual(
+            (plan['einfügen'], plan['aktualisieren'], plan['löschen'], plan['unverändert']), (1, 0, 1, 1)
+        )
+        self.assertEqual((plan['schreib_aufrufe'], plan['teilanforderungen']), (2, 2))
+        # Die beiden Leseaufrufe haben die Startrate bereits zweimal angehoben.
+        self.assertEqual(plan['rate_pro_sekunde'], 2.0 + 2 * anwendung.GOOGLE_RATE_ERHÖHUNG)
+        self.assertAlmostEqual(plan['geschätzte_dauer_sekunden'], 2 / 3.0, delta=0.1)
+        self.assertEqual((kalender.eingefügt, kalender.aktualisiert, kalender.gelöscht), ([], [], []))
+        meldungen = [aufruf.args[0] for aufruf in emit_status.call_args_list]
+        self.assertTrue(any(meldung.startswith('📋 Plan: 1 neu') for meldung in meldungen))
+
+    @patch.object(anwendung, 'SYNC_MODUS', 'neuaufbau')
+    def test_neuaufbau_entfällt_bei_gleichem_fingerabdruck(self):
+        seite = {
+            'connections': [{
+                'resourceName': 'people/c1',
+                'names': [{'displayName': 'Anna'}],
+                'birthdays': [{'date': {'month': 3, 'day': 1}}],
+            }],
+            'nextSyncToken': 'token',
+        }
+        kalender = KalenderDienst(listen=[
+            {'items': [], 'nextSyncToken': 'k1'},
+            {'items': [], 'nextSyncToken': 'k2'},
+            {'items': [{'id': '1', 'summary': 'Anna'}], 'nextSyncToken': 'k3'},
+            {'items': [], 'nextSyncToken': 'k4'},
+            {'items': [], 'nextSyncToken': 'k5'},
+        ])
+        zustand = {}
+
+        def speichere(_, **werte):
+            zustand.update(werte)
+
+        with patch.object(anwendung, 'get_or_create_calendar', return_value='kalender'), \
+                patch.object(anwendung, 'lade_sitzungszustand', side_effect=lambda _: dict(zustand)), \
+                patch.object(anwendung, 'speichere_sitzungszustand', side_effect=speichere), \
+                patch.dict(anwendung.kalender_schnappschüsse, clear=True), \
+                patch.object(anwendung, 'emit_status') as emit_status:
+            anwendung.sync_events_ausführen(PersonenDienst([seite]), kalender, 'sitzung')
+            self.assertEqual(len(kalender.eingefügt), 1)
+            self.assertEqual(zustand['kalender_sync_token'], 'k3')
+            self.assertEqual(len(zustand['fingerabdruck']), 64)
+
+            anwendung.sync_events_ausführen(PersonenDienst([seite]), kalender, 'sitzung')
+            with patch.object(anwendung, 'finde_kalender', return_value='kalender'):
+                plan = anwendung.plane_synchronisation(PersonenDienst([seite]), kalender, 'sitzung')
+
+        self.assertEqual(
+            (plan['einfügen'], plan['löschen'], plan['unverändert'], plan['teilanforderungen']), (0, 0, 1, 0)
+        )
+        self.assertEqual(len(kalender.eingefügt), 1)
+        self.assertEqual(kalender.gelöscht, [])
+        self.assertEqual(kalender.listenaufrufe[-2]['syncToken'], 'k3')
+        # Die Vorschau prüft nur die Änderungen und speichert kein neues Token.
+        self.assertEqual(kalender.listenaufrufe[-1]['syncToken'], 'k4')
+        self.assertEqual(zustand['kalender_sync_token'], 'k4')
+        meldungen = [aufruf.args[0] for aufruf in emit_status.call_args_list]
+        self.assertTrue(any('unverändert – nichts zu schreiben' in meldung for meldung in meldungen))
+
+    def test_im_kalender_gelöschte_oder_geänderte_termine_entstehen_neu(self):
+        anna = {
+            'resourceName': 'people/c1',
+            'names': [{'displayName': 'Anna'}],
+            'birthdays': [{'date': {'month': 3, 'day': 1}}],
+        }
+        termin = kalendereintrag('1', next(anwendung.ereignisse_der_person(anna)))
+        neu_angelegt = dict(termin, id='2')
+        bearbeitet = dict(neu_angelegt, summary='🎂 Anna (bearbeitet)')
+        kalender = KalenderDienst(listen=[
+            # Erster Lauf: leerer Kalender, danach der eigene Termin.
+            {'items': [], 'nextSyncToken': 'k1'},
+            {'items': [termin], 'nextSyncToken': 'k2'},
+            # Zweiter Lauf: Termin im Kalender gelöscht.
+            {'items': [{'id': '1', 'status': 'cancelled'}], 'nextSyncToken': 'k3'},
+            {'items': [{'id': '1', 'status': 'cancelled'}], 'nextSyncToken': 'k3'},
+            {'items': [neu_angelegt], 'nextSyncToken': 'k4'},
+            # Dritter Lauf: Titel im Kalender geändert.
+            {'items': [bearbeitet], 'nextSyncToken': 'k5'},
+            {'items': [bearbeitet], 'nextSyncToken': 'k5'},
+            {'items': [neu_angelegt], 'nextSyncToken': 'k6'},
+            # Vierter Lauf: nur ein fremder Termin ist hinzugekommen.
+            {'items': [{'id': 'fremd', 'summary': 'Zahnarzt'}], 'nextSyncToken': 'k7'},
+        ])
+        zustand = {}
+        kontaktabrufe = []
+
+        def speichere(_, **werte):
+            zustand.update(werte)
+
+        def synchronisiere(kontakte=(anna,)):
+            personen = PersonenDienst([
+                {'connections': list(kontakte), 'nextSyncToken': f't{len(kontaktabrufe) + 1}'}
+            ])
+            kontaktabrufe.append(personen.personen.verbindungen.parameter)
+            anwendung.sync_events_ausführen(personen, kalender, 'sitzung')
+
+        with patch.object(anwendung, 'get_or_create_calendar', return_value='kalender'), \
+                patch.object(anwendung, 'lade_sitzungszustand', side_effect=lambda _: dict(zustand)), \
+                patch.object(anwendung, 'speichere_sitzungszustand', side_effect=speichere), \
+                patch.dict(anwendung.kalender_schnappschüsse, clear=True), \
+                patch.object(anwendung, 'emit_status') as emit_status:
+            synchronisiere()
+            self.assertEqual(zustand['kalender_sync_token'], 'k2')
+            synchronisiere()
+            synchronisiere()
+            synchronisiere(kontakte=())
+
+        self.assertEqual([eintrag['summary'] for eintrag in kalender.eingefügt], ['🎂 Anna', '🎂 Anna'])
+        self.assertEqual([ereignis_id for ereignis_id, _ in kalender.aktualisiert], ['2'])
+        self.assertEqual(kalender.aktualisiert[0][1]['summary'], '🎂 Anna')
+        # Nach einer Kalenderänderung werden alle Kontakte statt nur der geänderten gelesen.
+        self.assertEqual([abruf[0].get('syncToken') for abruf in kontaktabrufe], [None, None, None, 't3'])
+        # Ohne Änderungen auf beiden Seiten bleibt es beim Blick auf die Kalenderänderungen.
+        self.assertEqual(
+            [aufruf.get('syncToken') for aufruf in kalender.listenaufrufe[2:]],
+            ['k2', 'k2', 'k3', 'k4', 'k4', 'k5', 'k6'],
+        )
+        self.assertEqual((zustand['kontakte_sync_token'], zustand['kalender_sync_token']), ('t4', 'k7'))
+        meldungen = [aufruf.args[0] for aufruf in emit_status.call_args_list]
+        self.assertEqual(sum('seit dem letzten Lauf verändert' in meldung for meldung in meldungen), 2)
+        self.assertIn('unverändert – nichts zu schreiben', meldungen[-3])
+        self.assertIn('0 entfernt, 1 unverändert', meldungen[-1])
+
+    def test_kalender_wird_über_gemerkte_id_oder_alle_listenseiten_gefunden(self):
+        dienst = Kalenderliste(
+            [
+                {'items': [{'id': 'privat', 'summary': 'Privat'}], 'nextPageToken': 'seite2'},
+                {'items': [{'id': 'neu', 'summary': 'geburtstage'}]},
+            ],
+            {'neu': {'id': 'neu', 'summary': 'Geburtstage'}}
+        )
+
+        self.assertEqual(anwendung.finde_kalender(dienst, bekannte_id='gelöscht'), 'neu')
+        self.assertEqual([parameter['pageToken'] for parameter in dienst.parameter], [None, 'seite2'])
+        self.assertEqual(dienst.parameter[0]['fields'], 'items(id,summary),nextPageToken')
+
+        self.assertEqual(anwendung.finde_kalender(dienst, bekannte_id='neu'), 'neu')
+        self.assertEqual(dienst.abrufe, ['gelöscht', 'neu'])
+        self.assertEqual(len(dienst.parameter), 2)
+
+    def test_sync_meldet_und_protokolliert_laufprofil(self):
+        personen = PersonenDienst([{
+            'connections': [{
+                'resourceName': 'people/c1',
+                'names': [{'displayName': 'Anna'}],
+                'birthdays': [{'date': {'month': 3, 'day': 1}}],
+            }],
+            'nextSyncToken': 'token',
+        }])
+        kalender = KalenderDienst()
+
+        with tempfile.TemporaryDirectory() as verzeichnis:
+            datei = os.path.join(verzeichnis, 'laufprofil.jsonl')
+            with patch.object(anwendung, 'SYNC_LAUFPROFIL_DATEI', datei), \
+                    patch.object(anwendung, 'get_or_create_calendar', return_value='kalender'), \
+                    patch.object(anwendung, 'lade_sitzungszustand', return_value={}), \
+                    patch.object(anwendung, 'speichere_sitzungszustand'), \
+                    patch.dict(anwendung.kalender_schnappschüsse, clear=True), \
+                    patch.object(anwendung, 'emit_status') as emit_status:
+                anwendung.sync_events_ausführen(personen, kalender, 'sitzung')
+            profil = json.loads(Path(datei).read_text(encoding='utf-8'))
+
+        meldungen = [aufruf.args[0] for aufruf in emit_status.call_args_list]
+        self.assertTrue(meldungen[-2].startswith('⏱️ Laufzeit'))
+        self.assertIn('Kalender lesen', meldungen[-2])
+        self.assertEqual(profil['ergebnis'], 'ok')
+        self.assertEqual(profil['anzahlen']['erstellt'], 1)
+        self.assertEqual(profil['aktionen']['Abrufen der Kontakte']['aufrufe'], 1)
+        self.assertIn('Kontakte lesen und schreiben', profil['phasen'])
+
+    def test_speicherfehler_nach_dem_lauf_ersetzt_nicht_dessen_ergebnis(self):
+        with patch.object(anwendung, 'speichere_sitzungszustand', side_effect=anwendung.sqlite3.OperationalError), \
+                patch.object(anwendung, 'führe_synchronisation_aus', side_effect=[None, ('Error', 500)]):
+            self.assertIsNone(anwendung.sync_events_ausführen(None, None, 'sitzung'))
+            self.assertEqual(anwendung.sync_events_ausführen(None, None, 'sitzung'), ('Error', 500))
+
+    def test_token_eimer_drosselt_und_passt_rate_an(self):
+        eimer = anwendung.TokenEimer(rate=2.0, max_rate=3.0)
+
+        self.assertEqual(eimer.reserviere(2), 0.0)
+        self.assertAlmostEqual(eimer.reserviere(1), 0.5, places=2)
+        eimer.senke()
+        self.assertEqual(eimer.rate, 1.0)
+        for _ in range(10):
+            eimer.erhöhe()
+        self.assertEqual(eimer.rate, 3.0)
+
+    @patch.object(anwendung, 'RATE_LIMIT_START_WARTEZEIT', 0)
+    def test_rate_limit_senkt_nutzerrate_gemeinsam(self):
+        anforderung = FehlschlagendeAnforderung(429, {'id': 'ok'})
+
+        with patch.dict(anwendung.nutzer_eimer, clear=True):
+            token = anwendung.AKTIVE_STATUS_SITZUNG.set('sitzung')
+            try:
+                with anwendung.app.test_request_context('/'):
+                    ergebnis = anwendung.führe_google_api_aus(anforderung, 'Einfügen')
+            finally:
+                anwendung.AKTIVE_STATUS_SITZUNG.reset(token)
+            rate = anwendung.nutzer_eimer['sitzung'].rate
+
+        self.assertEqual(ergebnis, {'id': 'ok'})
+        self.assertEqual(
+            rate,
+            anwendung.GOOGLE_NUTZER_START_RATE * anwendung.GOOGLE_RATE_SENKUNG
+            + anwendung.GOOGLE_RATE_ERHÖHUNG,
+        )
+        self.assertIn('projekt_rate', self.client.get('/ratenbegrenzung').get_json())
 
     @patch.object(anwendung.Flow, 'from_client_secrets_file')
     @patch.object(anwendung, 'lade_zugangsdaten', return_value=None)
@@ -131,18 +877,118 @@ class GeburtstagsimportTest(unittest.TestCase):
 
     @patch.object(anwendung, 'speichere_zugangsdaten')
     def test_oauth_callback_setzt_synchronisierung_fort(self, speichere_zugangsdaten):
+        startfluss = OAuthStartfluss()
+        startfluss.redirect_uri = 'https://calendar.test/oauth2callback'
+        anwendung.merke_oauth_flow('zustand', startfluss)
         fluss = OAuthFluss()
-        anwendung.flows['zustand'] = fluss
         with self.client.session_transaction() as sitzung:
             sitzung['oauth_state'] = 'zustand'
             sitzung['oauth_fortsetzung'] = 'sync'
 
-        antwort = self.client.get('/oauth2callback?state=zustand&code=code')
+        with patch.object(anwendung.Flow, 'from_client_secrets_file', return_value=fluss):
+            antwort = self.client.get('/oauth2callback?state=zustand&code=code')
 
         self.assertEqual(antwort.status_code, 302)
         self.assertTrue(antwort.location.endswith('/?autostart=sync'))
         self.assertEqual(fluss.code, 'code')
+        self.assertEqual(fluss.redirect_uri, 'https://calendar.test/oauth2callback')
         speichere_zugangsdaten.assert_called_once_with(fluss.credentials)
+        self.assertNotIn('zustand', anwendung.flows)
+
+    def test_oauth_flows_verfallen_und_sind_begrenzt(self):
+        metriken = self.frische_metriken()
+        startfluss = OAuthStartfluss()
+        startfluss.redirect_uri = 'https://calendar.test/oauth2callback'
+        with patch.object(anwendung, 'flows', anwendung.OrderedDict()), \
+                patch.object(anwendung, 'OAUTH_FLOW_MAX_ANZAHL', 2), \
+                patch.object(anwendung.time, 'monotonic', return_value=1000.0) as uhr:
+            for state in ('a', 'b', 'c'):
+                anwendung.merke_oauth_flow(state, startfluss)
+            self.assertEqual(list(anwendung.flows), ['b', 'c'])
+            self.assertEqual(
+                anwendung.flows['c'][0],
+                {'redirect_uri': 'https://calendar.test/oauth2callback', 'code_verifier': None},
+            )
+
+            uhr.return_value = 1000.0 + anwendung.OAUTH_FLOW_MAX_ALTER_SEKUNDEN / 2
+            anwendung.merke_oauth_flow('d', startfluss)
+            uhr.return_value = 1001.0 + anwendung.OAUTH_FLOW_MAX_ALTER_SEKUNDEN
+            self.assertEqual(anwendung.bereinige_oauth_flows(), 1)
+            self.assertEqual(list(anwendung.flows), ['d'])
+
+        text = metriken.als_text()
+        self.assertIn('geburtstage_oauth_flows_entfernt_total{grund="verdraengt"} 2', text)
+        self.assertIn('geburtstage_oauth_flows_entfernt_total{grund="abgelaufen"} 1', text)
+
+    @patch.object(anwendung, 'speichere_zugangsdaten')
+    @patch.object(anwendung, 'lade_zugangsdaten', return_value=None)
+    def test_geteilter_zustand_verbindet_mehrere_worker(self, lade_zugangsdaten, speichere_zugangsdaten):
+        with tempfile.TemporaryDirectory() as verzeichnis:
+            pfad = os.path.join(verzeichnis, 'zustand.sqlite3')
+            anderer_worker = anwendung.GeteilterZustand(pfad)
+            with patch.object(anwendung, 'geteilter_zustand', anwendung.GeteilterZustand(pfad)):
+                startfluss = OAuthStartfluss()
+                startfluss.code_verifier = None
+                with patch.object(anwendung.Flow, 'from_client_secrets_file', return_value=startfluss):
+                    with anwendung.app.test_request_context('/'):
+                        anwendung.get_services()
+                self.assertNotIn('neuer-zustand', anwendung.flows)
+
+                # Der Callback landet auf einem Worker, der den Flow nur aus der Datei kennt.
+                fluss = OAuthFluss()
+                with self.client.session_transaction() as sitzung:
+                    sitzung['oauth_state'] = 'neuer-zustand'
+                with patch.object(anwendung.Flow, 'from_client_secrets_file', return_value=fluss) as neu_aufgebaut:
+                    antwort = self.client.get('/oauth2callback?state=neuer-zustand&code=code')
+                self.assertEqual(antwort.status_code, 302)
+                self.assertEqual(neu_aufgebaut.call_args.kwargs['state'], 'neuer-zustand')
+                self.assertEqual(fluss.redirect_uri, startfluss.redirect_uri)
+                speichere_zugangsdaten.assert_called_once_with(fluss.credentials)
+                self.assertIsNone(anderer_worker.hole_flow('neuer-zustand', 60))
+
+                self.assertTrue(anderer_worker.sperre('sitzung', 60))
+                self.assertFalse(anwendung.starte_synchronisation_für_sitzung('sitzung'))
+                self.assertTrue(anwendung.synchronisation_läuft_anderswo('sitzung'))
+                anderer_worker.gib_frei('sitzung')
+                with patch.object(anwendung, 'SYNC_SPERRE_ERNEUERUNG_SEKUNDEN', 0.01):
+                    self.assertTrue(anwendung.starte_synchronisation_für_sitzung('sitzung'))
+                    self.assertFalse(anderer_worker.sperre('sitzung', 60))
+                    # Ein langer Lauf erneuert seine Sperre, bevor sie als verwaist gilt.
+                    anderer_worker.verbinde().execute("UPDATE sync_sperren SET seit = 0")
+                    anwendung.eventlet.sleep(0.05)
+                    self.assertFalse(anderer_worker.sperre('sitzung', 60))
+                    anwendung.beende_synchronisation_für_sitzung('sitzung')
+                self.assertNotIn('sitzung', anwendung.sperren_erneuerung)
+
+                sender = anwendung.SqliteNachrichtenverteiler(anwendung.geteilter_zustand)
+                sender._publish({'method': 'emit', 'event': 'statusmeldungen', 'room': 'vorher'})
+                empfänger = anwendung.SqliteNachrichtenverteiler(anderer_worker)
+                # Frames zwischen Start und erster Abfrage gehen nicht verloren.
+                sender._publish({'method': 'emit', 'event': 'statusmeldungen', 'room': 'sitzung'})
+                self.assertEqual(
+                    [json.loads(daten)['room'] for daten in empfänger.hole_nachrichten()], ['sitzung']
+                )
+                self.assertEqual(empfänger.hole_nachrichten(), [])
+
+    def test_gesperrte_sqlite_datei_blockiert_andere_greenlets_nicht(self):
+        with tempfile.TemporaryDirectory() as verzeichnis:
+            zustand = anwendung.GeteilterZustand(os.path.join(verzeichnis, 'zustand.sqlite3'))
+            zustand.verbinde()
+            anderer_worker = anwendung.sqlite3.connect(zustand.pfad, isolation_level=None)
+            anderer_worker.execute('BEGIN IMMEDIATE')
+            freigegeben = []
+
+            def gib_frei():
+                freigegeben.append(time.monotonic())
+                anderer_worker.execute('COMMIT')
+
+            anwendung.eventlet.spawn_after(0.05, gib_frei)
+            zustand.veröffentliche('kanal', 'daten')
+            anderer_worker.close()
+            zustand.verbindung.close()
+
+        # Die Freigabe lief, während veröffentliche() auf die Datei wartete.
+        self.assertEqual(len(freigegeben), 1)
 
     @patch.object(anwendung, 'lösche_zugangsdaten', return_value=True)
     @patch.object(anwendung, 'widerrufe_google_zugang', return_value=True)
@@ -166,25 +1012,215 @@ class GeburtstagsimportTest(unittest.TestCase):
         with self.client.session_transaction() as sitzung:
             self.assertNotIn('sitzungs_id', sitzung)
 
-    def test_abgelaufene_token_datei_wird_entfernt(self):
+    def test_abgelaufene_token_werden_über_den_index_entfernt(self):
         with tempfile.TemporaryDirectory() as verzeichnis:
-            alter_token = Path(verzeichnis, 'alt.json')
-            neuer_token = Path(verzeichnis, 'neu.json')
-            alter_token.write_text('{}', encoding='utf-8')
-            neuer_token.write_text('{}', encoding='utf-8')
+            alte_datei = Path(verzeichnis, 'altdatei.json')
+            alte_datei.write_text('{}', encoding='utf-8')
             alt = time.time() - (31 * 24 * 60 * 60)
-            os.utime(alter_token, (alt, alt))
+            os.utime(alte_datei, (alt, alt))
 
             with patch.object(anwendung, 'TOKEN_SPEICHER_DIR', verzeichnis), patch.object(
                 anwendung,
                 'OAUTH_TOKEN_AUFBEWAHRUNG_TAGE',
                 30,
-            ):
+            ), patch.dict(anwendung.token_speicher_instanzen, clear=True), patch.object(
+                anwendung, 'zugangsdaten_cache', anwendung.OrderedDict()
+            ) as zugangsdaten_cache:
+                speicher = anwendung.token_speicher()
+                speicher.speichere('neu', '{}')
+                speicher.speichere('alt', '{}')
+                zugangsdaten_cache['alt'] = (object(), time.monotonic() + 60)
+                speicher.verbindung.execute(
+                    "UPDATE zugangsdaten SET genutzt = ? WHERE sitzung = 'alt'", (alt,)
+                )
                 anzahl = anwendung.bereinige_token_speicher()
+                self.assertNotIn('alt', zugangsdaten_cache)
+                vorhanden = [
+                    sitzung for sitzung in ('alt', 'altdatei', 'neu') if speicher.existiert(sitzung)
+                ]
+                speicher.verbindung.close()
+
+            self.assertEqual(anzahl, 2)
+            self.assertEqual(vorhanden, ['neu'])
+            self.assertFalse(alte_datei.exists())
+
+    def test_leerer_token_speicher_durchsucht_verzeichnis_nur_beim_anlegen(self):
+        with tempfile.TemporaryDirectory() as verzeichnis:
+            speicher = anwendung.TokenSpeicher(verzeichnis)
+            with patch.object(anwendung.os, 'listdir') as listdir, patch.object(
+                anwendung.os, 'scandir'
+            ) as scandir:
+                self.assertFalse(speicher.existiert('unbekannt'))
+                self.assertIsNone(speicher.lade('unbekannt'))
+
+            listdir.assert_not_called()
+            scandir.assert_not_called()
+            self.assertFalse(os.path.exists(speicher.pfad))
+
+    @patch.object(anwendung, 'AUTOSYNC_INTERVALL_SEKUNDEN', 3600)
+    @patch.object(anwendung, 'AUTOSYNC_MAX_PARALLEL', 1)
+    def test_geplante_synchronisation_läuft_ohne_browser_und_berichtet(self):
+        def synchronisiere(personen, kalender, sitzungs_id):
+            anwendung.speichere_sitzungszustand(
+                sitzungs_id, letzter_lauf=time.time(), letzte_anzahlen={'erstellt': 2, 'unverändert': 5}
+            )
+
+        zugangsdaten = type('Zugangsdaten', (), {'valid': True, 'refresh_token': 'refresh'})()
+        jetzt = time.time()
+        with tempfile.TemporaryDirectory() as verzeichnis, patch.object(
+            anwendung, 'TOKEN_SPEICHER_DIR', verzeichnis
+        ), patch.dict(anwendung.token_speicher_instanzen, clear=True), patch.object(
+            anwendung, 'sync_planer', anwendung.SyncPlaner(2)
+        ), patch.object(
+            anwendung.Credentials, 'from_authorized_user_info', return_value=zugangsdaten
+        ), patch.object(anwendung, 'dienst_für'), patch.object(
+            anwendung, 'sync_events_ausführen', side_effect=synchronisiere
+        ) as sync_events_ausführen:
+            speicher = anwendung.token_speicher()
+            läufe = (
+                ('faellig', jetzt - 2 * 3600, True),
+                ('frisch', jetzt - 60, True),
+                ('auch', jetzt - 3 * 3600, True),
+                ('ohne_zustimmung', jetzt - 4 * 3600, False),
+            )
+            for sitzung, letzter_lauf, automatik in läufe:
+                speicher.speichere(sitzung, '{}')
+                anwendung.speichere_sitzungszustand(sitzung, letzter_lauf=letzter_lauf, automatik=automatik)
+            speicher.verbindung.execute("UPDATE zugangsdaten SET genutzt = 1")
+
+            self.assertEqual(
+                [sitzung for sitzung, _ in anwendung.fällige_automatische_läufe(jetzt)], ['auch', 'faellig']
+            )
+            self.assertEqual(anwendung.plane_automatische_läufe(jetzt), 1)
+            self.assertEqual(anwendung.plane_automatische_läufe(jetzt), 0)
+            anwendung.eventlet.sleep(0.01)
+
+            self.assertEqual(sync_events_ausführen.call_args.args[2], 'auch')
+            self.assertFalse(anwendung.automatische_läufe)
+            self.assertNotIn('auch', anwendung.laufende_synchronisationen)
+            genutzt = speicher.verbindung.execute(
+                "SELECT genutzt FROM zugangsdaten WHERE sitzung = 'auch'"
+            ).fetchone()[0]
+            with patch.object(anwendung, 'emit_status') as emit_status:
+                anwendung.melde_automatik_bericht('auch')
+                anwendung.melde_automatik_bericht('auch')
+
+            with self.client.session_transaction() as sitzung:
+                eigene_sitzung = sitzung['sitzungs_id']
+            ohne_zugang = self.client.post(
+                '/automatik', json={'aktiv': True}, headers={'X-CSRF-Token': self.csrf_token()}
+            )
+            speicher.speichere(eigene_sitzung, '{}')
+            eingeschaltet = self.client.post(
+                '/automatik', json={'aktiv': True}, headers={'X-CSRF-Token': self.csrf_token()}
+            )
+            seite = self.client.get('/').get_data(as_text=True)
+            zustimmung = anwendung.lade_sitzungszustand(eigene_sitzung).get('automatik')
+            speicher.verbindung.close()
+
+        self.assertEqual(genutzt, 1)
+        self.assertEqual(ohne_zugang.status_code, 409)
+        self.assertEqual(eingeschaltet.get_json(), {'automatik': True})
+        self.assertTrue(zustimmung)
+        self.assertIn('stündlich automatisch abgleichen', seite)
+        emit_status.assert_called_once()
+        self.assertIn('2 Einträge erstellt', emit_status.call_args.args[0])
+        self.assertIn('5 unverändert', emit_status.call_args.args[0])
+
+    def test_zugangsdaten_werden_zwischengespeichert_und_vorab_erneuert(self):
+        bald = ErneuerbareZugangsdaten(restlaufzeit=60)
+        später = ErneuerbareZugangsdaten(restlaufzeit=3600)
+
+        with tempfile.TemporaryDirectory() as verzeichnis, patch.object(
+            anwendung, 'TOKEN_SPEICHER_DIR', verzeichnis
+        ), patch.dict(anwendung.token_speicher_instanzen, clear=True), patch.object(
+            anwendung, 'zugangsdaten_cache', anwendung.OrderedDict()
+        ):
+            with anwendung.app.test_request_context('/'):
+                anwendung.session['sitzungs_id'] = 'bald'
+                anwendung.speichere_zugangsdaten(bald)
+                with patch.object(anwendung.TokenSpeicher, 'lade') as lade:
+                    geladen = anwendung.lade_zugangsdaten()
+                lade.assert_not_called()
+            with anwendung.app.test_request_context('/'):
+                anwendung.session['sitzungs_id'] = 'später'
+                anwendung.speichere_zugangsdaten(später)
+            widerrufen = ErneuerbareZugangsdaten(restlaufzeit=60)
+            with anwendung.app.test_request_context('/'):
+                anwendung.session['sitzungs_id'] = 'widerrufen'
+                anwendung.speichere_zugangsdaten(widerrufen)
+
+            def während_der_erneuerung_gelöscht(_):
+                with anwendung.app.test_request_context('/'):
+                    anwendung.session['sitzungs_id'] = 'widerrufen'
+                    anwendung.lösche_zugangsdaten()
+
+            widerrufen.refresh = während_der_erneuerung_gelöscht
+            speicher = anwendung.token_speicher()
+            speicher.verbindung.execute("UPDATE zugangsdaten SET genutzt = 1")
+
+            erneuert = anwendung.erneuere_zugangsdaten_vorab()
+            genutzt = speicher.verbindung.execute(
+                "SELECT genutzt FROM zugangsdaten WHERE sitzung = 'bald'"
+            ).fetchone()[0]
+            widerrufen_gespeichert = speicher.existiert('widerrufen')
+
+            with anwendung.app.test_request_context('/'):
+                anwendung.session['sitzungs_id'] = 'bald'
+                anwendung.lösche_zugangsdaten()
+                self.assertIsNone(anwendung.lade_zugangsdaten())
+            anwendung.token_speicher().verbindung.close()
+
+        self.assertIs(geladen, bald)
+        self.assertEqual(erneuert, 1)
+        self.assertEqual(genutzt, 1)
+        self.assertFalse(widerrufen_gespeichert)
+        self.assertEqual((bald.erneuerungen, später.erneuerungen), (1, 0))
+
+    def test_dienste_entstehen_aus_mitgelieferten_discovery_dokumenten(self):
+        zugangsdaten = ErneuerbareZugangsdaten(restlaufzeit=3600)
+
+        with patch.object(httplib2.Http, 'request') as netzwerk:
+            erster = anwendung.dienst_für('calendar', 'v3', zugangsdaten)
+            zweiter = anwendung.dienst_für('calendar', 'v3', zugangsdaten)
+            anforderung = zweiter.events().list(calendarId='kalender')
+
+        netzwerk.assert_not_called()
+        vorlage = anwendung.dienstvorlage('calendar', 'v3')
+        self.assertIsNot(erster._http, zweiter._http)
+        self.assertIs(anforderung.http, zweiter._http)
+        self.assertIs(erster._schema, vorlage._schema)
+        self.assertIn('/calendar/v3/calendars/kalender/events', anforderung.uri)
+
+    def test_sync_planer_begrenzt_parallele_läufe(self):
+        gestartet = []
+        planer = anwendung.SyncPlaner(max_parallel=1)
+
+        with patch.object(
+            anwendung.socketio,
+            'start_background_task',
+            side_effect=lambda funktion, *argumente: gestartet.append((funktion, argumente)),
+        ), patch.object(anwendung, 'emit_status') as emit_status:
+            erste_position = planer.reihe_ein('a', lambda: None)
+            zweite_position = planer.reihe_ein('b', lambda: None)
+            wartend = planer.status('b')
+            funktion, argumente = gestartet.pop(0)
+            funktion(*argumente)
+
+        self.assertEqual((erste_position, zweite_position), (0, 1))
+        self.assertEqual(wartend['zustand'], 'wartet')
+        self.assertIn('geschätzter_start', wartend)
+        self.assertIn('Position 1', emit_status.call_args_list[0].args[0])
+        self.assertEqual(emit_status.call_args_list[0].kwargs['sitzungs_id'], 'b')
+        self.assertEqual(planer.status('b')['zustand'], 'läuft')
+        self.assertEqual(len(gestartet), 1)
+        self.assertEqual(self.client.get('/sync/status').get_json()['zustand'], 'inaktiv')
+
+    def test_anfragen_durchsuchen_den_token_speicher_nicht(self):
+        with patch.object(anwendung, 'bereinige_token_speicher') as bereinige:
+            self.client.get('/datenschutz')
 
-            self.assertEqual(anzahl, 1)
-            self.assertFalse(alter_token.exists())
-            self.assertTrue(neuer_token.exists())
+        bereinige.assert_not_called()
 
     def test_seiten_enthalten_datenschutz_und_sicherheitskopfzeilen(self):
         startseite = self.client.get('/')